@@ -0,0 +1,70 @@
+"""
+Compare audio decode time per audio-hour before and after the native-rate ingest layer.
+
+For each source rate a synthetic 16-bit PCM WAV is written, then decoded with
+`librosa.load(sr=22050)` (the previous path), with `scripts.audio.load_audio`
+at 22050Hz, and with `load_audio` at the file's own rate, as for a model
+trained at that rate. Decoded signals are checked against librosa.
+Run from the repository root:
+
+    python -m benchmarks.bench_decode test/test.wav --seconds 600
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+from scripts.audio import MODEL_SAMPLE_RATE, RESAMPLERS, load_audio
+
+SOURCE_RATES = [8000, 16000, 22050, 44100]  # Telephony, Speech Commands, model default, CD
+
+
+def write_source(speech_path, sample_rate, seconds, directory):
+    """Tile a speech file to `seconds` of 16-bit PCM at `sample_rate` and return its path."""
+    speech, _ = librosa.load(speech_path, sr=sample_rate)
+    signal = np.tile(speech, int(np.ceil(seconds * sample_rate / len(speech))))[:int(seconds * sample_rate)]
+    path = os.path.join(directory, f"source_{sample_rate}.wav")
+    sf.write(path, signal, sample_rate, subtype="PCM_16")
+    return path
+
+
+def time_decode(decode, repeats):
+    """Best-of-`repeats` wall time of `decode()` and its last result."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        signal = decode()
+        best = min(best, time.perf_counter() - start)
+    return best, signal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode time per audio-hour, librosa vs. native-rate ingest.")
+    parser.add_argument("speech_path", nargs="?", default="test/test.wav")
+    parser.add_argument("--seconds", type=float, default=600, help="Length of each synthetic recording")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--res-type", default="soxr_hq", choices=sorted(RESAMPLERS))
+    args = parser.parse_args()
+
+    hours = args.seconds / 3600
+    print(f"{'source':>8}{'librosa 22050':>16}{'ingest 22050':>15}{'ingest native':>16}{'speedup':>10}{'max diff':>11}")
+    print(f"{'(Hz)':>8}{'(s/audio-hour)':>16}{'(s/audio-hour)':>15}{'(s/audio-hour)':>16}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rate in SOURCE_RATES:
+            path = write_source(args.speech_path, rate, args.seconds, directory)
+
+            before, reference = time_decode(lambda: librosa.load(path, sr=MODEL_SAMPLE_RATE)[0], args.repeats)
+            after, signal = time_decode(lambda: load_audio(path, MODEL_SAMPLE_RATE, args.res_type)[0], args.repeats)
+            native, _ = time_decode(lambda: load_audio(path, rate)[0], args.repeats)
+
+            max_diff = float(np.max(np.abs(signal - reference))) if len(signal) == len(reference) else float("nan")
+            print(f"{rate:>8}{before / hours:>16.2f}{after / hours:>15.2f}{native / hours:>16.2f}"
+                  f"{before / native:>9.1f}x{max_diff:>11.1e}")
+
+
+if __name__ == "__main__":
+    main()
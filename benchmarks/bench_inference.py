@@ -0,0 +1,61 @@
+"""
+Benchmark per-chunk `Model.predict` calls against batched inference.
+
+Run from the repository root so the model and feature store (or `data.json`) resolve:
+
+    python -m benchmarks.bench_inference --chunks 600 --batch-size 64
+"""
+import argparse
+import time
+
+import numpy as np
+
+from scripts.detect import Keyword_Spotting_Service
+
+
+def per_chunk_predict(kss, chunks_mfcc):
+    """Reference path: one `Model.predict` call per chunk."""
+    probabilities = []
+    for mfcc_chunk in chunks_mfcc:
+        mfcc_chunk = mfcc_chunk[np.newaxis, ..., np.newaxis]
+        probabilities.append(kss.model.predict(mfcc_chunk, verbose=0)[0])
+    return np.array(probabilities)
+
+
+def time_call(fn, *args):
+    """Return (result, elapsed seconds) for a single call."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=600, help="Number of one-second chunks (600 = 10 minutes)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per batched inference call")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    kss = Keyword_Spotting_Service()
+    _, num_frames, num_mfcc, _ = kss.backend.input_shape
+
+    rng = np.random.default_rng(args.seed)
+    chunks_mfcc = list(rng.normal(0.0, 50.0, size=(args.chunks, num_frames, num_mfcc)).astype(np.float32))
+
+    # Warm both paths so graph tracing is not counted
+    per_chunk_predict(kss, chunks_mfcc[:1])
+    kss._predict_probabilities(chunks_mfcc[:args.batch_size], args.batch_size)
+
+    before, before_time = time_call(per_chunk_predict, kss, chunks_mfcc)
+    after, after_time = time_call(kss._predict_probabilities, chunks_mfcc, args.batch_size)
+
+    print(f"chunks:            {args.chunks}")
+    print(f"per-chunk predict: {args.chunks / before_time:10.1f} chunks/sec ({before_time:.3f}s)")
+    print(f"batched predict:   {args.chunks / after_time:10.1f} chunks/sec ({after_time:.3f}s, batch size {args.batch_size})")
+    print(f"speedup:           {before_time / after_time:10.1f}x")
+    print(f"argmax agreement:  {np.mean(before.argmax(axis=1) == after.argmax(axis=1)) * 100:.2f}%")
+    print(f"max |diff|:        {np.max(np.abs(before - after)):.2e}")
+
+
+if __name__ == "__main__":
+    main()
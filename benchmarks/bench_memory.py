@@ -0,0 +1,97 @@
+"""
+Report peak resident memory of keyword detection on a long recording.
+
+A synthetic 16-bit PCM WAV at the model sample rate is written once, then each
+mode runs in a fresh interpreter: `mapped` passes the path, so the file is
+memory-mapped and decoded window by window; `decoded` passes an open file
+object, which forces the whole recording to be decoded into memory first.
+Run from the repository root:
+
+    python -m benchmarks.bench_memory test/test.wav --hours 2
+    python -m benchmarks.bench_memory test/test.wav --hours 2 --hop 0.25
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def write_recording(speech_path, hours, path, sample_rate):
+    """Tile a speech file into an `hours`-long 16-bit WAV, written block by block."""
+    import librosa
+    import soundfile as sf
+
+    speech, _ = librosa.load(speech_path, sr=sample_rate)
+    block = np.tile(speech, int(np.ceil(600 * sample_rate / len(speech))))[:600 * sample_rate]  # 10 minutes
+    remaining = int(hours * 3600 * sample_rate)
+    with sf.SoundFile(path, "w", sample_rate, 1, subtype="PCM_16") as out:
+        while remaining > 0:
+            out.write(block[:remaining])
+            remaining -= len(block)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss is in KB on Linux
+
+
+def measure(file_path, mode, hop_seconds):
+    """Run one prediction in this (fresh) process and return memory and timing figures."""
+    from scripts.detect import KeywordSpottingService
+
+    kss = KeywordSpottingService()
+    kss.warmup(background=False)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    if mode == "mapped":
+        predictions = kss.predict(file_path, hop_seconds=hop_seconds)
+    else:
+        with open(file_path, "rb") as fp:
+            predictions = kss.predict(fp, hop_seconds=hop_seconds)
+    elapsed = time.perf_counter() - start
+
+    peak = peak_rss_mb()
+    return {"baseline_mb": baseline, "peak_mb": peak, "seconds": elapsed, "detections": len(predictions)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS of detection on a long recording, memory-mapped vs decoded.")
+    parser.add_argument("speech_path", nargs="?", default="test/test.wav")
+    parser.add_argument("--hours", type=float, default=2.0, help="Length of the synthetic recording")
+    parser.add_argument("--hop", type=float, help="Sliding-window hop in seconds (default: non-overlapping chunks)")
+    parser.add_argument("--child", nargs=2, metavar=("FILE", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(*args.child, args.hop)))
+        return
+
+    from scripts.model_metadata import load_model_metadata
+    from scripts.audio import MODEL_SAMPLE_RATE
+    from scripts.detect import SAVED_MODEL_PATH
+
+    sample_rate = load_model_metadata(SAVED_MODEL_PATH).get("sample_rate", MODEL_SAMPLE_RATE)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "long.wav")
+        write_recording(args.speech_path, args.hours, path, sample_rate)
+        print(f"Recording: {args.hours:.1f}h at {sample_rate}Hz, {os.path.getsize(path) / 1024 ** 2:.0f} MB on disk")
+
+        print(f"{'mode':<10}{'baseline (MB)':>15}{'peak (MB)':>12}{'added (MB)':>12}{'seconds':>10}{'detections':>12}")
+        for mode in ("decoded", "mapped"):
+            command = [sys.executable, "-m", "benchmarks.bench_memory", "--child", path, mode]
+            if args.hop:
+                command += ["--hop", str(args.hop)]
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:<10}{result['baseline_mb']:>15.0f}{result['peak_mb']:>12.0f}"
+                  f"{result['peak_mb'] - result['baseline_mb']:>12.0f}{result['seconds']:>10.1f}{result['detections']:>12}")
+
+
+if __name__ == "__main__":
+    main()
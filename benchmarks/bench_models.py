@@ -0,0 +1,112 @@
+"""
+Params, FLOPs, per-chunk CPU latency and accuracy of the compact architectures, for picking one by latency budget.
+
+Each variant in `scripts.compact_models.ARCHITECTURES` is distilled from the
+teacher (the current `models/model.keras` by default) by running
+`scripts/train.py --architecture <variant> --teacher <teacher>` in a fresh
+process, then measured next to the teacher on the feature store's test split.
+Latency is measured through the detection service's Keras backend: one chunk
+per call (real-time use), and per chunk within INFERENCE_BATCH_SIZE batches
+(file analysis), also shown as how many times faster than real time that is.
+Run from the repository root after training the teacher:
+
+    python -m benchmarks.bench_models
+    python -m benchmarks.bench_models --variants ds_cnn_s res_tiny --epochs 20 --budget-ms 0.8
+    python -m benchmarks.bench_models --skip-training  # re-measure models already in --output-dir
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from scripts import train as training
+from scripts.compact_models import ARCHITECTURES, count_flops
+from scripts.detect import CHUNK_SECONDS, INFERENCE_BATCH_SIZE, KerasBackend
+
+
+def latency_ms(backend, batch, runs):
+    """Median wall time of `runs` predictions of `batch`, in ms, after a warmup."""
+    for _ in range(10):
+        backend.predict(batch)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        backend.predict(batch)
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+
+def measure(model_path, test_data, runs):
+    """Size, cost, latency and test accuracy of one saved model."""
+    backend = KerasBackend(model_path)
+    _, num_frames, num_mfcc, _ = backend.input_shape
+    batch = np.random.default_rng(0).normal(0, 50, (INFERENCE_BATCH_SIZE, num_frames, num_mfcc, 1))
+    batch = batch.astype(np.float32)
+
+    correct = total = 0
+    for features, labels in test_data:
+        correct += int(np.sum(np.argmax(backend.predict(features.numpy()), axis=-1) == labels.numpy()))
+        total += len(labels)
+
+    batched_ms = latency_ms(backend, batch, max(1, runs // 10)) / INFERENCE_BATCH_SIZE
+    return {
+        "params": backend.model.count_params(),
+        "flops": count_flops(backend.model),
+        "chunk_ms": latency_ms(backend, batch[:1], runs),
+        "batched_chunk_ms": batched_ms,
+        "real_time": 1000 * CHUNK_SECONDS / batched_ms,
+        "accuracy": correct / total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report params, FLOPs, latency and accuracy of compact models.")
+    parser.add_argument("--teacher", default=training.SAVED_MODEL_PATH, help="Trained model to distill from")
+    parser.add_argument("--variants", nargs="+", default=list(ARCHITECTURES), choices=list(ARCHITECTURES))
+    parser.add_argument("--output-dir", default="models/compact", help="Where distilled models are saved")
+    parser.add_argument("--epochs", type=int, help="Maximum distillation epochs (train.EPOCHS by default)")
+    parser.add_argument("--skip-training", action="store_true", help="Measure models already in --output-dir")
+    parser.add_argument("--runs", type=int, default=500, help="Single-chunk latency samples")
+    parser.add_argument("--budget-ms", type=float,
+                        help="Pick the most accurate model within this single-chunk latency")
+    args = parser.parse_args()
+
+    paths = {"teacher": args.teacher}
+    for name in args.variants:
+        paths[name] = os.path.join(args.output_dir, f"{name}.keras")
+        if args.skip_training:
+            continue
+        print(f"Distilling {name}...", flush=True)
+        command = [sys.executable, "-m", "scripts.train", "--architecture", name, "--teacher", args.teacher,
+                   "--output", paths[name]]
+        if args.epochs:
+            command += ["--epochs", str(args.epochs)]
+        process = subprocess.run(command, capture_output=True, text=True)
+        if process.returncode != 0:
+            sys.exit(f"Training {name} failed:\n{process.stderr[-2000:]}")
+
+    _, _, test_data, _, _ = training.prepare_datasets(training.DATA_PATH)
+    results = {name: measure(path, test_data, args.runs) for name, path in paths.items()}
+
+    teacher = results["teacher"]
+    print(f"\n{'model':<13}{'params':>9}{'MFLOPs':>8}{'chunk (ms)':>12}{'batched (ms)':>14}{'x real time':>13}"
+          f"{'speedup':>9}{'accuracy':>10}")
+    for name, result in sorted(results.items(), key=lambda item: item[1]["chunk_ms"]):
+        print(f"{name:<13}{result['params']:>9}{result['flops'] / 1e6:>8.2f}{result['chunk_ms']:>12.3f}"
+              f"{result['batched_chunk_ms']:>14.4f}{result['real_time']:>13.0f}"
+              f"{teacher['batched_chunk_ms'] / result['batched_chunk_ms']:>8.2f}x{result['accuracy']:>10.3f}")
+
+    if args.budget_ms is not None:
+        within = [name for name, result in results.items() if result["chunk_ms"] <= args.budget_ms]
+        if not within:
+            print(f"No model runs a chunk within {args.budget_ms}ms")
+            sys.exit(1)
+        best = max(within, key=lambda name: results[name]["accuracy"])
+        print(f"Most accurate within {args.budget_ms}ms per chunk: {best} ({paths[best]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Break down time-to-first-prediction of the keyword spotting service by phase.
+
+Each run happens in a fresh interpreter so imports are cold. Run from the
+repository root:
+
+    python -m benchmarks.bench_startup test/test.wav
+    python -m benchmarks.bench_startup test/test.wav --no-warmup
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+
+def measure_phases(file_path, warmup):
+    """Time each startup phase in the current (fresh) process."""
+    phases = []
+    start = last = time.perf_counter()
+
+    def mark(name):
+        nonlocal last
+        now = time.perf_counter()
+        phases.append((name, now - last))
+        last = now
+
+    from scripts.detect import Keyword_Spotting_Service
+    mark("import scripts.detect")
+
+    import tensorflow  # noqa: F401
+    mark("import tensorflow")
+
+    import librosa  # noqa: F401
+    mark("import librosa")
+
+    kss = Keyword_Spotting_Service()
+    mark("load model + mapping")
+
+    if warmup:
+        kss.warmup(background=False)
+        mark("warmup (trace graph)")
+
+    kss.predict(file_path)
+    mark("first predict")
+    phases.append(("time to first prediction", last - start))
+
+    kss.predict(file_path)
+    mark("second predict (steady state)")
+    return phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup phase breakdown for KeywordSpottingService.")
+    parser.add_argument("file_path", nargs="?", default="test/test.wav")
+    parser.add_argument("--no-warmup", action="store_true", help="Skip the explicit warmup phase")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_phases(args.file_path, not args.no_warmup)))
+        return
+
+    command = [sys.executable, "-m", "benchmarks.bench_startup", args.file_path, "--child"]
+    if args.no_warmup:
+        command.append("--no-warmup")
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+
+    for name, seconds in phases:
+        print(f"{name:<32}{seconds * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Reproducible end-to-end benchmark suite for the detect / prepare / train pipeline.
+
+`run` synthesizes seeded recordings of tone bursts over background noise and
+measures, writing everything to one JSON file:
+
+  predict_<length>   `KeywordSpottingService.predict`, each length in a fresh process:
+                     real-time factor, chunks/sec, p50/p99 call latency, peak RSS
+  preprocess         `preprocess_dataset` files/sec on a synthetic clip dataset, with a cold PCM cache
+  train              `train.train` samples/sec on synthetic MFCCs
+
+`compare` checks a new results file against a baseline and exits non-zero if any
+metric got worse by more than the threshold. Run from the repository root:
+
+    python -m benchmarks.bench_suite run --lengths 10s,5m,1h --output bench.json
+    python -m benchmarks.bench_suite compare baseline.json bench.json --threshold 0.1
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Metric -> True if higher is better; metrics not listed are informational
+METRIC_DIRECTIONS = {
+    "real_time_factor": False,
+    "chunks_per_sec": True,
+    "latency_p50_ms": False,
+    "latency_p99_ms": False,
+    "peak_rss_mb": False,
+    "files_per_sec": True,
+    "samples_per_sec": True,
+}
+REGRESSION_THRESHOLD = 0.10  # Relative slowdown flagged by `compare`
+SYNTH_BLOCK_SECONDS = 600  # Synthetic recordings are generated and written in blocks of this length
+
+
+def parse_duration(text):
+    """Parse '90', '90s', '5m' or '2h' into seconds."""
+    units = {"s": 1, "m": 60, "h": 3600}
+    if text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def synthesize_signal(seconds, sample_rate, seed=0):
+    """
+    Seeded float32 signal of random tone bursts over low-level noise.
+
+    Bursts are 0.2-0.6s sine tones between 200Hz and 3kHz with Hann envelopes,
+    about one per second, at roughly -20dBFS over -45dBFS white noise.
+    """
+    rng = np.random.default_rng(seed)
+    num_samples = int(seconds * sample_rate)
+    signal = rng.normal(0, 10 ** (-45 / 20), num_samples).astype(np.float32)
+
+    for start in rng.uniform(0, max(seconds - 0.6, 0), int(seconds)):
+        length = int(rng.uniform(0.2, 0.6) * sample_rate)
+        begin = int(start * sample_rate)
+        t = np.arange(min(length, num_samples - begin)) / sample_rate
+        tone = np.sin(2 * np.pi * rng.uniform(200, 3000) * t) * np.hanning(length)[:len(t)]
+        signal[begin:begin + len(t)] += 0.1 * tone.astype(np.float32)
+    return np.clip(signal, -1, 1)
+
+
+def write_recording(path, seconds, sample_rate, seed=0):
+    """Write a synthetic 16-bit WAV block by block so hour-long recordings stay out of memory."""
+    import soundfile as sf
+
+    with sf.SoundFile(path, "w", sample_rate, 1, subtype="PCM_16") as out:
+        for index, start in enumerate(np.arange(0, seconds, SYNTH_BLOCK_SECONDS)):
+            out.write(synthesize_signal(min(SYNTH_BLOCK_SECONDS, seconds - start), sample_rate, seed + index))
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss is in KB on Linux
+
+
+def bench_predict(file_path, repeats, hop_seconds=None):
+    """Time `predict` on one recording in this (fresh) process."""
+    from scripts.detect import KeywordSpottingService
+
+    kss = KeywordSpottingService()  # No probability cache, so every repeat does the full work
+    kss.warmup(background=False)
+    baseline = peak_rss_mb()
+    kss.stats.reset()
+
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        kss.predict(file_path, hop_seconds=hop_seconds)
+        latencies.append(time.perf_counter() - start)
+
+    counters = kss.stats.snapshot()["counters"]
+    audio_seconds = counters.get("audio_seconds", 0.0) / repeats
+    total = sum(latencies)
+    return {
+        "audio_seconds": audio_seconds,
+        "real_time_factor": np.mean(latencies) / audio_seconds,
+        "chunks_per_sec": counters.get("windows", 0) / total,
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "peak_rss_mb": peak_rss_mb(),
+        "baseline_rss_mb": baseline,
+    }
+
+
+def bench_preprocess(directory, num_labels, clips_per_label, sample_rate):
+    """
+    Time `preprocess_dataset` on a synthetic dataset of one-second clips.
+
+    The PCM cache lives in `directory`, so every run decodes from scratch instead of
+    reading clips cached by an earlier run in the working directory.
+    """
+    import soundfile as sf
+    from scripts.prepare_dataset import preprocess_dataset
+
+    dataset_path = os.path.join(directory, "dataset")
+    for label in range(num_labels):
+        label_path = os.path.join(dataset_path, f"label_{label}")
+        os.makedirs(label_path)
+        for clip in range(clips_per_label):
+            signal = synthesize_signal(1.0, sample_rate, seed=label * clips_per_label + clip)
+            sf.write(os.path.join(label_path, f"{clip}.wav"), signal, sample_rate, subtype="PCM_16")
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        preprocess_dataset(dataset_path, os.path.join(directory, "features"),
+                           pcm_cache_dir=os.path.join(directory, "pcm_cache"))
+    elapsed = time.perf_counter() - start
+
+    files = num_labels * clips_per_label
+    return {"files": files, "seconds": elapsed, "files_per_sec": files / elapsed}
+
+
+def bench_train(num_samples, epochs, batch_size, seed=0):
+    """Time `train.train` on synthetic MFCC-shaped inputs; the first (tracing) epoch is excluded."""
+    import tensorflow as tf
+    from scripts import train as training
+
+    class EpochTimer(tf.keras.callbacks.Callback):
+        def on_train_begin(self, logs=None):
+            self.durations = []
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self.start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            self.durations.append(time.perf_counter() - self.start)
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 50, (num_samples, 44, 13, 1)).astype(np.float32)
+    y = rng.integers(0, 2, num_samples)
+    split = int(num_samples * 0.8)
+
+    timer = EpochTimer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = training.build_model(X.shape[1:])
+        training.train(model, epochs, batch_size, epochs, X[:split], y[:split], X[split:], y[split:], [timer])
+
+    steady = timer.durations[1:] or timer.durations
+    return {
+        "samples": split,
+        "epochs": len(timer.durations),
+        "first_epoch_seconds": timer.durations[0],
+        "samples_per_sec": float(split / np.mean(steady)),
+    }
+
+
+def environment():
+    """Host and library versions recorded with every run."""
+    import librosa
+    import tensorflow as tf
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "librosa": librosa.__version__,
+        "tensorflow": tf.__version__,
+    }
+
+
+def run(args):
+    from scripts.audio import MODEL_SAMPLE_RATE
+    from scripts.detect import SAVED_MODEL_PATH
+    from scripts.model_metadata import load_model_metadata
+
+    sample_rate = load_model_metadata(SAVED_MODEL_PATH).get("sample_rate", MODEL_SAMPLE_RATE)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for length in args.lengths.split(","):
+            path = os.path.join(directory, f"synthetic_{length}.wav")
+            write_recording(path, parse_duration(length), sample_rate, args.seed)
+
+            # A fresh interpreter per length, so peak RSS belongs to that recording alone
+            command = [sys.executable, "-m", "benchmarks.bench_suite", "child", path, "--repeats", str(args.repeats)]
+            if args.hop:
+                command += ["--hop", str(args.hop)]
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            results[f"predict_{length}"] = json.loads(output.strip().splitlines()[-1])
+            print(f"predict_{length}: {results[f'predict_{length}']}", file=sys.stderr)
+
+        if not args.skip_preprocess:
+            results["preprocess"] = bench_preprocess(directory, args.labels, args.clips_per_label, sample_rate)
+            print(f"preprocess: {results['preprocess']}", file=sys.stderr)
+
+    if not args.skip_train:
+        results["train"] = bench_train(args.train_samples, args.train_epochs, args.batch_size, args.seed)
+        print(f"train: {results['train']}", file=sys.stderr)
+
+    report = {"environment": environment(), "config": vars(args), "results": results}
+    with open(args.output, "w") as fp:
+        json.dump(report, fp, indent=4, default=float)
+    print(f"Wrote {args.output}")
+
+
+def compare(baseline_path, current_path, threshold=REGRESSION_THRESHOLD):
+    """
+    Print every shared metric side by side and flag those that got worse by more than `threshold`.
+
+    Returns:
+        list: (benchmark, metric, baseline, current, relative change) of each regression
+    """
+    with open(baseline_path, "r") as fp:
+        baseline = json.load(fp)["results"]
+    with open(current_path, "r") as fp:
+        current = json.load(fp)["results"]
+
+    regressions = []
+    print(f"{'benchmark':<20}{'metric':<20}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name in sorted(set(baseline) & set(current)):
+        for metric, higher_is_better in METRIC_DIRECTIONS.items():
+            if metric not in baseline[name] or metric not in current[name]:
+                continue
+            old, new = baseline[name][metric], current[name][metric]
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                regressions.append((name, metric, old, new, change))
+                flag = "  REGRESSION"
+            print(f"{name:<20}{metric:<20}{old:>14.4g}{new:>14.4g}{change * 100:>+9.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite for the keyword spotting pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite and write a JSON results file")
+    run_parser.add_argument("--lengths", default="10s,60s,10m", help="Comma-separated recording lengths, e.g. 30s,5m,2h")
+    run_parser.add_argument("--repeats", type=int, default=5, help="predict calls per recording length")
+    run_parser.add_argument("--hop", type=float, help="Sliding-window hop in seconds (default: non-overlapping chunks)")
+    run_parser.add_argument("--labels", type=int, default=4, help="Labels in the synthetic preprocessing dataset")
+    run_parser.add_argument("--clips-per-label", type=int, default=50)
+    run_parser.add_argument("--train-samples", type=int, default=4000)
+    run_parser.add_argument("--train-epochs", type=int, default=3)
+    run_parser.add_argument("--batch-size", type=int, default=32)
+    run_parser.add_argument("--skip-preprocess", action="store_true")
+    run_parser.add_argument("--skip-train", action="store_true")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", default="bench_results.json")
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions between two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                                help="Relative change counted as a regression")
+
+    child_parser = commands.add_parser("child")
+    child_parser.add_argument("file_path")
+    child_parser.add_argument("--repeats", type=int, default=5)
+    child_parser.add_argument("--hop", type=float)
+
+    args = parser.parse_args()
+    if args.command == "child":
+        print(json.dumps(bench_predict(args.file_path, args.repeats, args.hop), default=float))
+    elif args.command == "run":
+        run(args)
+    else:
+        regressions = compare(args.baseline, args.current, args.threshold)
+        print(f"\n{len(regressions)} regression(s) above {args.threshold * 100:.0f}%")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Training throughput and accuracy of the CPU throughput options in `scripts.train`.
+
+Each configuration trains `train.build_model` from scratch on the same
+synthetic MFCC-shaped dataset in a fresh interpreter, since thread pool sizes
+and the precision policy are fixed once TensorFlow starts. Steady-state
+samples/sec excludes the first epoch, which includes tracing and XLA compilation.
+Exits with status 1 if any configuration's test accuracy falls more than
+`--tolerance` below the baseline. Run from the repository root:
+
+    python -m benchmarks.bench_training
+    python -m benchmarks.bench_training --epochs 8 --samples 16000 --tolerance 0.02
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+# name -> (batch_size, intra_op_threads, inter_op_threads, jit_compile, mixed_precision)
+CONFIGS = {
+    "baseline": (32, 0, 0, False, False),
+    "threads": (32, os.cpu_count(), 2, False, False),
+    "xla": (32, 0, 0, True, False),
+    "bf16": (32, 0, 0, False, True),
+    "batch256": (256, 0, 0, False, False),
+    "all": (256, os.cpu_count(), 2, True, True),
+}
+ACCURACY_TOLERANCE = 0.03  # Allowed absolute test accuracy drop below the baseline
+
+
+def synthetic_dataset(num_samples, seed=0):
+    """Two classes of (44, 13, 1) MFCC-like inputs that differ by a faint template, so accuracy is not trivial."""
+    rng = np.random.default_rng(seed)
+    templates = rng.normal(0, 10, (2, 44, 13, 1)).astype(np.float32)
+    y = rng.integers(0, 2, num_samples)
+    X = rng.normal(0, 50, (num_samples, 44, 13, 1)).astype(np.float32) + templates[y]
+    return X, y
+
+
+def measure(name, num_samples, epochs, seed):
+    """Train one configuration in this (fresh) process and return its figures."""
+    batch_size, intra_op_threads, inter_op_threads, jit_compile, mixed_precision = CONFIGS[name]
+
+    from scripts import train as training
+
+    training.configure_threads(intra_op_threads, inter_op_threads)
+    bf16 = training.enable_mixed_precision() if mixed_precision else False
+
+    import tensorflow as tf
+    tf.keras.utils.set_random_seed(seed)
+
+    X, y = synthetic_dataset(num_samples, seed)
+    test_split, validation_split = int(num_samples * 0.8), int(num_samples * 0.65)
+    X_train, y_train = X[:validation_split], y[:validation_split]
+
+    monitor = training.ThroughputMonitor(len(X_train), verbose=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = training.build_model(X.shape[1:], learning_rate=training.scaled_learning_rate(batch_size),
+                                     jit_compile=jit_compile)
+        training.train(model, epochs, batch_size, epochs, X_train, y_train, X[validation_split:test_split],
+                       y[validation_split:test_split], [monitor])
+    _, accuracy = model.evaluate(X[test_split:], y[test_split:], verbose=0)
+
+    steady = monitor.epoch_seconds[1:] or monitor.epoch_seconds
+    return {
+        "batch_size": batch_size,
+        "bf16": bf16,
+        "first_epoch_seconds": monitor.epoch_seconds[0],
+        "epoch_seconds": float(np.mean(steady)),
+        "samples_per_sec": float(len(X_train) / np.mean(steady)),
+        "test_accuracy": float(accuracy),
+    }
+
+
+def run_config(name, num_samples, epochs, seed):
+    """Run `measure` for one configuration in a fresh interpreter and return its figures."""
+    command = [sys.executable, "-m", "benchmarks.bench_training", "--child", name, "--samples", str(num_samples),
+               "--epochs", str(epochs), "--seed", str(seed)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Samples/sec and accuracy of CPU training throughput options.")
+    parser.add_argument("--samples", type=int, default=8000, help="Synthetic samples, split 65/15/20")
+    parser.add_argument("--epochs", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=ACCURACY_TOLERANCE, help="Allowed absolute test accuracy drop")
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=list(CONFIGS))
+    parser.add_argument("--child", metavar="CONFIG", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.samples, args.epochs, args.seed)))
+        return
+
+    configs = ["baseline"] + [name for name in args.configs if name != "baseline"]
+    print(f"{'config':<10}{'batch':>7}{'bf16':>6}{'1st epoch (s)':>15}{'epoch (s)':>11}"
+          f"{'samples/sec':>13}{'speedup':>9}{'accuracy':>10}")
+    results = {}
+    for name in configs:
+        result = results[name] = run_config(name, args.samples, args.epochs, args.seed)
+        speedup = result["samples_per_sec"] / results["baseline"]["samples_per_sec"]
+        print(f"{name:<10}{result['batch_size']:>7}{'yes' if result['bf16'] else 'no':>6}"
+              f"{result['first_epoch_seconds']:>15.2f}{result['epoch_seconds']:>11.2f}"
+              f"{result['samples_per_sec']:>13.0f}{speedup:>8.2f}x{result['test_accuracy']:>10.3f}", flush=True)
+
+    baseline = results["baseline"]["test_accuracy"]
+    failed = [name for name, result in results.items() if result["test_accuracy"] < baseline - args.tolerance]
+    if failed:
+        print(f"Accuracy more than {args.tolerance} below baseline ({baseline:.3f}): {', '.join(failed)}")
+        sys.exit(1)
+    print(f"All configurations within {args.tolerance} of baseline accuracy ({baseline:.3f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Measure voice-activity gating on a synthetic dispatch recording.
+
+The recording repeats a speech file with stretches of hold-time silence and
+low-level line noise in between. Speech segments start on chunk boundaries,
+so every window that contains clear speech (a 20ms RMS peak of at least
+SPEECH_PEAK_DB) must be kept by the gate with its prediction unchanged; the
+script exits with status 1 if it is not. Run from the repository root:
+
+    python -m benchmarks.bench_vad test/test.wav --gap-seconds 20 --repeats 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+from scripts.detect import SAMPLES_TO_CONSIDER, KeywordSpottingService
+
+SPEECH_PEAK_DB = -35.0  # Reference labelling: windows peaking above this contain speech
+
+
+def synthesize_recording(speech_path, gap_seconds, repeats, noise_db, seed=0):
+    """Return a 22050Hz signal alternating chunk-aligned speech with noisy gaps."""
+    speech, sample_rate = librosa.load(speech_path, sr=22050)
+    # Round speech and gaps up to whole chunks so speech always starts on a chunk boundary
+    speech = np.pad(speech, (0, -len(speech) % SAMPLES_TO_CONSIDER))
+    gap_length = int(np.ceil(gap_seconds)) * SAMPLES_TO_CONSIDER
+
+    rng = np.random.default_rng(seed)
+    noise_amplitude = 10 ** (noise_db / 20)
+    parts = []
+    for _ in range(repeats):
+        parts.append(rng.normal(0, noise_amplitude, gap_length).astype(np.float32))
+        parts.append(speech)
+    return np.concatenate(parts), sample_rate
+
+
+def reference_speech_windows(signal, sample_rate, window_hop, num_windows):
+    """Label windows as speech when their loudest 20ms frame reaches SPEECH_PEAK_DB."""
+    frame_length = int(0.02 * sample_rate)
+    rms_db = librosa.amplitude_to_db(
+        librosa.feature.rms(y=signal, frame_length=frame_length, hop_length=frame_length, center=False)[0], ref=1.0
+    )
+    labels = np.zeros(num_windows, dtype=bool)
+    for i in range(num_windows):
+        start = int(round(i * window_hop * sample_rate)) // frame_length
+        end = (int(round(i * window_hop * sample_rate)) + SAMPLES_TO_CONSIDER) // frame_length
+        labels[i] = end > start and rms_db[start:end].max(initial=-np.inf) >= SPEECH_PEAK_DB
+    return labels
+
+
+def time_call(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice-activity gating speedup and detection check.")
+    parser.add_argument("speech_file", nargs="?", default="test/test.wav")
+    parser.add_argument("--gap-seconds", type=float, default=20.0, help="Silence/noise between speech segments")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--noise-db", type=float, default=-60.0, help="Line noise level in dBFS")
+    parser.add_argument("--hop", type=float, help="Sliding-window hop in seconds (default: chunks)")
+    args = parser.parse_args()
+
+    signal, sample_rate = synthesize_recording(args.speech_file, args.gap_seconds, args.repeats, args.noise_db)
+    kss = KeywordSpottingService()
+    kss.warmup(background=False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "dispatch.wav")
+        sf.write(file_path, signal, sample_rate)
+
+        predict = kss.predict
+        options = dict(confidence_threshold=0.5, min_detections=1, hop_seconds=args.hop)
+        baseline, baseline_time = time_call(predict, file_path, vad=False, **options)
+        gated, gated_time = time_call(predict, file_path, vad=True, **options)
+
+        baseline_probs, window_hop = kss._window_probabilities(file_path, args.hop, vad=False)
+        gated_probs, _ = kss._window_probabilities(file_path, args.hop, vad=True)
+
+    kept = ~np.isnan(gated_probs[:, 0])
+    speech = reference_speech_windows(signal, sample_rate, window_hop, len(baseline_probs))
+    speech_kept = kept[speech].mean() if speech.any() else 1.0
+    unchanged = (
+        np.array_equal(baseline_probs[speech].argmax(axis=1), gated_probs[speech].argmax(axis=1))
+        and np.allclose(baseline_probs[speech], gated_probs[speech], atol=1e-5)
+    )
+
+    print(f"audio:                     {len(signal) / sample_rate:.1f}s, {len(baseline_probs)} windows "
+          f"({speech.sum()} with speech)")
+    print(f"windows skipped:           {1 - kept.mean():.1%}")
+    print(f"predict without VAD:       {baseline_time:.3f}s ({len(baseline)} detections)")
+    print(f"predict with VAD:          {gated_time:.3f}s ({len(gated)} detections)")
+    print(f"end-to-end speedup:        {baseline_time / gated_time:.2f}x")
+    print(f"speech windows kept:       {speech_kept:.1%}")
+    print(f"speech predictions same:   {unchanged}")
+    if speech_kept < 1.0 or not unchanged:
+        sys.exit("VAD dropped or changed the prediction of a speech window")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import os
+import threading
 from scripts.detect import Keyword_Spotting_Service
 
+def preload_service():
+    """Load the model and warm it up in the background so the first detection is fast."""
+    try:
+        Keyword_Spotting_Service().warmup(background=False)
+    except Exception:
+        pass  # detect_keywords reports the error when the user runs a detection
+
 def browse_wav_file():
     """Allow the user to select a WAV file."""
     file_path = filedialog.askopenfilename(
@@ -38,6 +46,9 @@ def detect_keywords():
     except Exception as e:
         messagebox.showerror("Error", f"An error occurred:\n{str(e)}")
 
+# Start loading the model while the window opens
+threading.Thread(target=preload_service, daemon=True).start()
+
 # Create the main application window
 detect_ui = tk.Tk()
 detect_ui.title("Keyword Spotting")
@@ -0,0 +1,273 @@
+import mmap
+import os
+import struct
+import wave
+
+import numpy as np
+
+from scripts import instrumentation
+
+MODEL_SAMPLE_RATE = 22050  # Rate used when a model or dataset does not record its own
+DEFAULT_RESAMPLER = "soxr_hq"  # Same quality librosa.load uses, so features match training
+MAPPED_RELEASE_BYTES = 16 * 1024 ** 2  # Mapped pages behind a forward scan are released in steps of this size
+
+
+def _soxr(quality):
+    def resample(signal, orig_sr, target_sr):
+        import soxr
+        return soxr.resample(signal, orig_sr, target_sr, quality=quality)
+    return resample
+
+
+def _polyphase(signal, orig_sr, target_sr):
+    from math import gcd
+    from scipy.signal import resample_poly
+
+    divisor = gcd(int(orig_sr), int(target_sr))
+    return resample_poly(signal, int(target_sr) // divisor, int(orig_sr) // divisor).astype(signal.dtype)
+
+
+# Resampler name -> fn(signal, orig_sr, target_sr). Add entries to plug in others.
+RESAMPLERS = {
+    "soxr_hq": _soxr("soxr_hq"),
+    "soxr_mq": _soxr("soxr_mq"),
+    "soxr_lq": _soxr("soxr_lq"),
+    "polyphase": _polyphase,
+}
+
+
+def read_wav(file_path):
+    """
+    Decode an integer PCM WAV file directly with the standard library.
+
+    Samples are scaled to float32 in [-1, 1) exactly as soundfile does, and
+    multi-channel audio is averaged to mono.
+
+    Args:
+        file_path (str or file-like): WAV file
+
+    Returns:
+        tuple: (float32 mono signal, native sample rate)
+
+    Raises:
+        wave.Error: If the file is not an integer PCM WAV (e.g. float or compressed)
+    """
+    with wave.open(file_path, "rb") as wav:
+        num_channels = wav.getnchannels()
+        sample_width = wav.getsampwidth()
+        sample_rate = wav.getframerate()
+        data = wav.readframes(wav.getnframes())
+
+    if sample_width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768
+    elif sample_width == 3:
+        # Sign-extend packed 24-bit samples into int32
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        samples = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+        samples = np.where(samples >= 1 << 23, samples - (1 << 24), samples).astype(np.float32) / (1 << 23)
+    elif sample_width == 4:
+        samples = (np.frombuffer(data, dtype="<i4").astype(np.float64) / (1 << 31)).astype(np.float32)
+    else:
+        raise wave.Error(f"Unsupported sample width: {sample_width} bytes")
+
+    if num_channels > 1:
+        samples = samples.reshape(-1, num_channels).mean(axis=1)
+    return samples, sample_rate
+
+
+def read_wav_header(file_path):
+    """
+    Locate the PCM samples of a WAV file without reading them.
+
+    Args:
+        file_path (str): WAV file
+
+    Returns:
+        dict: sample_rate, num_channels, sample_width (bytes), data_offset and num_frames
+
+    Raises:
+        wave.Error: If the file is not a RIFF/WAVE file with integer PCM samples
+    """
+    with open(file_path, "rb") as fp:
+        riff, _, wave_id = struct.unpack("<4sI4s", fp.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise wave.Error("Not a RIFF/WAVE file")
+
+        header = None
+        while True:
+            chunk = fp.read(8)
+            if len(chunk) < 8:
+                raise wave.Error("No data chunk")
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk)
+
+            if chunk_id == b"fmt ":
+                fmt = fp.read(chunk_size)
+                audio_format, num_channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+                if audio_format == 0xFFFE and len(fmt) >= 26:  # WAVE_FORMAT_EXTENSIBLE: real format in the sub-GUID
+                    audio_format = struct.unpack("<H", fmt[24:26])[0]
+                if audio_format != 1:
+                    raise wave.Error(f"Unsupported WAV format tag: {audio_format}")
+                header = {"sample_rate": sample_rate, "num_channels": num_channels, "sample_width": bits // 8}
+                fp.seek(chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if header is None:
+                    raise wave.Error("data chunk before fmt chunk")
+                # Writers that stream to disk may leave the size unset; trust the file length instead
+                data_offset = fp.tell()
+                available = os.fstat(fp.fileno()).st_size - data_offset
+                frame_size = header["sample_width"] * header["num_channels"]
+                header["data_offset"] = data_offset
+                header["num_frames"] = min(chunk_size, available) // frame_size
+                return header
+            else:
+                fp.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+class MappedWav:
+    """Memory-mapped PCM WAV file that behaves like a read-only float32 mono signal.
+
+    `len()` gives the number of samples and slicing returns a float32 array, decoded
+    from the mapped integer PCM only for the requested range. Scanning a long
+    recording in windows therefore keeps just one window resident at a time;
+    pages behind the furthest slice start are handed back to the kernel as the
+    scan moves forward. Values are identical to `read_wav`.
+    """
+
+    _DTYPES = {1: np.uint8, 2: np.dtype("<i2"), 4: np.dtype("<i4")}
+
+    def __init__(self, file_path):
+        header = read_wav_header(file_path)
+        if header["sample_width"] not in self._DTYPES:
+            raise wave.Error(f"Cannot memory-map {header['sample_width'] * 8}-bit samples")
+
+        self.file_path = file_path
+        self.sample_rate = header["sample_rate"]
+        self.num_channels = header["num_channels"]
+        self.sample_width = header["sample_width"]
+        self._data_offset = header["data_offset"]
+        self._frame_bytes = self.sample_width * self.num_channels
+        self._released = 0  # Byte offset below which mapped pages were released
+
+        shape = (header["num_frames"], self.num_channels)
+        self._mmap = None
+        if header["num_frames"] == 0:
+            self._pcm = np.zeros(shape, dtype=self._DTYPES[self.sample_width])
+        else:
+            with open(file_path, "rb") as fp:
+                self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            self._pcm = np.frombuffer(
+                self._mmap, dtype=self._DTYPES[self.sample_width], count=shape[0] * shape[1],
+                offset=self._data_offset
+            ).reshape(shape)
+
+    def __len__(self):
+        return len(self._pcm)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("MappedWav only supports slicing")
+
+        with instrumentation.stage("decode"):
+            pcm = self._pcm[index]
+            self._release_before(index.indices(len(self))[0])
+            if self.sample_width == 1:
+                samples = (pcm.astype(np.float32) - 128) / 128
+            elif self.sample_width == 2:
+                samples = pcm.astype(np.float32) / 32768
+            else:
+                samples = (pcm.astype(np.float64) / (1 << 31)).astype(np.float32)
+
+            if self.num_channels > 1:
+                return samples.mean(axis=1)
+            return samples[:, 0]
+
+    def _release_before(self, frame):
+        """Drop mapped pages wholly before `frame` from this process's resident set; re-reads fault them back in."""
+        if self._mmap is None or not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        end = (self._data_offset + frame * self._frame_bytes) // mmap.PAGESIZE * mmap.PAGESIZE
+        if end < self._released:
+            self._released = end  # A new scan started further back, e.g. MFCC after voice-activity detection
+        elif end - self._released >= MAPPED_RELEASE_BYTES:
+            self._mmap.madvise(mmap.MADV_DONTNEED, self._released, end - self._released)
+            self._released = end
+
+
+def resample(signal, orig_sr, target_sr, res_type=DEFAULT_RESAMPLER):
+    """
+    Resample a mono signal, or return it untouched when the rates already match.
+
+    The output length is fixed to ceil(len * target_sr / orig_sr), as in librosa.
+
+    Args:
+        signal (np.ndarray): Mono float signal
+        orig_sr (int): Sample rate of `signal`
+        target_sr (int): Desired sample rate
+        res_type (str): Key of RESAMPLERS
+
+    Returns:
+        np.ndarray: Resampled float32 signal
+    """
+    if orig_sr == target_sr:
+        return signal
+
+    with instrumentation.stage("resample"):
+        resampled = RESAMPLERS[res_type](signal, orig_sr, target_sr)
+        length = int(np.ceil(len(signal) * target_sr / orig_sr))
+        resampled = resampled[:length]
+        if len(resampled) < length:
+            resampled = np.pad(resampled, (0, length - len(resampled)))
+        return np.asarray(resampled, dtype=np.float32)
+
+
+def load_audio(file_path, sample_rate=MODEL_SAMPLE_RATE, res_type=DEFAULT_RESAMPLER):
+    """
+    Load an audio file as float32 mono at `sample_rate`.
+
+    Integer PCM WAV files are decoded directly; anything else falls back to
+    librosa. Resampling only happens when the native rate differs.
+
+    Args:
+        file_path (str or file-like): Audio file
+        sample_rate (int): Target rate; None keeps the native rate
+        res_type (str): Key of RESAMPLERS used when rates differ
+
+    Returns:
+        tuple: (signal, sample_rate)
+    """
+    with instrumentation.stage("decode"):
+        try:
+            signal, native_sr = read_wav(file_path)
+        except (wave.Error, EOFError):
+            import librosa
+
+            if hasattr(file_path, "seek"):
+                file_path.seek(0)
+            signal, native_sr = librosa.load(file_path, sr=None)
+
+    if sample_rate is None:
+        return signal, native_sr
+    return resample(signal, native_sr, sample_rate, res_type), sample_rate
+
+
+def open_audio(file_path, sample_rate=MODEL_SAMPLE_RATE, res_type=DEFAULT_RESAMPLER):
+    """
+    Like `load_audio`, but memory-maps PCM WAV files that need no resampling.
+
+    Callers must only slice and take `len()` of the returned signal, which is
+    either a `MappedWav` or a float32 array.
+
+    Returns:
+        tuple: (signal, sample_rate)
+    """
+    if isinstance(file_path, (str, os.PathLike)):
+        try:
+            signal = MappedWav(file_path)
+        except (wave.Error, struct.error):
+            pass
+        else:
+            if sample_rate is None or signal.sample_rate == sample_rate:
+                return signal, signal.sample_rate
+    return load_audio(file_path, sample_rate, res_type)
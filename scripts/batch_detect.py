@@ -0,0 +1,219 @@
+"""
+Batch keyword detection over many recordings for nightly QA runs.
+
+Inputs may be directories (searched recursively for WAV files), glob patterns
+or manifest files listing one path per line. Files are fanned out to a process
+pool whose workers each load the model once, and results are appended to a
+JSONL or CSV file as they complete, so an interrupted run resumes where it
+stopped. Run from the repository root:
+
+    python -m scripts.batch_detect recordings/ --output results.jsonl --workers 8
+"""
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import soundfile as sf
+
+CSV_FIELDS = ["file", "audio_seconds", "keyword", "start_time", "end_time", "confidence", "num_detections", "error"]
+DETECTION_FIELDS = CSV_FIELDS[2:-1]  # Empty in the single row written for a file without detections
+RECORD_FIELDS = ("file", "audio_seconds", "detections", "error")  # Keys of every JSONL record
+
+_service = None  # Per-worker KeywordSpottingService, created once by _init_worker
+
+
+def collect_files(inputs, manifest=None):
+    """
+    Expand directories, globs and manifest files into a sorted list of unique paths.
+
+    Args:
+        inputs (list): Directories, glob patterns or file paths
+        manifest (str): Optional text file with one audio path per line
+
+    Returns:
+        list: Audio file paths
+    """
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            files.update(glob.glob(os.path.join(item, "**", "*.wav"), recursive=True))
+        elif glob.has_magic(item):
+            files.update(glob.glob(item, recursive=True))
+        else:
+            files.add(item)
+
+    if manifest:
+        with open(manifest, "r") as fp:
+            files.update(line.strip() for line in fp if line.strip() and not line.startswith("#"))
+
+    return sorted(files)
+
+
+def truncate_partial_line(output_path):
+    """
+    Cut a partially written last line, left by a crash, off an existing output file.
+
+    Records appended on resume then start on a line of their own instead of
+    being joined onto the broken one.
+    """
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as fp:
+        end = position = fp.seek(0, os.SEEK_END)
+        while position > 0:
+            size = min(65536, position)
+            fp.seek(position - size)
+            newline = fp.read(size).rfind(b"\n")
+            if newline >= 0:
+                position += newline + 1 - size
+                break
+            position -= size
+        if position < end:
+            fp.truncate(position)
+
+
+def _complete_row(row):
+    """Whether a CSV row has every field of a successfully processed file."""
+    if any(row.get(field) is None for field in CSV_FIELDS) or not row["audio_seconds"] or row["error"]:
+        return False
+    # A file without detections has one row with no detection fields; otherwise a row has all of them
+    filled = [bool(row[field]) for field in DETECTION_FIELDS]
+    return all(filled) or not any(filled)
+
+
+def load_completed(output_path):
+    """
+    Read an existing output file and return the set of files already processed.
+
+    The last row or record written for a file decides. Files that failed are not
+    counted as completed, so they are retried on resume, and neither are files
+    whose last row or record is missing any of its fields.
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    done = {}
+    with open(output_path, "r", newline="") as fp:
+        if output_path.endswith(".csv"):
+            for row in csv.DictReader(fp):
+                if row["file"]:
+                    done[row["file"]] = _complete_row(row)
+        else:
+            for line in fp:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partially written line from a crash
+                if isinstance(record, dict) and record.get("file"):
+                    done[record["file"]] = all(key in record for key in RECORD_FIELDS) and not record["error"]
+    return {file_path for file_path, complete in done.items() if complete}
+
+
+def _init_worker(threads, model_path):
+    """Load the model once per worker process and cap its TensorFlow thread pools."""
+    global _service
+    import tensorflow as tf
+    from scripts.detect import KeywordSpottingService
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    _service = KeywordSpottingService(model_path)
+
+
+def _detect_file(task):
+    """Run detection on one file inside a worker and return a JSON-serializable record."""
+    file_path, confidence_threshold, min_detections, hop_seconds, vad = task
+    record = {"file": file_path, "audio_seconds": 0.0, "detections": [], "error": None}
+    try:
+        record["audio_seconds"] = sf.info(file_path).duration
+        predictions = _service.predict(
+            file_path,
+            confidence_threshold=confidence_threshold,
+            min_detections=min_detections,
+            hop_seconds=hop_seconds,
+            vad=vad
+        )
+        record["detections"] = [
+            {**pred, "confidence": float(pred["confidence"])} for pred in predictions
+        ]
+    except Exception as e:
+        # Kept on one line, since resume reads the output line by line
+        record["error"] = " ".join(f"{type(e).__name__}: {e}".split())
+    return record
+
+
+def write_record(fp, writer, record):
+    """Append one file's result to the output; CSV gets one row per detection."""
+    if writer is None:
+        fp.write(json.dumps(record) + "\n")
+    else:
+        base = {"file": record["file"], "audio_seconds": record["audio_seconds"], "error": record["error"] or ""}
+        if not record["detections"]:
+            writer.writerow(base)
+        for pred in record["detections"]:
+            writer.writerow({**base, **pred})
+    fp.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run keyword detection over many recordings in parallel.")
+    parser.add_argument("inputs", nargs="*", help="Directories, glob patterns or WAV files")
+    parser.add_argument("--manifest", help="Text file listing one audio path per line")
+    parser.add_argument("--model", default="models/model.keras", help="Keras model or TFLite export")
+    parser.add_argument("--output", default="results.jsonl", help="Output file (.jsonl or .csv)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--threads-per-worker", type=int, help="TensorFlow threads per worker (default: cores / workers)")
+    parser.add_argument("--confidence-threshold", type=float, default=0.5)
+    parser.add_argument("--min-detections", type=int, default=2)
+    parser.add_argument("--hop", type=float, help="Sliding-window hop in seconds (default: non-overlapping chunks)")
+    parser.add_argument("--vad", action="store_true", help="Skip windows without speech")
+    args = parser.parse_args()
+
+    files = collect_files(args.inputs, args.manifest)
+    truncate_partial_line(args.output)
+    completed = load_completed(args.output)
+    pending = [f for f in files if f not in completed]
+    print(f"{len(files)} files found, {len(files) - len(pending)} already done, {len(pending)} to process")
+    if not pending:
+        return
+
+    threads = args.threads_per_worker or max(1, (os.cpu_count() or 1) // args.workers)
+    tasks = [(f, args.confidence_threshold, args.min_detections, args.hop, args.vad) for f in pending]
+
+    is_csv = args.output.endswith(".csv")
+    write_header = is_csv and (not os.path.exists(args.output) or os.path.getsize(args.output) == 0)
+
+    # Spawn so workers do not inherit a forked TensorFlow runtime
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    done = failed = 0
+    audio_seconds = 0.0
+
+    with open(args.output, "a", newline="") as fp, \
+            context.Pool(args.workers, initializer=_init_worker, initargs=(threads, args.model)) as pool:
+        writer = csv.DictWriter(fp, fieldnames=CSV_FIELDS) if is_csv else None
+        if write_header:
+            writer.writeheader()
+
+        for record in pool.imap_unordered(_detect_file, tasks):
+            write_record(fp, writer, record)
+            done += 1
+            failed += record["error"] is not None
+            audio_seconds += record["audio_seconds"]
+
+            elapsed = time.perf_counter() - start
+            print(f"\r[{done}/{len(tasks)}] {done / elapsed:.2f} files/sec, "
+                  f"{audio_seconds / 3600 / elapsed:.4f} audio-hours/sec", end="", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(f"\nProcessed {done} files ({failed} failed, {audio_seconds / 3600:.2f} audio-hours) in {elapsed:.1f}s")
+    print(f"Throughput: {done / elapsed:.2f} files/sec, {audio_seconds / 3600 / elapsed:.4f} audio-hours/sec")
+
+
+if __name__ == "__main__":
+    main()
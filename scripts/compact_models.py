@@ -0,0 +1,156 @@
+"""
+Compact keyword models for tight per-chunk CPU latency budgets, and distillation to train them.
+
+Two families, both ending in global average pooling so their cost does not grow
+with a dense layer over the flattened feature map:
+
+- `ds_cnn`: a strided stem convolution followed by depthwise-separable blocks
+  (3x3 depthwise + 1x1 pointwise), after "Hello Edge: Keyword Spotting on
+  Microcontrollers" (Zhang et al., 2017).
+- `res_tiny`: a narrow residual network in the style of res8-narrow from "Deep
+  Residual Learning for Small-Footprint Keyword Spotting" (Tang & Lin, 2018).
+
+`Distiller` trains any of them against the softened outputs of a larger trained
+model, which usually recovers most of the accuracy lost to the smaller size.
+"""
+import tensorflow as tf
+
+COMPACT_LEARNING_RATE = 0.001  # Compact models train from scratch at a higher rate than the CNN
+BN_MOMENTUM = 0.9  # Batch norm statistics follow training within a few hundred steps, even on small datasets
+DISTILL_TEMPERATURE = 4.0  # Softmax temperature both models' outputs are softened with
+DISTILL_ALPHA = 0.1  # Weight of the hard-label loss; the rest goes to matching the teacher
+
+
+def ds_cnn(input_shape, num_classes, width=32, blocks=3, strides=(2, 2), dropout=0.2):
+    """
+    Depthwise-separable CNN.
+
+    Args:
+        input_shape (tuple): (frames, num_mfcc, 1)
+        num_classes (int): Output classes
+        width (int): Channels of every block
+        blocks (int): Depthwise-separable blocks after the stem
+        strides (tuple): Stem strides over (frames, coefficients), which set the cost of every block
+        dropout (float): Dropout before the output layer
+
+    Returns:
+        model: Uncompiled model
+    """
+    inputs = tf.keras.Input(input_shape)
+    x = tf.keras.layers.Conv2D(width, (3, 3), strides=strides, padding="same", use_bias=False)(inputs)
+    x = tf.keras.layers.BatchNormalization(momentum=BN_MOMENTUM)(x)
+    x = tf.keras.layers.ReLU()(x)
+    for _ in range(blocks):
+        x = tf.keras.layers.DepthwiseConv2D((3, 3), padding="same", use_bias=False)(x)
+        x = tf.keras.layers.BatchNormalization(momentum=BN_MOMENTUM)(x)
+        x = tf.keras.layers.ReLU()(x)
+        x = tf.keras.layers.Conv2D(width, (1, 1), use_bias=False)(x)
+        x = tf.keras.layers.BatchNormalization(momentum=BN_MOMENTUM)(x)
+        x = tf.keras.layers.ReLU()(x)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    x = tf.keras.layers.Dropout(dropout)(x)
+    # Kept in float32 under mixed precision for a stable softmax
+    outputs = tf.keras.layers.Dense(num_classes, activation="softmax", dtype="float32")(x)
+    return tf.keras.Model(inputs, outputs, name=f"ds_cnn_{width}x{blocks}")
+
+
+def res_tiny(input_shape, num_classes, width=16, blocks=2, pool=(4, 3)):
+    """
+    Narrow residual network: a stem convolution and average pooling, then residual pairs of 3x3 convolutions.
+
+    Args:
+        input_shape (tuple): (frames, num_mfcc, 1)
+        num_classes (int): Output classes
+        width (int): Channels of every convolution
+        blocks (int): Residual blocks
+        pool (tuple): Average pooling after the stem, which sets the cost of every block
+
+    Returns:
+        model: Uncompiled model
+    """
+    inputs = tf.keras.Input(input_shape)
+    x = tf.keras.layers.Conv2D(width, (3, 3), padding="same", use_bias=False, activation="relu")(inputs)
+    x = tf.keras.layers.AveragePooling2D(pool, padding="same")(x)
+    for _ in range(blocks):
+        y = tf.keras.layers.Conv2D(width, (3, 3), padding="same", use_bias=False, activation="relu")(x)
+        y = tf.keras.layers.BatchNormalization(momentum=BN_MOMENTUM)(y)
+        y = tf.keras.layers.Conv2D(width, (3, 3), padding="same", use_bias=False, activation="relu")(y)
+        y = tf.keras.layers.BatchNormalization(momentum=BN_MOMENTUM)(y)
+        x = tf.keras.layers.Add()([x, y])
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    outputs = tf.keras.layers.Dense(num_classes, activation="softmax", dtype="float32")(x)
+    return tf.keras.Model(inputs, outputs, name=f"res_tiny_{width}x{blocks}")
+
+
+# Compact variants selectable with `train.py --architecture`. On (44, 13) MFCCs all take fewer FLOPs than
+# `train.build_model`'s CNN (3.4M); batched CPU inference time per chunk follows FLOPs closely.
+ARCHITECTURES = {
+    "res_tiny": lambda input_shape, num_classes: res_tiny(input_shape, num_classes, width=16, blocks=2),  # 1.2M
+    "ds_cnn_s": lambda input_shape, num_classes: ds_cnn(input_shape, num_classes, width=32, blocks=3),  # 1.3M
+    "res8_narrow": lambda input_shape, num_classes: res_tiny(input_shape, num_classes, width=19, blocks=3),  # 2.3M
+    "ds_cnn_m": lambda input_shape, num_classes: ds_cnn(input_shape, num_classes, width=48, blocks=3),  # 2.7M
+}
+
+
+class Distiller(tf.keras.Model):
+    """Trains a student model on a mix of the true labels and a frozen teacher's softened predictions.
+
+    Both models output softmax probabilities; their logs are the logits up to a
+    constant, so they are softened as log(p) / temperature. Predictions and
+    metrics are the student's. Save `student`, not the distiller.
+    """
+
+    def __init__(self, student, teacher, temperature=DISTILL_TEMPERATURE, alpha=DISTILL_ALPHA):
+        super().__init__()
+        self.student = student
+        self.teacher = teacher
+        self.teacher.trainable = False
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def call(self, inputs, training=False):
+        return self.student(inputs, training=training)
+
+    def compute_loss(self, x=None, y=None, y_pred=None, sample_weight=None, training=True):
+        hard_loss = tf.reduce_mean(tf.keras.losses.sparse_categorical_crossentropy(y, y_pred))
+
+        epsilon = tf.keras.backend.epsilon()
+        teacher_log_probs = tf.math.log(tf.maximum(self.teacher(x, training=False), epsilon))
+        student_log_probs = tf.math.log(tf.maximum(tf.cast(y_pred, tf.float32), epsilon))
+        soft_teacher = tf.nn.softmax(teacher_log_probs / self.temperature)
+        soft_student = tf.nn.log_softmax(student_log_probs / self.temperature)
+        # KL(teacher || student); scaled by T^2 so its gradients stay comparable to the hard loss
+        soft_loss = tf.reduce_mean(tf.reduce_sum(
+            soft_teacher * (tf.math.log(tf.maximum(soft_teacher, epsilon)) - soft_student), axis=-1
+        )) * self.temperature ** 2
+
+        loss = self.alpha * hard_loss + (1 - self.alpha) * soft_loss
+        if self.student.losses:
+            loss += tf.add_n(self.student.losses)
+        return loss
+
+
+def count_flops(model):
+    """
+    Floating-point operations of one forward pass on a single input, counting a multiply-add as two.
+
+    Convolution, depthwise convolution and dense layers are counted; batch
+    normalization, activations, pooling and additions are cheap by comparison
+    and left out.
+    """
+    flops = 0
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.Model):
+            flops += count_flops(layer)
+            continue
+        if not layer.weights:
+            continue
+        kernel = layer.weights[0].shape
+        output = layer.output.shape
+        if isinstance(layer, tf.keras.layers.DepthwiseConv2D):
+            flops += 2 * kernel[0] * kernel[1] * output[1] * output[2] * output[3]
+        elif isinstance(layer, tf.keras.layers.Conv2D):
+            flops += 2 * kernel[0] * kernel[1] * kernel[2] * output[1] * output[2] * output[3]
+        elif isinstance(layer, tf.keras.layers.Dense):
+            flops += 2 * kernel[0] * kernel[1]
+    return int(flops)
@@ -0,0 +1,245 @@
+"""
+Compress the trained keyword model by magnitude pruning with short fine-tuning
+and optional weight clustering. Every compression level is written as a
+compressed archive (`scripts.compressed_model`) that the detection service
+loads directly, and compared against the original model on on-disk size, load
+time, per-chunk latency and test accuracy. Run from the repository root:
+
+    python -m scripts.compress
+    python -m scripts.compress --sparsity 0.5 0.8 0.9 --clusters 15
+
+`KeywordSpottingService(model_path="models/model_p80_c15.npz")` then serves the
+compressed model.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from scripts import train
+from scripts.compressed_model import COMPRESSED_SUFFIX, save_compressed
+from scripts.detect import BACKENDS, INFERENCE_BATCH_SIZE, SAVED_MODEL_PATH
+from scripts.model_metadata import copy_model_metadata
+
+SPARSITIES = (0.0, 0.5, 0.75, 0.9)  # Fractions of each prunable kernel zeroed, one artifact per level
+CLUSTERS = 15  # Distinct nonzero values per kernel; with the zero of pruned weights they fit 4-bit indices
+PRUNE_EPOCHS = 4  # Fine-tuning epochs over which sparsity ramps up to its target
+MIN_PRUNE_WEIGHTS = 1024  # Smaller kernels (e.g. the first convolution and the output layer) are left alone
+CLUSTER_ITERATIONS = 25  # k-means iterations per kernel
+
+
+def prunable_kernels(model, min_weights=MIN_PRUNE_WEIGHTS):
+    """Kernels of the convolution and dense layers with at least `min_weights` weights."""
+    kernels = []
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.Model):
+            kernels += prunable_kernels(layer, min_weights)
+        elif isinstance(layer, (tf.keras.layers.Conv2D, tf.keras.layers.Dense)) and layer.kernel.shape.num_elements() \
+                >= min_weights:
+            kernels.append(layer.kernel)
+    return kernels
+
+
+class MagnitudePruning(tf.keras.callbacks.Callback):
+    """Gradually zeroes the smallest-magnitude weights of the prunable kernels while the model fine-tunes.
+
+    Sparsity follows the cubic schedule of "To prune, or not to prune" (Zhu &
+    Gupta, 2017): no pruning in the first epoch, rising to `target_sparsity` in
+    the last (at once if there is only one epoch). Masks are recomputed per
+    kernel at the start of each epoch and re-applied after every batch, so
+    pruned weights stay zero while the others adapt.
+    """
+
+    def __init__(self, target_sparsity, epochs, min_weights=MIN_PRUNE_WEIGHTS):
+        super().__init__()
+        self.target_sparsity = target_sparsity
+        self.epochs = epochs
+        self.min_weights = min_weights
+        self._masks = []
+
+    def sparsity(self, epoch):
+        progress = min(1.0, epoch / (self.epochs - 1)) if self.epochs > 1 else 1.0
+        return self.target_sparsity * (1 - (1 - progress) ** 3)
+
+    def prune(self, sparsity):
+        """Zero the `sparsity` fraction of smallest weights in every prunable kernel."""
+        self._masks = []
+        for kernel in prunable_kernels(self.model, self.min_weights):
+            magnitudes = np.abs(kernel.numpy()).ravel()
+            num_pruned = int(sparsity * magnitudes.size)
+            if num_pruned <= 0:
+                continue
+            # Exactly the num_pruned smallest weights, however many ties there are at the cut
+            mask = np.ones_like(magnitudes)
+            mask[np.argpartition(magnitudes, num_pruned - 1)[:num_pruned]] = 0
+            mask = mask.reshape(kernel.shape)
+            kernel.assign(kernel * mask)
+            self._masks.append((kernel, tf.constant(mask)))
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.prune(self.sparsity(epoch))
+
+    def on_train_batch_end(self, batch, logs=None):
+        for kernel, mask in self._masks:
+            kernel.assign(kernel * mask)
+
+    def on_epoch_end(self, epoch, logs=None):
+        if logs is not None:
+            logs["sparsity"] = self.sparsity(epoch)
+
+
+def prune(model, sparsity, train_data, validation_data, epochs=PRUNE_EPOCHS,
+          learning_rate=train.FINE_TUNE_LEARNING_RATE):
+    """
+    Prune `model` in place to `sparsity` while fine-tuning it on `train_data`.
+
+    Returns:
+        model: The pruned model
+    """
+    pruning = MagnitudePruning(sparsity, epochs)
+    model.compile(optimizer=tf.optimizers.Adam(learning_rate=learning_rate), loss="sparse_categorical_crossentropy",
+                  metrics=["accuracy"])
+    model.fit(train_data, epochs=epochs, validation_data=validation_data, callbacks=[pruning], verbose=2)
+    # The last batches' optimizer step ran before its mask was re-applied; enforce the final sparsity exactly
+    pruning.prune(sparsity)
+    return model
+
+
+def cluster_weights(weights, num_clusters, iterations=CLUSTER_ITERATIONS):
+    """
+    Replace the nonzero weights with the nearest of `num_clusters` centroids found by 1-D k-means.
+
+    Centroids start evenly spaced over the weight range, which keeps the rare
+    large weights represented (Han et al., "Deep Compression", 2016), and split
+    between negative and positive weights so none is wasted on the gap pruning
+    leaves around zero. Zeros from pruning stay zero.
+
+    Returns:
+        np.ndarray: Clustered copy of `weights`
+    """
+    nonzero = weights != 0
+    values = weights[nonzero]
+    if len(values) <= num_clusters:
+        return weights.copy()
+    negative = values[values < 0]
+    num_negative = int(round(num_clusters * len(negative) / len(values)))
+    if 0 < len(negative) < len(values):
+        num_negative = min(max(num_negative, 1), num_clusters - 1)
+    positive = values[values > 0]
+    centroids = np.concatenate([np.linspace(negative.min(), negative.max(), num_negative) if num_negative else [],
+                                np.linspace(positive.min(), positive.max(), num_clusters - num_negative)
+                                if num_negative < num_clusters else []])
+    for _ in range(iterations):
+        # 1-D k-means keeps the centroids sorted, so assignment is a search between midpoints
+        assignment = np.searchsorted((centroids[1:] + centroids[:-1]) / 2, values)
+        counts = np.bincount(assignment, minlength=num_clusters)
+        sums = np.bincount(assignment, weights=values, minlength=num_clusters)
+        centroids = np.where(counts > 0, sums / np.maximum(counts, 1), centroids)
+    assignment = np.searchsorted((centroids[1:] + centroids[:-1]) / 2, values)
+    clustered = np.zeros_like(weights)
+    clustered[nonzero] = centroids.astype(weights.dtype)[assignment]
+    return clustered
+
+
+def cluster(model, num_clusters=CLUSTERS, min_weights=MIN_PRUNE_WEIGHTS):
+    """Cluster every prunable kernel of `model` in place."""
+    for kernel in prunable_kernels(model, min_weights):
+        kernel.assign(cluster_weights(kernel.numpy(), num_clusters))
+    return model
+
+
+def measure(model_path, test_data, runs=200):
+    """
+    On-disk size, load time, per-chunk latency and test accuracy of a model file, through the detection backends.
+
+    Load time runs from opening the file to the first prediction, median of three loads.
+
+    Returns:
+        dict: size_kb, load_ms, chunk_ms, batched_chunk_ms, accuracy
+    """
+    backend_name = "compressed" if model_path.endswith(COMPRESSED_SUFFIX) else "keras"
+    load_times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        backend = BACKENDS[backend_name](model_path)
+        backend.predict(np.zeros((1,) + tuple(backend.input_shape[1:]), dtype=np.float32))
+        load_times.append(time.perf_counter() - start)
+
+    correct = total = 0
+    batches = []
+    for features, labels in test_data:
+        features = features.numpy()
+        correct += int(np.sum(np.argmax(backend.predict(features), axis=-1) == labels.numpy()))
+        total += len(labels)
+        batches.append(features)
+    chunks = np.concatenate(batches)
+
+    start = time.perf_counter()
+    for chunk in chunks[:runs]:
+        backend.predict(chunk[np.newaxis])
+    chunk_ms = (time.perf_counter() - start) / min(runs, len(chunks)) * 1000
+
+    batch = np.resize(chunks, (INFERENCE_BATCH_SIZE,) + chunks.shape[1:])
+    start = time.perf_counter()
+    for _ in range(max(1, runs // 10)):
+        backend.predict(batch)
+    batched_chunk_ms = (time.perf_counter() - start) / max(1, runs // 10) / INFERENCE_BATCH_SIZE * 1000
+
+    return {
+        "size_kb": os.path.getsize(model_path) / 1024,
+        "load_ms": 1000 * float(np.median(load_times)),
+        "chunk_ms": chunk_ms,
+        "batched_chunk_ms": batched_chunk_ms,
+        "accuracy": correct / total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune and cluster the keyword model into compact archives.")
+    parser.add_argument("--model", default=SAVED_MODEL_PATH, help="Trained Keras model")
+    parser.add_argument("--output-dir", default="models")
+    parser.add_argument("--sparsity", type=float, nargs="+", default=list(SPARSITIES),
+                        help="Pruning levels; 0 only re-encodes (and clusters) the model")
+    parser.add_argument("--clusters", type=int, default=CLUSTERS,
+                        help="Also write a clustered variant of every level with this many values per kernel (0: no)")
+    parser.add_argument("--epochs", type=int, default=PRUNE_EPOCHS, help="Fine-tuning epochs per pruning level")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tf.keras.utils.set_random_seed(args.seed)
+    train_data, validation_data, test_data, _, _ = train.prepare_datasets(train.DATA_PATH, seed=args.seed)
+    stem = os.path.splitext(os.path.basename(args.model))[0]
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    artifacts = {"original": args.model}
+    for sparsity in args.sparsity:
+        model = tf.keras.models.load_model(args.model)
+        if sparsity > 0:
+            print(f"\nPruning to {sparsity:.0%} sparsity...")
+            prune(model, sparsity, train_data, validation_data, args.epochs)
+        names = [f"p{round(sparsity * 100)}"]
+        if args.clusters:
+            names.append(f"{names[0]}_c{args.clusters}")
+        for name in names:
+            if name != names[0]:
+                cluster(model, args.clusters)
+            path = os.path.join(args.output_dir, f"{stem}_{name}{COMPRESSED_SUFFIX}")
+            save_compressed(model, path)
+            copy_model_metadata(args.model, path)  # Archives decode audio and label outputs like the original
+            artifacts[name] = path
+            print(f"Wrote {path}")
+
+    results = {name: measure(path, test_data) for name, path in artifacts.items()}
+    original = results["original"]
+    print(f"\n{'level':<12}{'size (KB)':>11}{'ratio':>8}{'load (ms)':>11}{'ms/chunk':>10}{'batched (ms)':>14}"
+          f"{'accuracy':>10}{'delta':>9}")
+    for name, result in results.items():
+        print(f"{name:<12}{result['size_kb']:>11.1f}{original['size_kb'] / result['size_kb']:>7.1f}x"
+              f"{result['load_ms']:>11.1f}{result['chunk_ms']:>10.3f}{result['batched_chunk_ms']:>14.4f}"
+              f"{result['accuracy'] * 100:>9.2f}%{(result['accuracy'] - original['accuracy']) * 100:>+8.2f}%")
+
+
+if __name__ == "__main__":
+    main()
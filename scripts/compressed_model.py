@@ -0,0 +1,95 @@
+"""
+Compact on-disk format for pruned and weight-clustered Keras models.
+
+An archive is a zlib-compressed `.npz` holding the model architecture as JSON
+and every weight tensor in whichever of three encodings is smallest:
+
+- dense: the float32 values as they are (biases, batch norm, small layers)
+- sparse: a packed bitmask of the nonzero positions plus their float32 values
+- codebook: the distinct values plus 4-bit (up to 16 values) or 8-bit (up to
+  256) indices into them, which is what weight clustering produces
+
+The encodings are lossless: compression happens in pruning and clustering
+(`scripts.compress`), and the archive only stores their result compactly. The
+model is rebuilt from the JSON without optimizer state, for inference.
+"""
+import numpy as np
+
+COMPRESSED_SUFFIX = ".npz"
+FORMAT_VERSION = 1
+
+
+def _encode(weights):
+    """Entries for one tensor, in the smallest encoding."""
+    flat = weights.ravel()
+    nonzero = flat != 0
+    values, indices = np.unique(flat, return_inverse=True)
+    index_bytes = (flat.size + 1) // 2 if len(values) <= 16 else flat.size if len(values) <= 256 else np.inf
+    sizes = {
+        "dense": flat.nbytes,
+        "sparse": (flat.size + 7) // 8 + int(np.count_nonzero(nonzero)) * flat.itemsize,
+        "codebook": index_bytes + values.nbytes,
+    }
+    encoding = min(sizes, key=sizes.get)
+    if encoding == "sparse":
+        return {"mask": np.packbits(nonzero), "values": flat[nonzero]}
+    if encoding == "codebook":
+        indices = indices.astype(np.uint8)
+        if len(values) <= 16:
+            # Two indices per byte
+            indices = np.pad(indices, (0, len(indices) % 2))
+            indices = indices[0::2] << 4 | indices[1::2]
+        return {"codebook": values, "indices": indices, "bits": np.array(4 if len(values) <= 16 else 8)}
+    return {"dense": flat}
+
+
+def _decode(entries, shape, dtype):
+    size = int(np.prod(shape))
+    if "mask" in entries:
+        flat = np.zeros(size, dtype=dtype)
+        flat[np.unpackbits(entries["mask"], count=size).astype(bool)] = entries["values"]
+    elif "codebook" in entries:
+        indices = entries["indices"]
+        if int(entries["bits"]) == 4:
+            indices = np.stack([indices >> 4, indices & 0x0F], axis=1).ravel()[:size]
+        flat = entries["codebook"][indices]
+    else:
+        flat = entries["dense"]
+    return flat.reshape(shape).astype(dtype, copy=False)
+
+
+def save_compressed(model, path):
+    """
+    Write a Keras model's architecture and weights as a compressed archive.
+
+    Returns:
+        dict: Encoding name -> number of weight tensors stored with it
+    """
+    arrays = {"version": np.array(FORMAT_VERSION), "model": np.array(model.to_json())}
+    counts = {"dense": 0, "sparse": 0, "codebook": 0}
+    weights = model.get_weights()
+    arrays["count"] = np.array(len(weights))
+    for i, tensor in enumerate(weights):
+        entries = _encode(np.asarray(tensor))
+        counts["sparse" if "mask" in entries else "codebook" if "codebook" in entries else "dense"] += 1
+        arrays[f"{i}/shape"] = np.array(tensor.shape, dtype=np.int64)
+        arrays[f"{i}/dtype"] = np.array(tensor.dtype.str)
+        arrays.update({f"{i}/{name}": value for name, value in entries.items()})
+    with open(path, "wb") as fp:
+        np.savez_compressed(fp, **arrays)
+    return counts
+
+
+def load_compressed(path):
+    """Rebuild the (uncompiled) Keras model stored in an archive written by `save_compressed`."""
+    import tensorflow as tf
+
+    with np.load(path) as archive:
+        model = tf.keras.models.model_from_json(str(archive["model"]))
+        weights = []
+        for i in range(int(archive["count"])):
+            prefix = f"{i}/"
+            entries = {key[len(prefix):]: archive[key] for key in archive.files if key.startswith(prefix)}
+            weights.append(_decode(entries, tuple(entries.pop("shape")), np.dtype(str(entries.pop("dtype")))))
+    model.set_weights(weights)
+    return model
@@ -1,11 +1,119 @@
-import librosa
-import tensorflow as tf
+# TensorFlow, librosa, soundfile and soxr are imported where they are first used,
+# so importing this module (e.g. from the UI) stays fast until a model is needed.
+import argparse
 import numpy as np
 from collections import Counter
-import json
+from itertools import islice
+import os
+import sys
+import threading
+
+if __package__ in (None, ""):
+    # Allow `python scripts/detect.py` as well as `python -m scripts.detect`
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import instrumentation
+from scripts.audio import DEFAULT_RESAMPLER, MODEL_SAMPLE_RATE, open_audio
+from scripts.compressed_model import COMPRESSED_SUFFIX, load_compressed
+from scripts.feature_store import load_mapping
+from scripts import features
+from scripts.features import FEATURE_VERSION, HOP_LENGTH, N_FFT, NUM_MFCC
+from scripts.model_metadata import load_model_metadata
+from scripts.probability_cache import ProbabilityCache
+from scripts import vad as voice_activity
 
 SAVED_MODEL_PATH = "models/model.keras"
 SAMPLES_TO_CONSIDER = 22050  # ~1 second of audio at 22050Hz
+CHUNK_SECONDS = SAMPLES_TO_CONSIDER / MODEL_SAMPLE_RATE  # Window length, independent of the model sample rate
+INFERENCE_BATCH_SIZE = 64  # Number of chunks sent through the model per call
+NMS_IOU_THRESHOLD = 0.0  # IoU above which a sliding-window hit is suppressed by a more confident one; 0: any overlap
+STREAM_BLOCK_SECONDS = 30  # Audio decoded per block by predict_stream
+MFCC_BLOCK_FRAMES = 4096  # MFCC frames computed at a time for sliding-window analysis
+MFCC_BATCH_CHUNKS = 64  # Chunks featurized per vectorized MFCC call
+SLIDING_FEATURE_VERSION = 2  # Bump whenever sliding-window features change without FEATURE_VERSION changing
+
+class KerasBackend:
+    """Runs a Keras model through a compiled fixed-signature inference function."""
+    
+    def __init__(self, model_path):
+        import tensorflow as tf
+        
+        self.model = tf.keras.models.load_model(model_path)
+        self.input_shape = self.model.input_shape
+        self._infer = self._build_inference_function()
+    
+    def _build_inference_function(self):
+        """
+        Wrap the model in a compiled function with a fixed input signature.
+        
+        The batch dimension is left open so every batch size reuses the same
+        traced graph instead of paying `Model.predict` dispatch overhead per call.
+        
+        Returns:
+            tf.function: Callable mapping a float32 batch of MFCCs to class probabilities
+        """
+        import tensorflow as tf
+        
+        _, num_frames, num_mfcc, num_channels = self.input_shape
+        
+        @tf.function(input_signature=[tf.TensorSpec((None, num_frames, num_mfcc, num_channels), tf.float32)])
+        def infer(batch):
+            return self.model(batch, training=False)
+        
+        return infer
+    
+    def predict(self, batch):
+        """Return class probabilities for a float32 (batch, frames, mfcc, 1) array."""
+        return self._infer(batch).numpy()
+
+class CompressedBackend(KerasBackend):
+    """Runs a pruned or clustered model from a compressed archive written by `scripts.compress`."""
+    
+    def __init__(self, model_path):
+        self.model = load_compressed(model_path)
+        self.input_shape = self.model.input_shape
+        self._infer = self._build_inference_function()
+
+class TFLiteBackend:
+    """Runs a float or int8-quantized TFLite export of the model with the TFLite interpreter."""
+    
+    def __init__(self, model_path, num_threads=None):
+        import tensorflow as tf
+        
+        self.interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self.input_shape = (None,) + tuple(int(d) for d in self._input['shape_signature'][1:])
+        self._batch_size = None
+    
+    def predict(self, batch):
+        """Return class probabilities for a float32 (batch, frames, mfcc, 1) array."""
+        # Resize only when the batch size changes; reallocation is the expensive part
+        if len(batch) != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input['index'], batch.shape)
+            self.interpreter.allocate_tensors()
+            self._batch_size = len(batch)
+        
+        # Quantize inputs and dequantize outputs for int8 models
+        scale, zero_point = self._input['quantization']
+        if self._input['dtype'] != np.float32:
+            info = np.iinfo(self._input['dtype'])
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(self._input['dtype'])
+        
+        self.interpreter.set_tensor(self._input['index'], batch)
+        self.interpreter.invoke()
+        probabilities = self.interpreter.get_tensor(self._output['index'])
+        
+        scale, zero_point = self._output['quantization']
+        if self._output['dtype'] != np.float32:
+            probabilities = (probabilities.astype(np.float32) - zero_point) * scale
+        return probabilities
+
+BACKENDS = {
+    "keras": KerasBackend,
+    "tflite": TFLiteBackend,
+    "compressed": CompressedBackend,
+}
 
 class KeywordSpottingService:
     """Singleton class for keyword spotting inference with trained models.
@@ -14,20 +122,63 @@ class KeywordSpottingService:
     model = None
     _mapping = None
     _instance = None
+    _instance_lock = threading.Lock()
     
-    def __init__(self):
-        # Load model
-        self.model = tf.keras.models.load_model(SAVED_MODEL_PATH)
+    def __init__(self, model_path=SAVED_MODEL_PATH, backend=None, cache=None, res_type=DEFAULT_RESAMPLER,
+                 instrument=True):
+        """
+        Args:
+            model_path (str): Path to a `.keras` model, a `.tflite` export of it or a compressed `.npz` archive
+            backend (str): Key of BACKENDS; inferred from the model file extension if None
+            cache (ProbabilityCache): Optional on-disk cache of per-window probabilities
+            res_type (str): Key of `scripts.audio.RESAMPLERS`, used only for files whose
+                native rate differs from the model's
+            instrument (bool): Record per-stage timings and counters in `self.stats`. Set the
+                KWS_PROFILE environment variable to a file path to also cProfile every call.
+        """
+        self.stats = instrumentation.stats_from_environment(instrument)
+        
+        # Load model through the selected inference backend
+        if backend is None:
+            backend = "tflite" if model_path.endswith(".tflite") else \
+                "compressed" if model_path.endswith(COMPRESSED_SUFFIX) else "keras"
+        self.backend = BACKENDS[backend](model_path)
+        self.model = getattr(self.backend, "model", None)
+        self.model_path = model_path
+        self.cache = cache
+        self.res_type = res_type
+        
+        # Audio is decoded at the rate the model was trained on, recorded next to the model
+        metadata = load_model_metadata(model_path)
+        self.sample_rate = metadata.get("sample_rate", MODEL_SAMPLE_RATE)
 
-        # Dynamically load class mapping from `data.json`
-        with open("data.json", "r") as f:
-            data = json.load(f)
-            self._mapping = data.get("mapping", [])
+        # Class mapping the model's outputs follow, recorded at training time; older models fall back to the
+        # feature store metadata (or a legacy `data.json`)
+        self._mapping = metadata.get("mapping") or load_mapping()
         
         if not self._mapping:
-            raise ValueError("The _mapping list is empty. Ensure `data.json` contains the correct mappings.")
+            raise ValueError("The _mapping list is empty. Ensure the feature store contains the correct mappings.")
     
-    def predict(self, file_path, confidence_threshold=0.5, min_detections=2):
+    def warmup(self, background=True):
+        """
+        Trace the inference graph and load the feature-extraction stack ahead of the first prediction.
+        
+        Args:
+            background (bool): Run in a daemon thread and return immediately
+        
+        Returns:
+            threading.Thread: The warmup thread if running in the background, else None
+        """
+        if background:
+            thread = threading.Thread(target=self.warmup, kwargs={"background": False}, daemon=True)
+            thread.start()
+            return thread
+        
+        silence = np.zeros(int(round(CHUNK_SECONDS * self.sample_rate)), dtype=np.float32)
+        self._predict_probabilities([self._extract_mfcc(silence, self.sample_rate)])
+    
+    def predict(self, file_path, confidence_threshold=0.5, min_detections=2, batch_size=INFERENCE_BATCH_SIZE,
+                hop_seconds=None, nms_iou_threshold=NMS_IOU_THRESHOLD, vad=False):
         """
         Predict keywords in an audio file of any length.
         
@@ -35,72 +186,450 @@ class KeywordSpottingService:
             file_path (str): Path to audio file
             confidence_threshold (float): Minimum confidence score to consider a detection valid
             min_detections (int): Minimum number of detections needed to report a keyword
+            batch_size (int): Number of chunks run through the model per inference call
+            hop_seconds (float): Step between overlapping one-second windows, e.g. 0.25.
+                None uses non-overlapping chunks.
+            nms_iou_threshold (float): Overlap above which sliding-window hits of the same
+                keyword are merged by non-max suppression. The default, 0, keeps no two
+                overlapping hits of one keyword. Only used when hop_seconds is set.
+            vad (bool): Skip feature extraction and inference for windows without speech
         
         Returns:
             list: List of tuples containing (keyword, start_time, end_time, confidence)
         """
-        # Load and process audio in chunks
-        chunks_mfcc = self._process_audio_chunks(file_path)
+        with self.stats.track("predict"):
+            # Get prediction probabilities for every chunk or window, from the cache if possible
+            probabilities, window_hop = self._window_probabilities(file_path, hop_seconds, batch_size, vad)
+            
+            with self.stats.stage("aggregate"):
+                # Only keep predictions above confidence threshold
+                predictions = self._probabilities_to_predictions(probabilities, confidence_threshold, window_hop)
+                
+                # Aggregate predictions
+                if hop_seconds is None:
+                    nms_iou_threshold = None
+                return self._aggregate_predictions(predictions, min_detections, nms_iou_threshold)
+
+    def predict_stream(self, file_path, confidence_threshold=0.5, min_detections=2, batch_size=INFERENCE_BATCH_SIZE):
+        """
+        Predict keywords in an audio file block by block with bounded memory.
         
-        # Make predictions for each chunk
+        Audio is decoded, featurized and run through the model incrementally, so peak
+        memory does not grow with the file length. Detections are the same as `predict`
+        returns, but are yielded in the order they finalize instead of grouped by keyword.
+        
+        Args:
+            file_path (str): Path to audio file readable by soundfile
+            confidence_threshold (float): Minimum confidence score to consider a detection valid
+            min_detections (int): Minimum number of detections needed to report a keyword
+            batch_size (int): Number of chunks run through the model per inference call
+        
+        Yields:
+            dict: Detection with keyword, start_time, end_time, confidence and num_detections
+        """
+        chunk_duration = CHUNK_SECONDS
+        chunks_mfcc = (self._extract_mfcc(chunk, self.sample_rate) for chunk in self._stream_audio_chunks(file_path))
+        
+        with self.stats.track("predict_stream"):
+            # Keyword -> detections that may still be extended by a later chunk
+            open_groups = {}
+            for i, pred_probs in enumerate(self._stream_probabilities(chunks_mfcc, batch_size)):
+                start_time = i * chunk_duration
+                
+                # A group is final once no later chunk can fall within the 0.5s merge gap
+                for keyword in list(open_groups):
+                    if start_time - open_groups[keyword][-1][1] > 0.5:
+                        group = open_groups.pop(keyword)
+                        if len(group) >= min_detections:
+                            yield self._group_to_prediction(keyword, group)
+                
+                pred_idx = np.argmax(pred_probs)
+                confidence = pred_probs[pred_idx]
+                if confidence >= confidence_threshold:
+                    keyword = self._mapping[pred_idx]
+                    open_groups.setdefault(keyword, []).append((start_time, start_time + chunk_duration, confidence))
+            
+            # Flush whatever is still open at the end of the file
+            for keyword, group in open_groups.items():
+                if len(group) >= min_detections:
+                    yield self._group_to_prediction(keyword, group)
+
+    def _predict_probabilities(self, chunks_mfcc, batch_size=INFERENCE_BATCH_SIZE):
+        """
+        Run all chunks through the model in batches of `batch_size`.
+        
+        Args:
+            chunks_mfcc (list or np.ndarray): MFCC features for each chunk
+            batch_size (int): Number of chunks per inference call
+        
+        Returns:
+            np.ndarray: Class probabilities with shape (num_chunks, num_classes)
+        """
+        if len(chunks_mfcc) == 0:
+            return np.empty((0, len(self._mapping)), dtype=np.float32)
+        
+        probabilities = []
+        for start in range(0, len(chunks_mfcc), batch_size):
+            # Stack the batch into a (batch, frames, mfcc, 1) tensor; window views are only copied here
+            batch = np.asarray(chunks_mfcc[start:start + batch_size], dtype=np.float32)[..., np.newaxis]
+            with self.stats.stage("inference"):
+                probabilities.append(self.backend.predict(batch))
+            self.stats.add("chunks", len(batch))
+            self.stats.add("batches")
+        
+        return np.concatenate(probabilities)
+
+    def _window_probabilities(self, file_path, hop_seconds=None, batch_size=INFERENCE_BATCH_SIZE, vad=False):
+        """
+        Extract features and run inference for every window, reusing cached results.
+        
+        Args:
+            file_path (str or file-like): Audio file; only paths are cached
+            hop_seconds (float): Sliding-window hop; None for non-overlapping chunks
+            batch_size (int): Number of chunks per inference call
+            vad (bool): Skip windows without speech; their rows are NaN
+        
+        Returns:
+            tuple: (class probabilities with shape (num_windows, num_classes), seconds between window starts)
+        """
+        key = None
+        if self.cache is not None and isinstance(file_path, (str, os.PathLike)):
+            params = self._feature_params(hop_seconds, vad, self.sample_rate, self.res_type)
+            key = self.cache.key(file_path, self.model_path, params)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats.add("cache_hits")
+                return cached
+        
+        # Load and process audio in chunks or overlapping windows
+        chunks_mfcc, window_hop, speech = self._extract_features(
+            file_path, hop_seconds, vad, self.sample_rate, self.res_type
+        )
+        
+        # Get prediction probabilities for every kept chunk in batches; skipped windows stay NaN
+        probabilities = np.full((len(speech), len(self._mapping)), np.nan, dtype=np.float32)
+        probabilities[speech] = self._predict_probabilities(chunks_mfcc, batch_size)
+        
+        if key is not None:
+            self.cache.put(key, probabilities, window_hop)
+        return probabilities, window_hop
+
+    @staticmethod
+    def _feature_params(hop_seconds=None, vad=False, sample_rate=MODEL_SAMPLE_RATE, res_type=DEFAULT_RESAMPLER):
+        """
+        Parameters that determine the per-window probabilities of a file, for cache keys.
+        
+        Includes FEATURE_VERSION (and SLIDING_FEATURE_VERSION for sliding windows), so entries
+        computed by an older feature implementation are not served.
+        """
+        params = {
+            "feature_version": FEATURE_VERSION,
+            "sample_rate": sample_rate,
+            "res_type": res_type,
+            "samples_to_consider": SAMPLES_TO_CONSIDER,
+            "num_mfcc": NUM_MFCC,
+            "n_fft": N_FFT,
+            "hop_length": HOP_LENGTH,
+            "hop_seconds": hop_seconds,
+        }
+        if hop_seconds is not None:
+            params["sliding_feature_version"] = SLIDING_FEATURE_VERSION
+        if vad:
+            params["vad"] = {
+                name: value for name, value in vars(voice_activity).items() if name.startswith("VAD_")
+            }
+        return params
+
+    def _probabilities_to_predictions(self, probabilities, confidence_threshold, window_hop):
+        """
+        Turn per-window class probabilities into detections above the confidence threshold.
+        
+        Args:
+            probabilities (np.ndarray): Class probabilities with shape (num_windows, num_classes)
+            confidence_threshold (float): Minimum confidence score to consider a detection valid
+            window_hop (float): Seconds between the starts of consecutive windows
+        
+        Returns:
+            list: List of (keyword, start_time, end_time, confidence) tuples
+        """
         predictions = []
-        for i, mfcc_chunk in enumerate(chunks_mfcc):
-            # Prepare the chunk for prediction
-            mfcc_chunk = mfcc_chunk[np.newaxis, ..., np.newaxis]
+        for i, pred_probs in enumerate(probabilities):
+            # Windows skipped by voice-activity gating have no probabilities
+            if np.isnan(pred_probs[0]):
+                continue
             
-            # Get prediction probabilities
-            pred_probs = self.model.predict(mfcc_chunk, verbose=0)[0]
             pred_idx = np.argmax(pred_probs)
             confidence = pred_probs[pred_idx]
             
-            # Only keep predictions above confidence threshold
             if confidence >= confidence_threshold:
                 keyword = self._mapping[pred_idx]
-                start_time = i * (SAMPLES_TO_CONSIDER / 22050)  # Convert to seconds
-                end_time = (i + 1) * (SAMPLES_TO_CONSIDER / 22050)
+                start_time = i * window_hop  # Convert to seconds
+                end_time = start_time + CHUNK_SECONDS
                 predictions.append((keyword, start_time, end_time, confidence))
         
-        # Aggregate predictions
-        return self._aggregate_predictions(predictions, min_detections)
+        return predictions
 
-    def _process_audio_chunks(self, file_path, num_mfcc=13, n_fft=2048, hop_length=512):
+    def _stream_probabilities(self, chunks_mfcc, batch_size=INFERENCE_BATCH_SIZE):
         """
-        Process audio file in chunks of SAMPLES_TO_CONSIDER length
+        Run an iterable of chunk MFCCs through the model, holding one batch at a time.
+        
+        Yields:
+            np.ndarray: Class probabilities for each chunk, in order
+        """
+        chunks_mfcc = iter(chunks_mfcc)
+        while True:
+            batch = list(islice(chunks_mfcc, batch_size))
+            if not batch:
+                return
+            yield from self._predict_probabilities(batch, batch_size)
+
+    def _stream_audio_chunks(self, file_path, block_seconds=STREAM_BLOCK_SECONDS):
+        """
+        Decode an audio file block by block into CHUNK_SECONDS-long chunks at the model sample rate.
+        
+        Decoding mirrors `scripts.audio.load_audio`: channels are averaged to mono and
+        resampled with soxr HQ only if the rates differ, streamed so only one block is in memory.
+        
+        Yields:
+            np.ndarray: float32 chunk, the last one zero-padded
+        """
+        import soundfile as sf
+        import soxr
+        
+        chunk_samples = int(round(CHUNK_SECONDS * self.sample_rate))
+        with sf.SoundFile(file_path) as audio:
+            native_sr = audio.samplerate
+            expected_length = int(np.ceil(audio.frames * self.sample_rate / native_sr))
+            resampler = None
+            if native_sr != self.sample_rate:
+                resampler = soxr.ResampleStream(native_sr, self.sample_rate, 1, dtype='float32', quality='HQ')
+            
+            pending = np.empty(0, dtype=np.float32)
+            emitted = 0
+            blocks = audio.blocks(blocksize=int(block_seconds * native_sr), dtype='float32', always_2d=True)
+            while True:
+                with instrumentation.stage("decode"):
+                    block = next(blocks, None)
+                if block is None:
+                    break
+                instrumentation.add("audio_seconds", len(block) / native_sr)
+                
+                signal = block.mean(axis=1)
+                if resampler is not None:
+                    with instrumentation.stage("resample"):
+                        signal = resampler.resample_chunk(signal)
+                pending = np.concatenate([pending, signal])
+                
+                while len(pending) >= chunk_samples:
+                    yield pending[:chunk_samples]
+                    pending = pending[chunk_samples:]
+                    emitted += chunk_samples
+            
+            if resampler is not None:
+                pending = np.concatenate([pending, resampler.resample_chunk(np.empty(0, dtype=np.float32), last=True)])
+        
+        # Trim or pad the tail to the length a whole-file resample would produce
+        remaining = max(0, expected_length - emitted)
+        pending = np.pad(pending[:remaining], (0, max(0, remaining - len(pending))))
+        
+        while len(pending) > 0:
+            chunk = pending[:chunk_samples]
+            
+            # Pad last chunk if necessary
+            if len(chunk) < chunk_samples:
+                chunk = np.pad(chunk, (0, chunk_samples - len(chunk)))
+            yield chunk
+            pending = pending[chunk_samples:]
+
+    @staticmethod
+    def _extract_features(file_path, hop_seconds=None, vad=False, sample_rate=MODEL_SAMPLE_RATE,
+                          res_type=DEFAULT_RESAMPLER):
+        """
+        Load an audio file and extract MFCCs for every chunk or sliding window.
+        
+        Does not touch the model, so worker processes can call it without loading one.
+        
+        Args:
+            file_path (str or file-like): Audio file
+            hop_seconds (float): Sliding-window hop; None for non-overlapping chunks
+            vad (bool): Drop windows without speech before feature extraction
+            sample_rate (int): Model sample rate the audio is decoded at
+            res_type (str): Resampler used when the file's native rate differs
         
         Returns:
-            list: List of MFCC features for each chunk
+            tuple: (MFCC features of kept windows, seconds between window starts,
+                boolean mask over all windows marking the kept ones)
         """
-        # Load audio file
-        signal, sample_rate = librosa.load(file_path, sr=22050)
+        if hop_seconds is None:
+            chunks_mfcc, speech = KeywordSpottingService._process_audio_chunks(
+                file_path, vad=vad, sample_rate=sample_rate, res_type=res_type
+            )
+            return chunks_mfcc, CHUNK_SECONDS, speech
+        return KeywordSpottingService._process_audio_windows(
+            file_path, hop_seconds, vad=vad, sample_rate=sample_rate, res_type=res_type
+        )
+
+    @staticmethod
+    def _process_audio_chunks(file_path, num_mfcc=NUM_MFCC, n_fft=N_FFT, hop_length=HOP_LENGTH, vad=False,
+                              sample_rate=MODEL_SAMPLE_RATE, res_type=DEFAULT_RESAMPLER):
+        """
+        Process audio file in chunks of CHUNK_SECONDS length
+        
+        Returns:
+            tuple: (list of MFCC features for each kept chunk, boolean mask over all chunks)
+        """
+        # Memory-map the audio file (or decode it if it needs resampling); chunks are decoded as sliced
+        signal, sample_rate = open_audio(file_path, sample_rate, res_type)
+        chunk_samples = int(round(CHUNK_SECONDS * sample_rate))
+        instrumentation.add("audio_seconds", len(signal) / sample_rate)
+        
+        # Find chunks with speech before spending any MFCC work on them
+        num_chunks = int(np.ceil(len(signal) / chunk_samples))
+        if vad:
+            with instrumentation.stage("vad"):
+                speech = voice_activity.speech_windows(signal, sample_rate, chunk_samples, chunk_samples, num_chunks)
+        else:
+            speech = np.ones(num_chunks, dtype=bool)
+        instrumentation.add("windows", num_chunks)
+        instrumentation.add("windows_skipped", num_chunks - np.count_nonzero(speech))
         
-        # Split signal into chunks
+        # Split signal into chunks and featurize MFCC_BATCH_CHUNKS of them per call
         chunks = []
-        for i in range(0, len(signal), SAMPLES_TO_CONSIDER):
-            chunk = signal[i:i + SAMPLES_TO_CONSIDER]
+        starts = np.flatnonzero(speech) * chunk_samples
+        for first in range(0, len(starts), MFCC_BATCH_CHUNKS):
+            batch = np.zeros((len(starts[first:first + MFCC_BATCH_CHUNKS]), chunk_samples), dtype=np.float32)
+            for row, i in enumerate(starts[first:first + MFCC_BATCH_CHUNKS]):
+                # The last chunk stays zero-padded past the end of the signal
+                chunk = signal[i:i + chunk_samples]
+                batch[row, :len(chunk)] = chunk
             
-            # Pad last chunk if necessary
-            if len(chunk) < SAMPLES_TO_CONSIDER:
-                chunk = np.pad(chunk, (0, SAMPLES_TO_CONSIDER - len(chunk)))
-                
             # Extract MFCCs
-            mfccs = librosa.feature.mfcc(
-                y=chunk,
-                sr=sample_rate,
-                n_mfcc=num_mfcc,
-                n_fft=n_fft,
-                hop_length=hop_length
-            )
-            chunks.append(mfccs.T)
+            chunks.extend(KeywordSpottingService._extract_mfcc(batch, sample_rate, num_mfcc, n_fft, hop_length))
+            
+        return chunks, speech
+
+    @staticmethod
+    def _extract_mfcc(chunk, sample_rate=MODEL_SAMPLE_RATE, num_mfcc=NUM_MFCC, n_fft=N_FFT, hop_length=HOP_LENGTH):
+        """
+        Extract MFCCs of a single chunk, or of a (num_chunks, samples) batch of chunks.
+        
+        Returns:
+            np.ndarray: MFCC features with shape (frames, num_mfcc), or (num_chunks, frames, num_mfcc)
+        """
+        with instrumentation.stage("mfcc"):
+            return features.mfcc(chunk, sample_rate, num_mfcc, n_fft, hop_length)
+
+    @staticmethod
+    def _process_audio_windows(file_path, hop_seconds, num_mfcc=NUM_MFCC, n_fft=N_FFT, hop_length=HOP_LENGTH, vad=False,
+                               sample_rate=MODEL_SAMPLE_RATE, res_type=DEFAULT_RESAMPLER):
+        """
+        Process audio file as overlapping windows of CHUNK_SECONDS length.
+        
+        The log-mel frame matrix is computed once for the whole signal and each window
+        is a strided view of it, so overlap does not multiply the STFT cost. Each window
+        is then clipped to TOP_DB below its own peak before the DCT, as training clips
+        and non-overlapping chunks are. The audio itself is memory-mapped when possible
+        and featurized block by block.
+        
+        With `vad`, windows without speech are dropped before the DCT and inference; the
+        shared log-mel matrix is still computed once for the whole signal.
+        
+        Args:
+            file_path (str): Path to audio file
+            hop_seconds (float): Requested step between window starts, rounded to whole MFCC frames
+            vad (bool): Drop windows without speech
+            sample_rate (int): Model sample rate the audio is decoded at
+            res_type (str): Resampler used when the file's native rate differs
+        
+        Returns:
+            tuple: (MFCC windows with shape (num_kept, frames, num_mfcc), actual hop in seconds,
+                boolean mask over all windows marking the kept ones)
+        """
+        # Memory-map the audio file, or decode it if it needs resampling
+        signal, sample_rate = open_audio(file_path, sample_rate, res_type)
+        window_samples = int(round(CHUNK_SECONDS * sample_rate))
+        instrumentation.add("audio_seconds", len(signal) / sample_rate)
+        
+        window_frames = 1 + window_samples // hop_length
+        hop_frames = max(1, int(round(hop_seconds * sample_rate / hop_length)))
+        
+        # Zero-pad the end so the last window covers the tail of the signal
+        signal_frames = 1 + len(signal) // hop_length
+        num_windows = 1 + int(np.ceil(max(0, signal_frames - window_frames) / hop_frames))
+        if vad:
+            with instrumentation.stage("vad"):
+                speech = voice_activity.speech_windows(
+                    signal, sample_rate, window_samples, hop_frames * hop_length, num_windows
+                )
+        else:
+            speech = np.ones(num_windows, dtype=bool)
+        instrumentation.add("windows", num_windows)
+        instrumentation.add("windows_skipped", num_windows - np.count_nonzero(speech))
+        padded_length = max(len(signal), ((num_windows - 1) * hop_frames + window_frames - 1) * hop_length)
+        
+        # Log-mel frames of the whole (zero-padded) signal, computed once and shared by overlapping windows
+        log_mel = KeywordSpottingService._signal_log_mel(signal, sample_rate, padded_length, n_fft, hop_length)
+        
+        # (num_windows, n_mels, window_frames) view -> (num_windows, window_frames, n_mels)
+        views = np.lib.stride_tricks.sliding_window_view(log_mel, window_frames, axis=0)[::hop_frames]
+        views = views[:num_windows].transpose(0, 2, 1)
+        
+        # Clip each window against its own peak, like a training clip, then take the DCT
+        kept = np.flatnonzero(speech)
+        windows = np.empty((len(kept), window_frames, num_mfcc), dtype=np.float32)
+        for first in range(0, len(kept), MFCC_BATCH_CHUNKS):
+            batch = kept[first:first + MFCC_BATCH_CHUNKS]
+            with instrumentation.stage("mfcc"):
+                windows[first:first + len(batch)] = features.mfcc_from_log_mel(views[batch], num_mfcc)
+        
+        return windows, hop_frames * hop_length / sample_rate, speech
+
+    @staticmethod
+    def _signal_log_mel(signal, sample_rate, length, n_fft=N_FFT, hop_length=HOP_LENGTH):
+        """
+        Log-mel spectrogram of a whole signal, computed MFCC_BLOCK_FRAMES frames at a time.
+        
+        Matches `features.log_mel_spectrogram` on the signal zero-padded to `length`, but
+        only slices of `signal` are ever held in memory. Values are not clipped, so
+        each window can be clipped against its own peak.
+        
+        Args:
+            signal (np.ndarray or MappedWav): Mono float signal
+            sample_rate (int): Sample rate of `signal`
+            length (int): Length the signal is zero-padded to
+        
+        Returns:
+            np.ndarray: dB values with shape (1 + length // hop_length, n_mels)
+        """
+        num_frames = 1 + length // hop_length
+        pad = n_fft // 2  # Frames are centered, as with center=True
+        log_mel = None
+        for first in range(0, num_frames, MFCC_BLOCK_FRAMES):
+            last = min(first + MFCC_BLOCK_FRAMES, num_frames)
+            
+            # Frame k covers samples [k * hop_length - pad, k * hop_length - pad + n_fft), zero outside the signal
+            start, stop = first * hop_length - pad, (last - 1) * hop_length - pad + n_fft
+            segment = np.zeros(stop - start, dtype=np.float32)
+            lo, hi = max(start, 0), min(stop, len(signal))
+            if hi > lo:
+                segment[lo - start:hi - start] = signal[lo:hi]
             
-        return chunks
+            with instrumentation.stage("mfcc"):
+                block = features.log_mel_spectrogram(segment, sample_rate, n_fft, hop_length, center=False)
+                if log_mel is None:
+                    log_mel = np.empty((num_frames, block.shape[1]), dtype=np.float32)
+                log_mel[first:last] = block
+        return log_mel
 
-    def _aggregate_predictions(self, predictions, min_detections):
+    def _aggregate_predictions(self, predictions, min_detections, nms_iou_threshold=None):
         """
         Aggregate predictions to remove duplicates and combine nearby detections.
         
         Args:
             predictions (list): List of (keyword, start_time, end_time, confidence) tuples
             min_detections (int): Minimum number of detections needed to report a keyword
+            nms_iou_threshold (float): If set, merge overlapping windows of the same keyword with
+                non-max suppression instead of combining nearby detections
         
         Returns:
             list: Filtered and combined predictions
@@ -115,6 +644,9 @@ class KeywordSpottingService:
                 keyword_groups[keyword] = []
             keyword_groups[keyword].append((start, end, conf))
             
+        if nms_iou_threshold is not None:
+            return self._non_max_suppression(keyword_groups, min_detections, nms_iou_threshold)
+            
         # Filter and combine predictions
         final_predictions = []
         for keyword, detections in keyword_groups.items():
@@ -129,43 +661,97 @@ class KeywordSpottingService:
                     else:
                         # Process current group
                         if len(current_group) >= min_detections:
-                            avg_conf = np.mean([d[2] for d in current_group])
-                            final_predictions.append({
-                                'keyword': keyword,
-                                'start_time': current_group[0][0],
-                                'end_time': current_group[-1][1],
-                                'confidence': avg_conf,
-                                'num_detections': len(current_group)
-                            })
+                            final_predictions.append(self._group_to_prediction(keyword, current_group))
                         current_group = [detection]
                 
                 # Process last group
                 if len(current_group) >= min_detections:
-                    avg_conf = np.mean([d[2] for d in current_group])
+                    final_predictions.append(self._group_to_prediction(keyword, current_group))
+                    
+        return final_predictions
+
+    def _group_to_prediction(self, keyword, group):
+        """Combine a group of nearby (start_time, end_time, confidence) detections into one prediction."""
+        avg_conf = np.mean([d[2] for d in group])
+        return {
+            'keyword': keyword,
+            'start_time': group[0][0],
+            'end_time': group[-1][1],
+            'confidence': avg_conf,
+            'num_detections': len(group)
+        }
+
+    def _non_max_suppression(self, keyword_groups, min_detections, iou_threshold):
+        """
+        Keep the most confident window of each cluster of overlapping detections.
+        
+        Args:
+            keyword_groups (dict): Keyword -> list of (start_time, end_time, confidence) tuples
+            min_detections (int): Minimum number of windows (kept plus suppressed) needed to report a keyword
+            iou_threshold (float): Intersection-over-union above which a window is suppressed
+        
+        Returns:
+            list: One prediction per kept window, sorted by start time
+        """
+        final_predictions = []
+        for keyword, detections in keyword_groups.items():
+            starts, ends, confidences = np.asarray(detections, dtype=np.float64).T
+            lengths = ends - starts
+            remaining = np.argsort(-confidences, kind="stable")  # Most confident first
+            
+            while remaining.size:
+                best, rest = remaining[0], remaining[1:]
+                # IoU of the kept window against every remaining one at once
+                overlap = np.minimum(ends[best], ends[rest]) - np.maximum(starts[best], starts[rest])
+                intersection = np.maximum(0.0, overlap)
+                union = lengths[best] + lengths[rest] - intersection
+                iou = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+                suppressed = iou > iou_threshold
+                remaining = rest[~suppressed]
+                
+                num_detections = 1 + int(np.count_nonzero(suppressed))
+                if num_detections >= min_detections:
                     final_predictions.append({
                         'keyword': keyword,
-                        'start_time': current_group[0][0],
-                        'end_time': current_group[-1][1],
-                        'confidence': avg_conf,
-                        'num_detections': len(current_group)
+                        'start_time': float(starts[best]),
+                        'end_time': float(ends[best]),
+                        'confidence': float(confidences[best]),
+                        'num_detections': num_detections
                     })
-                    
+        
+        final_predictions.sort(key=lambda x: x['start_time'])
         return final_predictions
 
-def Keyword_Spotting_Service():
-    """Factory function for KeywordSpottingService class."""
-    if KeywordSpottingService._instance is None:
-        KeywordSpottingService._instance = KeywordSpottingService()
-        KeywordSpottingService.model = tf.keras.models.load_model(SAVED_MODEL_PATH)
+def Keyword_Spotting_Service(cache=False):
+    """Factory function for KeywordSpottingService class. The model is loaded exactly once.
+    
+    Args:
+        cache (bool | str): Cache per-window probabilities on disk, so re-analysing a call with
+            different thresholds skips decoding, feature extraction and inference. A string is
+            the cache directory; True uses `ProbabilityCache`'s default. Off by default, since
+            every cached call hashes its input file and the cache grows up to 1 GB.
+    """
+    with KeywordSpottingService._instance_lock:
+        if KeywordSpottingService._instance is None:
+            KeywordSpottingService._instance = KeywordSpottingService()
+            KeywordSpottingService.model = KeywordSpottingService._instance.model
+        if cache and KeywordSpottingService._instance.cache is None:
+            KeywordSpottingService._instance.cache = ProbabilityCache(cache if isinstance(cache, str) else None)
     return KeywordSpottingService._instance
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detect keywords in an audio file.")
+    parser.add_argument("audio", nargs="?", default="test/test2.wav")
+    parser.add_argument("--cache", nargs="?", const=True, default=False, metavar="DIR",
+                        help="Cache per-window probabilities on disk, optionally in DIR")
+    args = parser.parse_args()
+    
     # Create keyword spotting service
-    kss = Keyword_Spotting_Service()
+    kss = Keyword_Spotting_Service(cache=args.cache)
     
     # Make a prediction
     predictions = kss.predict(
-        "test/test2.wav",
+        args.audio,
         confidence_threshold=0.9,
         min_detections=1
     )
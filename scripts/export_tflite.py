@@ -0,0 +1,117 @@
+"""
+Export the trained keyword model to TFLite, as float32 and as int8 post-training
+quantized with representative MFCCs from the training split, and compare each
+export against the Keras backend on test-split accuracy and per-chunk latency.
+Run from the repository root:
+
+    python -m scripts.export_tflite --data features
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from scripts.detect import BACKENDS, SAVED_MODEL_PATH
+from scripts.feature_store import FEATURE_STORE_PATH, load_features as load_store_features, load_metadata
+from scripts.input_pipeline import split_by_file
+from scripts.model_metadata import copy_model_metadata
+from scripts.train import TEST_SIZE, VALIDATION_SIZE
+
+
+def load_features(data_path):
+    """Load MFCCs with a channel axis and labels from a feature store or legacy `data.json`."""
+    X, y = load_store_features(data_path)
+    return np.asarray(X, dtype=np.float32)[..., np.newaxis], y
+
+
+def convert(model, representative=None):
+    """
+    Convert a Keras model to a TFLite flatbuffer.
+
+    Args:
+        model: Loaded Keras model
+        representative (np.ndarray): Calibration inputs; if given, the model is fully
+            int8-quantized, including its input and output tensors
+
+    Returns:
+        bytes: Serialized TFLite model
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if representative is not None:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([x[np.newaxis]] for x in representative)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+def evaluate(backend, X, y, batch_size=64, latency_chunks=200):
+    """
+    Measure accuracy over (X, y) and mean single-chunk latency for a backend.
+
+    Returns:
+        tuple: (accuracy, predicted labels, milliseconds per chunk)
+    """
+    predictions = np.concatenate([
+        backend.predict(X[start:start + batch_size]).argmax(axis=1) for start in range(0, len(X), batch_size)
+    ])
+
+    # Per-chunk latency as seen by streaming callers: batches of one
+    chunks = X[:latency_chunks]
+    backend.predict(chunks[:1])
+    start = time.perf_counter()
+    for chunk in chunks:
+        backend.predict(chunk[np.newaxis])
+    latency_ms = (time.perf_counter() - start) / len(chunks) * 1000
+
+    return np.mean(predictions == y), predictions, latency_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the keyword model to float and int8 TFLite.")
+    parser.add_argument("--model", default=SAVED_MODEL_PATH, help="Trained Keras model")
+    parser.add_argument("--data", default=FEATURE_STORE_PATH,
+                        help="Feature store (or legacy data.json) used for calibration and evaluation")
+    parser.add_argument("--output-dir", default="models")
+    parser.add_argument("--representative", type=int, default=500,
+                        help="Calibration samples for int8 quantization, drawn from the training split")
+    parser.add_argument("--eval-samples", type=int, help="Test-split samples used to compare accuracy (default: all)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Same file-hash split as training: calibrate on training samples, compare on held-out test samples only
+    X, y = load_features(args.data)
+    train_index, _, test_index = split_by_file(load_metadata(args.data)["files"], TEST_SIZE, VALIDATION_SIZE)
+    rng = np.random.default_rng(args.seed)
+    representative = X[np.sort(rng.permutation(train_index)[:args.representative])]
+    eval_index = np.sort(rng.permutation(test_index)[:args.eval_samples])
+    X_eval, y_eval = X[eval_index], y[eval_index]
+
+    keras_backend = BACKENDS["keras"](args.model)
+    stem = os.path.splitext(os.path.basename(args.model))[0]
+    os.makedirs(args.output_dir, exist_ok=True)
+    exports = {
+        "float32": os.path.join(args.output_dir, f"{stem}_float32.tflite"),
+        "int8": os.path.join(args.output_dir, f"{stem}_int8.tflite"),
+    }
+    for name, path in exports.items():
+        flatbuffer = convert(keras_backend.model, representative if name == "int8" else None)
+        with open(path, "wb") as fp:
+            fp.write(flatbuffer)
+        copy_model_metadata(args.model, path)  # Exports decode audio at the same sample rate
+        print(f"Wrote {path}")
+
+    keras_acc, keras_pred, keras_ms = evaluate(keras_backend, X_eval, y_eval)
+    print(f"\n{'backend':<16}{'size (KB)':>12}{'accuracy':>12}{'delta':>10}{'agreement':>12}{'ms/chunk':>10}")
+    print(f"{'keras':<16}{os.path.getsize(args.model) / 1024:>12.1f}{keras_acc * 100:>11.2f}%{'':>10}{'':>12}{keras_ms:>10.3f}")
+    for name, path in exports.items():
+        acc, pred, ms = evaluate(BACKENDS["tflite"](path), X_eval, y_eval)
+        print(f"{'tflite-' + name:<16}{os.path.getsize(path) / 1024:>12.1f}{acc * 100:>11.2f}%"
+              f"{(acc - keras_acc) * 100:>+9.2f}%{np.mean(pred == keras_pred) * 100:>11.2f}%{ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
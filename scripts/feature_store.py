@@ -0,0 +1,216 @@
+"""
+Sharded binary store for extracted MFCC features.
+
+A store is a directory holding float32 `.npy` shards of shape (samples, frames,
+num_mfcc) plus `metadata.json` with the label mapping, per-sample labels and
+file paths, and the sample rate. Shards are memory-mapped on load, so nothing
+is parsed and only the pages actually used are read. Convert an existing
+`data.json` once with:
+
+    python -m scripts.feature_store data.json features
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+if __package__ in (None, ""):
+    # Allow `python scripts/feature_store.py` as well as `python -m scripts.feature_store`
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.audio import MODEL_SAMPLE_RATE
+
+FEATURE_STORE_PATH = "features"  # Default store directory, next to where data.json used to be
+LEGACY_JSON_PATH = "data.json"  # Pre-store dataset file, still readable by the loaders
+METADATA_FILE = "metadata.json"
+SHARD_SIZE = 8192  # Samples per shard file
+SHARD_NAME = re.compile(r"mfcc_(\d+)\.npy")  # Shard file names; the number orders them by creation
+STORE_VERSION = 1
+
+
+class FeatureStoreWriter:
+    """Appends (MFCCs, label, file) samples to a store, writing a shard every SHARD_SIZE samples.
+
+    With `append`, an existing store is extended instead of replaced: its shards are
+    kept, and `remove` rewrites only the shards holding dropped samples. New shards
+    are numbered after every shard file already in the directory, so neither mode
+    overwrites a shard the current metadata uses. Metadata is written last,
+    atomically, and only then are shards it no longer lists deleted, so a crashed
+    run leaves the previous store intact. Use as a context manager or call `close()`.
+    """
+
+    def __init__(self, store_path, mapping=None, sample_rate=MODEL_SAMPLE_RATE, shard_size=SHARD_SIZE,
+                 append=False):
+        self.store_path = store_path
+        self.shard_size = shard_size
+        metadata_path = os.path.join(store_path, METADATA_FILE)
+        if append and os.path.exists(metadata_path):
+            self.metadata = load_metadata(store_path)
+            # Existing label indices never move; new labels go to the end
+            self.metadata["mapping"] += [label for label in mapping or [] if label not in self.metadata["mapping"]]
+        else:
+            self.metadata = {
+                "version": STORE_VERSION,
+                "sample_rate": sample_rate,
+                "mapping": list(mapping or []),
+                "labels": [],
+                "files": [],
+                "shards": [],
+            }
+        self._pending = []
+        os.makedirs(store_path, exist_ok=True)
+        self._next_shard = 1 + max(_shard_numbers(store_path), default=-1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        return False
+
+    def add(self, mfccs, label, file_path):
+        """Append one sample's (frames, num_mfcc) MFCCs with its label index and source file."""
+        self._pending.append(np.asarray(mfccs, dtype=np.float32))
+        self.metadata["labels"].append(int(label))
+        self.metadata["files"].append(file_path)
+        if len(self._pending) >= self.shard_size:
+            self._flush()
+
+    def remove(self, file_paths):
+        """
+        Drop every stored sample whose source file is in `file_paths`.
+
+        Returns:
+            int: Number of samples removed
+        """
+        file_paths = set(file_paths)
+        keep = np.array([file_path not in file_paths for file_path in self.metadata["files"]], dtype=bool)
+        if keep.all():
+            return 0
+
+        shards, offset = [], 0
+        for shard in self.metadata["shards"]:
+            rows = keep[offset:offset + shard["count"]]
+            offset += shard["count"]
+            if rows.all():
+                shards.append(shard)
+                continue
+
+            if rows.any():
+                data = np.load(os.path.join(self.store_path, shard["path"]), mmap_mode="r")[rows]
+                shards.append(self._write_shard(data))
+
+        removed = int(np.count_nonzero(~keep))
+        self.metadata["shards"] = shards
+        self.metadata["labels"] = [label for label, k in zip(self.metadata["labels"], keep) if k]
+        self.metadata["files"] = [file_path for file_path, k in zip(self.metadata["files"], keep) if k]
+        return removed
+
+    def close(self):
+        """Write the last partial shard and the metadata file, then delete shards it does not list."""
+        self._flush()
+        metadata_path = os.path.join(self.store_path, METADATA_FILE)
+        tmp_path = f"{metadata_path}.tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump(self.metadata, fp)
+        os.replace(tmp_path, metadata_path)
+
+        # Replaced, left over from the previous build, or orphaned by a crashed run
+        live = {shard["path"] for shard in self.metadata["shards"]}
+        for name in os.listdir(self.store_path):
+            if SHARD_NAME.fullmatch(name) and name not in live:
+                os.remove(os.path.join(self.store_path, name))
+
+    def _flush(self):
+        if not self._pending:
+            return
+        self.metadata["shards"].append(self._write_shard(np.stack(self._pending)))
+        self._pending = []
+
+    def _write_shard(self, data):
+        name = f"mfcc_{self._next_shard:05d}.npy"
+        self._next_shard += 1
+        np.save(os.path.join(self.store_path, name), data)
+        return {"path": name, "count": len(data)}
+
+
+def _shard_numbers(store_path):
+    """Numbers of all shard files in `store_path`, whether or not its metadata lists them."""
+    return [int(match.group(1)) for match in map(SHARD_NAME.fullmatch, os.listdir(store_path)) if match]
+
+
+def load_metadata(store_path=FEATURE_STORE_PATH):
+    """Read a store's metadata, or the same fields from a legacy `data.json` file."""
+    if os.path.isdir(store_path):
+        with open(os.path.join(store_path, METADATA_FILE), "r") as fp:
+            return json.load(fp)
+
+    with open(store_path, "r") as fp:
+        data = json.load(fp)
+    data.pop("MFCCs", None)
+    return data
+
+
+def load_shards(store_path=FEATURE_STORE_PATH):
+    """Memory-map every shard of a store, in sample order."""
+    metadata = load_metadata(store_path)
+    return [np.load(os.path.join(store_path, shard["path"]), mmap_mode="r") for shard in metadata["shards"]]
+
+
+def load_features(store_path=FEATURE_STORE_PATH):
+    """
+    Load all features and labels of a store, or of a legacy `data.json` file.
+
+    A single-shard store is returned as a read-only memory map; several shards are
+    concatenated straight from their maps into one float32 array.
+
+    Returns:
+        tuple: (MFCCs with shape (samples, frames, num_mfcc), labels with shape (samples,))
+    """
+    if not os.path.isdir(store_path):
+        with open(store_path, "r") as fp:
+            data = json.load(fp)
+        return np.array(data["MFCCs"], dtype=np.float32), np.array(data["labels"])
+
+    shards = load_shards(store_path)
+    X = shards[0] if len(shards) == 1 else np.concatenate(shards)
+    return X, np.array(load_metadata(store_path)["labels"])
+
+
+def load_mapping(store_path=FEATURE_STORE_PATH, legacy_path=LEGACY_JSON_PATH):
+    """Label mapping of the store, falling back to a legacy `data.json` if no store exists."""
+    if os.path.isdir(store_path):
+        return load_metadata(store_path).get("mapping", [])
+    return load_metadata(legacy_path).get("mapping", [])
+
+
+def convert_json(json_path, store_path, shard_size=SHARD_SIZE):
+    """
+    One-shot conversion of a `data.json` written by older `preprocess_dataset` versions.
+
+    Returns:
+        int: Number of samples converted
+    """
+    with open(json_path, "r") as fp:
+        data = json.load(fp)
+
+    with FeatureStoreWriter(store_path, data["mapping"], data.get("sample_rate", MODEL_SAMPLE_RATE),
+                            shard_size) as writer:
+        for mfccs, label, file_path in zip(data["MFCCs"], data["labels"], data["files"]):
+            writer.add(mfccs, label, file_path)
+    return len(data["labels"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a data.json dataset into a sharded binary feature store.")
+    parser.add_argument("json_path", nargs="?", default=LEGACY_JSON_PATH)
+    parser.add_argument("store_path", nargs="?", default=FEATURE_STORE_PATH)
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    args = parser.parse_args()
+
+    count = convert_json(args.json_path, args.store_path, args.shard_size)
+    print(f"Converted {count} samples from {args.json_path} to {args.store_path}")
@@ -0,0 +1,150 @@
+"""
+Batched MFCC extraction in NumPy, shared by dataset preparation and detection.
+
+Matches `librosa.feature.mfcc` with its defaults (centered frames with zero
+padding, periodic Hann window, Slaney mel filterbank, `power_to_db` with an
+80dB floor below each signal's peak, orthonormal DCT-II) to float32 precision.
+Signals are processed as a (batch, samples) array in a few vectorized steps,
+and the window, filterbank and DCT matrices are built once per parameter set.
+"""
+import functools
+
+import numpy as np
+import scipy.fft
+
+NUM_MFCC = 13  # Coefficients kept per frame
+N_FFT = 2048  # Samples per FFT window
+HOP_LENGTH = 512  # Samples between frame starts
+N_MELS = 128  # Mel bands before the DCT
+TOP_DB = 80.0  # Log-mel values are clipped to this far below each signal's maximum
+AMIN = 1e-10  # Power floor before taking the log
+FEATURE_VERSION = 1  # Bump whenever decoding, windowing or MFCC computation changes feature values
+
+
+@functools.lru_cache(maxsize=None)
+def hann_window(n_fft):
+    """Periodic Hann window of `n_fft` samples, as used by the STFT."""
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+
+def _hz_to_mel(frequencies):
+    """Slaney mel scale: linear below 1kHz, logarithmic above."""
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    log_mels = 15.0 + np.log(np.maximum(frequencies, 1000.0) / 1000.0) / (np.log(6.4) / 27.0)
+    return np.where(frequencies >= 1000.0, log_mels, frequencies / (200.0 / 3))
+
+
+def _mel_to_hz(mels):
+    mels = np.asarray(mels, dtype=np.float64)
+    log_frequencies = 1000.0 * np.exp((np.log(6.4) / 27.0) * (np.maximum(mels, 15.0) - 15.0))
+    return np.where(mels >= 15.0, log_frequencies, mels * (200.0 / 3))
+
+
+@functools.lru_cache(maxsize=None)
+def mel_filterbank(sample_rate, n_fft=N_FFT, n_mels=N_MELS):
+    """
+    Slaney-normalized triangular mel filterbank, as `librosa.filters.mel` builds it.
+
+    Returns:
+        np.ndarray: Read-only (1 + n_fft // 2, n_mels) float32 matrix mapping power bins to mel bands
+    """
+    fft_frequencies = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    mel_frequencies = _mel_to_hz(np.linspace(_hz_to_mel(0.0), _hz_to_mel(sample_rate / 2.0), n_mels + 2))
+
+    widths = np.diff(mel_frequencies)
+    ramps = mel_frequencies[:, np.newaxis] - fft_frequencies[np.newaxis, :]
+    lower = -ramps[:-2] / widths[:-1, np.newaxis]
+    upper = ramps[2:] / widths[1:, np.newaxis]
+    weights = np.maximum(0, np.minimum(lower, upper))
+
+    # Slaney normalization: each filter has unit area
+    weights *= (2.0 / (mel_frequencies[2:] - mel_frequencies[:-2]))[:, np.newaxis]
+
+    basis = np.ascontiguousarray(weights.T, dtype=np.float32)
+    basis.setflags(write=False)
+    return basis
+
+
+@functools.lru_cache(maxsize=None)
+def dct_matrix(num_mfcc=NUM_MFCC, n_mels=N_MELS):
+    """
+    Orthonormal DCT-II, truncated to the first `num_mfcc` coefficients.
+
+    Returns:
+        np.ndarray: Read-only (n_mels, num_mfcc) float32 matrix
+    """
+    n = np.arange(n_mels)
+    k = np.arange(num_mfcc)
+    basis = np.cos(np.pi / n_mels * (n[:, np.newaxis] + 0.5) * k[np.newaxis, :]) * np.sqrt(2.0 / n_mels)
+    basis[:, 0] /= np.sqrt(2.0)
+    basis = basis.astype(np.float32)
+    basis.setflags(write=False)
+    return basis
+
+
+def power_to_db(power, amin=AMIN):
+    """10 * log10(power) with a floor at `amin`, relative to a reference of 1.0 and not clipped."""
+    return 10.0 * np.log10(np.maximum(power, amin))
+
+
+def log_mel_spectrogram(signals, sample_rate, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS, center=True):
+    """
+    Log-power mel spectrogram of a batch of equal-length signals.
+
+    Args:
+        signals (np.ndarray): (batch, samples) or (samples,) float signal
+        sample_rate (int): Sample rate of `signals`
+        center (bool): Zero-pad n_fft // 2 samples on both sides so frame k is centered on
+            sample k * hop_length; otherwise frame k starts there
+
+    Returns:
+        np.ndarray: (batch, frames, n_mels) float32 dB values, or (frames, n_mels) for 1-D input
+    """
+    signals = np.asarray(signals, dtype=np.float32)
+    if center:
+        pad = [(0, 0)] * (signals.ndim - 1) + [(n_fft // 2, n_fft // 2)]
+        signals = np.pad(signals, pad)
+
+    # (..., frames, n_fft) strided view; only the windowed copy is materialized
+    frames = np.lib.stride_tricks.sliding_window_view(signals, n_fft, axis=-1)[..., ::hop_length, :]
+    # scipy's FFT transforms float32 natively, about 3x faster here than numpy's
+    spectrum = scipy.fft.rfft(frames * hann_window(n_fft), axis=-1)
+    power = np.square(spectrum.real) + np.square(spectrum.imag)
+    return power_to_db(power @ mel_filterbank(sample_rate, n_fft, n_mels))
+
+
+def mfcc_from_log_mel(log_mel, num_mfcc=NUM_MFCC, top_db=TOP_DB):
+    """
+    Clip a log-mel spectrogram to `top_db` below each signal's maximum and take the DCT.
+
+    Args:
+        log_mel (np.ndarray): (batch, frames, n_mels) or (frames, n_mels) dB values; clipped in place
+        top_db (float): Dynamic range kept below the loudest bin of each signal, or None
+
+    Returns:
+        np.ndarray: (batch, frames, num_mfcc) or (frames, num_mfcc) float32 MFCCs
+    """
+    if top_db is not None:
+        peak = log_mel.max(axis=(-2, -1), keepdims=True)
+        np.maximum(log_mel, peak - top_db, out=log_mel)
+    return log_mel @ dct_matrix(num_mfcc, log_mel.shape[-1])
+
+
+def mfcc(signals, sample_rate, num_mfcc=NUM_MFCC, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS,
+         top_db=TOP_DB, center=True):
+    """
+    MFCCs of a batch of equal-length signals, equivalent to `librosa.feature.mfcc(...).T` per signal.
+
+    Args:
+        signals (np.ndarray): (batch, samples) or (samples,) float signal
+        sample_rate (int): Sample rate of `signals`
+        center (bool): Zero-pad the signals as librosa does; False takes frames of the signals as
+            they are, e.g. a window cut from a longer recording with n_fft // 2 samples of context
+
+    Returns:
+        np.ndarray: (batch, frames, num_mfcc) float32 MFCCs, or (frames, num_mfcc) for 1-D input
+    """
+    log_mel = log_mel_spectrogram(signals, sample_rate, n_fft, hop_length, n_mels, center)
+    return mfcc_from_log_mel(log_mel, num_mfcc, top_db)
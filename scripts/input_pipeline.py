@@ -0,0 +1,205 @@
+"""
+Streaming tf.data input pipeline over a sharded feature store.
+
+Samples are read from the memory-mapped shards in contiguous blocks by a
+parallel map stage, so the dataset never has to fit in memory. Blocks are then
+split into samples, optionally cached, shuffled through a bounded buffer,
+batched, augmented in a parallel map stage and prefetched.
+"""
+import hashlib
+import os
+import re
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from scripts.feature_store import load_metadata, load_shards
+
+READ_BLOCK_SIZE = 1024  # Contiguous samples read from a shard per read call
+SHUFFLE_BUFFER = 8192  # Samples held for shuffling, whatever the dataset size
+NOISE_LEVEL = 0.05  # Std of added Gaussian noise, relative to each sample's feature std
+MAX_SHIFT_FRAMES = 4  # Largest random time shift in MFCC frames, either way
+TIME_MASKS = 2  # SpecAugment masks over time per sample
+TIME_MASK_FRAMES = 5  # Widest time mask in frames
+FREQ_MASKS = 1  # SpecAugment masks over MFCC coefficients per sample
+FREQ_MASK_COEFFS = 2  # Widest coefficient mask
+
+
+def split_by_file(files, test_size=0.2, validation_size=0.2):
+    """
+    Split sample indices by a hash of each sample's file name, so a file stays in the same set as the store grows.
+
+    Adding or removing files never moves the others between sets, which keeps
+    resumed and fine-tuning runs from training on test samples.
+    As in the Speech Commands recipe, anything after `_nohash_` is ignored, so all
+    clips of one speaker land in the same set.
+
+    Args:
+        files (list): Source file of every sample in the store
+        test_size (float): Fraction of samples used for testing
+        validation_size (float): Fraction of the remaining samples used for validation
+
+    Returns:
+        tuple: (train, validation, test) index arrays
+    """
+    names = (re.sub(r"_nohash_.*$", "", os.path.basename(file_path)) for file_path in files)
+    fractions = np.array([int(hashlib.sha1(name.encode()).hexdigest()[:8], 16) / 2 ** 32 for name in names])
+    test = fractions < test_size
+    validation = ~test & (fractions < test_size + (1 - test_size) * validation_size)
+    indices = np.arange(len(fractions))
+    return indices[~test & ~validation], indices[validation], indices[test]
+
+
+def _mask(length, count, max_width, batch_size):
+    """(batch, length) boolean mask of `count` random spans of up to `max_width` per row."""
+    positions = tf.range(length)[tf.newaxis, :]
+    mask = tf.zeros((batch_size, length), dtype=tf.bool)
+    for _ in range(count):
+        width = tf.random.uniform((batch_size, 1), 0, max_width + 1, dtype=tf.int32)
+        start = tf.cast(tf.random.uniform((batch_size, 1)) * tf.cast(length - width + 1, tf.float32), tf.int32)
+        mask |= (positions >= start) & (positions < start + width)
+    return mask
+
+
+def augment_batch(features, labels, noise_level=NOISE_LEVEL, max_shift_frames=MAX_SHIFT_FRAMES,
+                  time_masks=TIME_MASKS, time_mask_frames=TIME_MASK_FRAMES, freq_masks=FREQ_MASKS,
+                  freq_mask_coeffs=FREQ_MASK_COEFFS):
+    """
+    Randomly augment a (batch, frames, num_mfcc) batch, independently per sample.
+
+    Noise is mixed in the feature domain, since the store holds MFCCs and not
+    audio. Time shifts repeat the edge frame. SpecAugment masks replace the
+    masked frames or coefficients with the sample's mean.
+
+    Returns:
+        tuple: (augmented features, labels)
+    """
+    batch_size = tf.shape(features)[0]
+    num_frames, num_mfcc = features.shape[1], features.shape[2]
+
+    if noise_level:
+        std = tf.math.reduce_std(features, axis=[1, 2], keepdims=True)
+        features += tf.random.normal(tf.shape(features)) * (noise_level * std)
+
+    if max_shift_frames:
+        shifts = tf.random.uniform((batch_size, 1), -max_shift_frames, max_shift_frames + 1, dtype=tf.int32)
+        source = tf.clip_by_value(tf.range(num_frames)[tf.newaxis, :] - shifts, 0, num_frames - 1)
+        features = tf.gather(features, source, batch_dims=1)
+
+    mean = tf.reduce_mean(features, axis=[1, 2], keepdims=True)
+    if time_masks:
+        mask = _mask(num_frames, time_masks, time_mask_frames, batch_size)
+        features = tf.where(mask[:, :, tf.newaxis], mean, features)
+    if freq_masks:
+        mask = _mask(num_mfcc, freq_masks, freq_mask_coeffs, batch_size)
+        features = tf.where(mask[:, tf.newaxis, :], mean, features)
+    return features, labels
+
+
+def make_dataset(store_path, indices, batch_size, shuffle=False, augment=False, cache=False, seed=None,
+                 shuffle_buffer=SHUFFLE_BUFFER, stall_monitor=None):
+    """
+    Build a batched tf.data pipeline over the samples `indices` of a feature store.
+
+    Args:
+        store_path (str): Feature store directory
+        indices (np.ndarray): Sample indices to include, e.g. from `split_by_file`
+        batch_size (int): Samples per batch
+        shuffle (bool): Shuffle the block read order and samples every epoch
+        augment (bool): Apply `augment_batch` to every batch
+        cache (bool or str): Cache samples after the first epoch, in memory if True or in
+            files with this prefix, so later epochs skip the shard reads
+        seed (int): Seed for shuffling
+        shuffle_buffer (int): Samples held in the shuffle buffer
+        stall_monitor (InputStallMonitor): Stamp each batch for this monitor as training takes it
+
+    Returns:
+        tf.data.Dataset: Batches of ((batch, frames, num_mfcc, 1) float32 features, (batch,) int64 labels)
+    """
+    shards = load_shards(store_path)
+    labels = np.array(load_metadata(store_path)["labels"], dtype=np.int64)
+    num_frames, num_mfcc = shards[0].shape[1:]
+    offsets = np.cumsum([0] + [len(shard) for shard in shards])
+
+    # Contiguous runs of at most READ_BLOCK_SIZE selected rows within one shard
+    indices = np.sort(np.asarray(indices))
+    blocks = []
+    for shard_index, shard in enumerate(shards):
+        rows = indices[(indices >= offsets[shard_index]) & (indices < offsets[shard_index + 1])]
+        blocks += [(shard_index, rows[i:i + READ_BLOCK_SIZE]) for i in range(0, len(rows), READ_BLOCK_SIZE)]
+
+    def read_block(block):
+        shard_index, rows = blocks[block]
+        return shards[shard_index][rows - offsets[shard_index]], labels[rows]
+
+    def read(block):
+        features, block_labels = tf.numpy_function(read_block, [block], (tf.float32, tf.int64), stateful=False)
+        return tf.ensure_shape(features, (None, num_frames, num_mfcc)), tf.ensure_shape(block_labels, (None,))
+
+    dataset = tf.data.Dataset.range(len(blocks))
+    if shuffle and not cache:
+        dataset = dataset.shuffle(len(blocks), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.map(read, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle).unbatch()
+    if cache:
+        dataset = dataset.cache() if cache is True else dataset.cache(cache)
+    if shuffle:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    if augment:
+        dataset = dataset.map(augment_batch, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+    dataset = dataset.map(lambda features, batch_labels: (features[..., tf.newaxis], batch_labels),
+                          num_parallel_calls=tf.data.AUTOTUNE)
+    # unbatch() loses the length; restore it so Keras shows progress and ends epochs cleanly
+    dataset = dataset.apply(tf.data.experimental.assert_cardinality(-(-len(indices) // batch_size)))
+    dataset = dataset.prefetch(tf.data.AUTOTUNE)
+    if stall_monitor is not None:
+        # Sequential, so it runs in the consumer's fetch right after any wait on the prefetch buffer
+        dataset = dataset.map(stall_monitor.mark_ready)
+    return dataset
+
+
+class InputStallMonitor(tf.keras.callbacks.Callback):
+    """Measures how long training waits on the input pipeline each epoch.
+
+    Build the training dataset with `make_dataset(..., stall_monitor=monitor)` and
+    pass the monitor as a callback. The pipeline's last stage records, in graph, the
+    time each batch leaves the prefetch buffer. Keras fetches batches inside the train
+    step, so the time from `on_train_batch_begin` to that moment was spent waiting on
+    input. It is summed per epoch, printed, and recorded in the history as
+    `input_stall_seconds`. The first step of a run also traces the train function and
+    is left out.
+    """
+
+    def __init__(self, verbose=True):
+        super().__init__()
+        self.verbose = verbose
+        self.stall_seconds = []
+        self.ready_time = tf.Variable(0.0, dtype=tf.float64, trainable=False)
+        self._traced = False
+
+    def mark_ready(self, *batch):
+        """`Dataset.map` function stamping the wall-clock time a batch is handed to the consumer."""
+        with tf.control_dependencies([self.ready_time.assign(tf.timestamp())]):
+            return tuple(tf.identity(tensor) for tensor in batch)
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._stall = 0.0
+        self._start = time.perf_counter()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._step_start = time.time()  # Same clock as tf.timestamp
+
+    def on_train_batch_end(self, batch, logs=None):
+        if self._traced:
+            self._stall += max(0.0, float(self.ready_time.numpy()) - self._step_start)
+        self._traced = True
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._start
+        self.stall_seconds.append(self._stall)
+        if logs is not None:
+            logs["input_stall_seconds"] = self._stall
+        if self.verbose:
+            print(f"Epoch {epoch + 1}: input stall {self._stall:.2f}s of {elapsed:.2f}s "
+                  f"({100 * self._stall / max(elapsed, 1e-9):.1f}%)")
@@ -0,0 +1,170 @@
+import contextlib
+import contextvars
+import cProfile
+import os
+import threading
+import time
+from collections import defaultdict
+
+PROFILE_ENV_VAR = "KWS_PROFILE"  # Set to a file path to cProfile every predict call into it
+METRICS_PREFIX = "kws"  # Prefix of exported Prometheus metric names
+
+_NULL_STAGE = contextlib.nullcontext()
+_active = contextvars.ContextVar("active_pipeline_stats", default=None)
+
+
+class _Stage:
+    """Context manager adding its wall time to one stage of a PipelineStats."""
+
+    __slots__ = ("stats", "name", "start")
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.record(self.name, time.perf_counter() - self.start)
+
+
+class PipelineStats:
+    """Per-stage wall time, call counts and counters for the detection pipeline.
+
+    Stages are timed inclusively (e.g. `predict` contains `mfcc`). When disabled,
+    `stage` returns a shared no-op context manager and `add` returns at once, so
+    instrumented code costs one attribute check per call.
+    """
+
+    def __init__(self, enabled=True, profile_path=None):
+        """
+        Args:
+            enabled (bool): Record timings and counters
+            profile_path (str): If set, every `track` block runs under cProfile and the
+                cumulative profile is written here after each call
+        """
+        self.enabled = enabled
+        self.profile_path = profile_path
+        self._profiler = cProfile.Profile() if profile_path else None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all recorded timings and counters."""
+        with self._lock:
+            self._seconds = defaultdict(float)
+            self._calls = defaultdict(int)
+            self._counters = defaultdict(float)
+
+    def stage(self, name):
+        """Context manager timing one pass through stage `name`."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        """Add one call of `seconds` to stage `name`."""
+        with self._lock:
+            self._seconds[name] += seconds
+            self._calls[name] += 1
+
+    def merge(self, snapshot):
+        """Add the timings and counters of a `snapshot` taken elsewhere, e.g. in a worker process."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for name, stage in snapshot["stages"].items():
+                self._seconds[name] += stage["seconds"]
+                self._calls[name] += stage["calls"]
+            for name, value in snapshot["counters"].items():
+                self._counters[name] += value
+
+    def add(self, name, value=1):
+        """Increase counter `name` (e.g. chunks, audio_seconds) by `value`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] += value
+
+    @contextlib.contextmanager
+    def track(self, name):
+        """
+        Time an entry point as stage `name` and make these stats the target of the
+        module-level `stage`/`add` helpers used by feature extraction, in this context only.
+        """
+        if not self.enabled and self._profiler is None:
+            yield
+            return
+
+        token = _active.set(self if self.enabled else None)
+        if self._profiler is not None:
+            self._profiler.enable()
+        try:
+            with self.stage(name):
+                yield
+        finally:
+            if self._profiler is not None:
+                self._profiler.disable()
+                self._profiler.dump_stats(self.profile_path)
+            try:
+                _active.reset(token)
+            except ValueError:
+                pass  # A generator closed from another context, e.g. by garbage collection
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: {"stages": {name: {"seconds", "calls"}}, "counters": {name: value}}
+        """
+        with self._lock:
+            return {
+                "stages": {
+                    name: {"seconds": self._seconds[name], "calls": self._calls[name]} for name in sorted(self._seconds)
+                },
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def to_prometheus(self, prefix=METRICS_PREFIX):
+        """Render the current snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds_total Wall time spent in each pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        lines += [
+            f'{prefix}_stage_seconds_total{{stage="{name}"}} {stage["seconds"]:.9g}'
+            for name, stage in snapshot["stages"].items()
+        ]
+        lines += [
+            f"# HELP {prefix}_stage_calls_total Times each pipeline stage ran.",
+            f"# TYPE {prefix}_stage_calls_total counter",
+        ]
+        lines += [
+            f'{prefix}_stage_calls_total{{stage="{name}"}} {stage["calls"]}'
+            for name, stage in snapshot["stages"].items()
+        ]
+        for name, value in snapshot["counters"].items():
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {value:.9g}"]
+        return "\n".join(lines) + "\n"
+
+
+def stats_from_environment(enabled=True):
+    """PipelineStats with cProfile turned on if PROFILE_ENV_VAR names an output file."""
+    return PipelineStats(enabled, profile_path=os.environ.get(PROFILE_ENV_VAR) or None)
+
+
+def stage(name):
+    """Time stage `name` against the stats tracking the current call, if any."""
+    stats = _active.get()
+    if stats is None:
+        return _NULL_STAGE
+    return _Stage(stats, name)
+
+
+def add(name, value=1):
+    """Increase counter `name` on the stats tracking the current call, if any."""
+    stats = _active.get()
+    if stats is not None:
+        stats.add(name, value)
@@ -0,0 +1,63 @@
+import json
+import os
+import shutil
+
+
+def metadata_path(model_path):
+    """Sidecar JSON stored next to a model file, e.g. models/model.keras -> models/model.json."""
+    return os.path.splitext(model_path)[0] + ".json"
+
+
+def save_model_metadata(model_path, **metadata):
+    """
+    Record how a model's inputs were produced (e.g. sample_rate) next to the model file.
+
+    Keys already in the sidecar are kept unless overwritten.
+    """
+    path = metadata_path(model_path)
+    existing = load_model_metadata(model_path)
+    with open(path, "w") as fp:
+        json.dump({**existing, **metadata}, fp, indent=4)
+    return path
+
+
+def load_model_metadata(model_path):
+    """Return the metadata saved with a model, or an empty dict for models trained before it existed."""
+    try:
+        with open(metadata_path(model_path), "r") as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return {}
+
+
+def training_manifest_path(model_path):
+    """Per-sample record of a model's training data, e.g. models/model.keras -> models/model.samples.json."""
+    return os.path.splitext(model_path)[0] + ".samples.json"
+
+
+def save_training_manifest(model_path, manifest):
+    """
+    Record the files a model was trained on, mapped to their SHA-256 when it was trained.
+
+    Kept apart from the metadata sidecar, which inference reads at startup.
+    """
+    path = training_manifest_path(model_path)
+    with open(path, "w") as fp:
+        json.dump(manifest, fp)
+    return path
+
+
+def load_training_manifest(model_path):
+    """Return the files a model was trained on, or an empty dict if it was trained before they were recorded."""
+    try:
+        with open(training_manifest_path(model_path), "r") as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return {}
+
+
+def copy_model_metadata(source_model_path, target_model_path):
+    """Carry a model's metadata over to a derived artifact such as a TFLite export."""
+    source = metadata_path(source_model_path)
+    if os.path.exists(source):
+        shutil.copyfile(source, metadata_path(target_model_path))
@@ -0,0 +1,113 @@
+import json
+import os
+
+import numpy as np
+
+PCM_CACHE_DIR = ".cache/pcm"
+PCM_CACHE_DTYPE = "float32"  # "int16" halves the size but requantizes resampled clips
+DATA_FILE = "pcm.bin"
+INDEX_FILE = "index.json"
+
+
+def encode(signal, dtype):
+    """Convert a float32 signal in [-1, 1) to the cache's storage dtype."""
+    if np.dtype(dtype) == np.int16:
+        return np.clip(np.round(signal * 32768), -32768, 32767).astype(np.int16)
+    return np.asarray(signal, dtype=np.float32)
+
+
+def decode(samples, dtype):
+    """Inverse of `encode`; int16 is scaled exactly as 16-bit WAV decoding does."""
+    if np.dtype(dtype) == np.int16:
+        return samples.astype(np.float32) / 32768
+    return np.asarray(samples, dtype=np.float32)
+
+
+class PCMCache:
+    """Decoded, resampled and trimmed clips in one memory-mapped array with an offset index.
+
+    Each decoding setup (sample rate, resampler, clip length, dtype) gets its own
+    directory holding an append-only `pcm.bin` and `index.json`, which maps a
+    clip's path to its sample offset and length plus the size, mtime and SHA-256
+    the clip had when it was decoded. Entries are valid while size and mtime
+    match; a changed clip is decoded again and appended, leaving its old samples
+    unused until the cache directory is deleted.
+    """
+
+    def __init__(self, sample_rate, res_type, max_samples, cache_dir=PCM_CACHE_DIR, dtype=PCM_CACHE_DTYPE):
+        """
+        Args:
+            sample_rate (int): Rate clips are decoded at
+            res_type (str): Resampler used for clips at other rates
+            max_samples (int): Clips are trimmed to this many samples before caching
+            cache_dir (str): Root directory shared by all decoding setups
+            dtype (str): Storage dtype, "float32" or "int16"
+        """
+        self.dtype = np.dtype(dtype)
+        self.directory = os.path.join(cache_dir, f"{sample_rate}hz_{res_type}_{max_samples}_{self.dtype.name}")
+        self.data_path = os.path.join(self.directory, DATA_FILE)
+        self.index_path = os.path.join(self.directory, INDEX_FILE)
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as fp:
+                self.index = json.load(fp)
+        # Samples beyond the last indexed clip are from a run that crashed before saving the index
+        self._size = max((entry["offset"] + entry["length"] for entry in self.index.values()), default=0)
+        self._fp = None
+
+    def lookup(self, file_path, stat=None):
+        """
+        Returns:
+            dict: The index entry for `file_path` if it is cached and unchanged, else None
+        """
+        entry = self.index.get(file_path)
+        if entry is None:
+            return None
+        stat = stat or os.stat(file_path)
+        if entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            return None
+        return entry
+
+    def add(self, file_path, samples, stat, sha256, decode_seconds):
+        """
+        Append a clip's samples (already in the cache dtype) and index them. Only the
+        process owning the cache may call this; call `save` to persist the index.
+        """
+        samples = np.asarray(samples, dtype=self.dtype)
+        if self._fp is None:
+            self._fp = open(self.data_path, "r+b" if os.path.exists(self.data_path) else "wb")
+        self._fp.seek(self._size * self.dtype.itemsize)
+        self._fp.write(samples.tobytes())
+        self.index[file_path] = {
+            "offset": self._size,
+            "length": len(samples),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+            "decode_seconds": decode_seconds,
+        }
+        self._size += len(samples)
+
+    def save(self):
+        """Flush appended samples, then write the index atomically so it never points past the data."""
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump(self.index, fp)
+        os.replace(tmp_path, self.index_path)
+
+
+def open_samples(data_path, dtype):
+    """Memory-map a cache's sample array read-only, e.g. in a worker process."""
+    if not os.path.exists(data_path) or os.path.getsize(data_path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(data_path, dtype=dtype, mode="r")
+
+
+def read_clip(samples, entry, dtype):
+    """Float32 samples of one indexed clip from an `open_samples` array."""
+    return decode(samples[entry["offset"]:entry["offset"] + entry["length"]], dtype)
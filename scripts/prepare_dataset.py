@@ -1,67 +1,275 @@
-import librosa
+import argparse
+import itertools
+import multiprocessing
 import os
-import json
+import sys
+import time
+
+import numpy as np
+
+if __package__ in (None, ""):
+    # Allow `python scripts/prepare_dataset.py` as well as `python -m scripts.prepare_dataset`
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import features
+from scripts.audio import DEFAULT_RESAMPLER, MODEL_SAMPLE_RATE, open_audio
+from scripts.feature_store import FEATURE_STORE_PATH, METADATA_FILE, SHARD_SIZE, FeatureStoreWriter, load_metadata
+from scripts import pcm_cache
+from scripts.pcm_cache import PCM_CACHE_DIR, PCM_CACHE_DTYPE, PCMCache
+from scripts.probability_cache import file_digest
 
 DATASET_PATH = "data"
-JSON_PATH = "data.json"
-SAMPLES_TO_CONSIDER = 22050  # 1 second of audio
+SAMPLES_TO_CONSIDER = 22050  # 1 second of audio at 22050Hz
+SAMPLE_RATE = MODEL_SAMPLE_RATE  # Rate clips are decoded at; use 16000 to keep Speech Commands native
+NUM_WORKERS = os.cpu_count()  # Feature extraction processes; 1 runs serially in this process
+CHUNKSIZE = 64  # Files handed to a worker, and featurized together, at a time
+
+
+def extract_batch_features(batch):
+    """
+    Load a batch of clips, from the PCM cache where possible, and extract all their
+    MFCCs in one vectorized call. Runs in a worker process.
+    
+    Clips missing from the cache are hashed and decoded, and their trimmed samples are
+    returned so the parent process can append them to the cache.
+    
+    :param batch (tuple): (items, sample_rate, res_type, samples_to_consider, num_mfcc, n_fft, hop_length,
+        cache_data_path, cache_dtype), where items are (file_path, cache entry or None) and
+        cache_data_path is None when caching is disabled
+    :return (list): Per file, (MFCCs with shape (frames, num_mfcc), or None if the clip is too short;
+        SHA-256 of the file; error message or None; samples to cache or None; seconds spent decoding)
+    """
+    (items, sample_rate, res_type, samples_to_consider, num_mfcc, n_fft, hop_length,
+     cache_data_path, cache_dtype) = batch
+    cached = None
+    if cache_data_path is not None and any(entry is not None for _, entry in items):
+        cached = pcm_cache.open_samples(cache_data_path, cache_dtype)
+    
+    results = [None] * len(items)
+    signals, rows = [], []
+    for i, (file_path, entry) in enumerate(items):
+        try:
+            if entry is not None:
+                # Decoded by an earlier run: read the samples straight from the cache
+                signal = pcm_cache.read_clip(cached, entry, cache_dtype)
+                digest, pcm, decode_seconds = entry["sha256"], None, 0.0
+            else:
+                # The content hash goes into the manifest, so later runs can tell a touched file from an edited one
+                digest = file_digest(file_path)
+
+                # Memory-map the audio file (decoding it only if it needs resampling), trimmed to a fixed length
+                start = time.perf_counter()
+                signal, sample_rate = open_audio(file_path, sample_rate, res_type)
+                signal = np.asarray(signal[:samples_to_consider], dtype=np.float32)
+                decode_seconds = time.perf_counter() - start
+
+                pcm = None
+                if cache_data_path is not None:
+                    # Featurize the stored samples, so results do not depend on whether the cache was hit
+                    pcm = pcm_cache.encode(signal, cache_dtype)
+                    signal = pcm_cache.decode(pcm, cache_dtype)
+
+            # Only process files with enough samples
+            if len(signal) < samples_to_consider:
+                results[i] = (None, digest, None, pcm, decode_seconds)
+                continue
+
+            signals.append(signal)
+            rows.append((i, digest, pcm, decode_seconds))
+        except Exception as e:
+            # Corrupt or unreadable files are reported and skipped instead of aborting the run
+            results[i] = (None, None, f"{type(e).__name__}: {e}", None, 0.0)
+
+    # Extract MFCC features
+    if signals:
+        MFCCs = features.mfcc(np.stack(signals), sample_rate, num_mfcc, n_fft, hop_length)
+        for (i, digest, pcm, decode_seconds), mfccs in zip(rows, MFCCs):
+            results[i] = (mfccs, digest, None, pcm, decode_seconds)
+    return results
 
 
-def preprocess_dataset(dataset_path, json_path, num_mfcc=13, n_fft=2048, hop_length=512):
+def preprocess_dataset(dataset_path, store_path, num_mfcc=features.NUM_MFCC, n_fft=features.N_FFT,
+                       hop_length=features.HOP_LENGTH, sample_rate=SAMPLE_RATE, res_type=DEFAULT_RESAMPLER,
+                       num_workers=NUM_WORKERS, chunksize=CHUNKSIZE, shard_size=SHARD_SIZE, incremental=True,
+                       pcm_cache_dir=PCM_CACHE_DIR, pcm_cache_dtype=PCM_CACHE_DTYPE):
     """
-    Extract MFCCs from the dataset and save to a JSON file.
+    Extract MFCCs from the dataset and save them to a sharded binary feature store.
+    
+    Files are processed by a pool of `num_workers` processes, each taking `chunksize`
+    files at a time and featurizing them as one batch. Results are collected
+    in directory-walk order, so the output is identical to a serial run, and are
+    streamed into float32 shards so memory does not grow with the dataset.
+    
+    The store keeps a manifest of every processed file (size, mtime and SHA-256)
+    and the feature parameters. When `incremental` is set and the parameters match,
+    only new or changed files are extracted and appended; samples of deleted or
+    changed files are dropped. A file whose mtime changed but whose content hash did
+    not is left alone. Labels keep the index they were first given, and new labels
+    are appended to the mapping, so a trained model's outputs stay valid.
+    
+    Decoded clips are kept in a PCM cache (see `scripts.pcm_cache`) keyed by sample
+    rate, resampler and clip length, so sweeping `num_mfcc`, `n_fft` or `hop_length`
+    decodes the dataset only once. The decode time saved is reported at the end.
     
     :param dataset_path (str): Path to the dataset folder.
-    :param json_path (str): Path to save the JSON file.
+    :param store_path (str): Directory of the feature store (see `scripts.feature_store`).
     :param num_mfcc (int): Number of MFCC features to extract.
     :param n_fft (int): Number of samples per FFT window.
     :param hop_length (int): Step size between FFT windows.
+    :param sample_rate (int): Rate audio is decoded at; files already at this rate are not resampled.
+    :param res_type (str): Resampler from `scripts.audio.RESAMPLERS` for files at other rates.
+    :param num_workers (int): Number of worker processes; 1 extracts serially in this process.
+    :param chunksize (int): Files sent to a worker, and featurized together, per task.
+    :param shard_size (int): Samples per shard file.
+    :param incremental (bool): Update an existing store instead of rebuilding it.
+    :param pcm_cache_dir (str): Root of the decoded-PCM cache, or None to always decode.
+    :param pcm_cache_dtype (str): Sample format of the PCM cache, "float32" or "int16".
+    :return (list): (file_path, error) for every file that could not be processed.
     """
-    
-    # Create a dictionary to store labels, MFCCs, and file paths
-    data = {
-        "mapping": [],
-        "labels": [],
-        "MFCCs": [],
-        "files": []
+    # One second of audio at the chosen rate
+    samples_to_consider = int(round(SAMPLES_TO_CONSIDER * sample_rate / MODEL_SAMPLE_RATE))
+    params = {
+        "feature_version": features.FEATURE_VERSION,
+        "num_mfcc": num_mfcc,
+        "n_fft": n_fft,
+        "hop_length": hop_length,
+        "sample_rate": sample_rate,
+        "res_type": res_type,
+        "samples_to_consider": samples_to_consider,
     }
 
-    # Traverse the dataset directory
-    for i, (dirpath, dirnames, filenames) in enumerate(os.walk(dataset_path)):
+    # Reuse the existing store only if it was built with the same feature parameters
+    previous = {}
+    if incremental and os.path.exists(os.path.join(store_path, METADATA_FILE)):
+        previous = load_metadata(store_path)
+        if previous.get("params") != params:
+            print("Feature parameters changed, rebuilding the store", file=sys.stderr)
+            previous = {}
+    manifest = previous.get("manifest", {})
+
+    # Traverse the dataset directory and list every file with its label
+    mapping = list(previous.get("mapping", []))
+    files = []
+    for dirpath, dirnames, filenames in os.walk(dataset_path):
 
         # Skip the root directory
         if dirpath != dataset_path:
 
-            # Extract the folder name to use as a label
+            # Extract the folder name to use as a label; known labels keep their index
             label = os.path.basename(dirpath)
-            data["mapping"].append(label)
-            print(f"\nProcessing: '{label}'")
+            if label not in mapping:
+                mapping.append(label)
+            print(f"Found '{label}': {len(filenames)} files")
 
-            # Process each audio file in the folder
             for f in filenames:
-                file_path = os.path.join(dirpath, f)
+                files.append((os.path.join(dirpath, f), mapping.index(label)))
+
+    # Compare the tree with the manifest: unchanged files keep their stored features
+    present = {file_path for file_path, _ in files}
+    stale = {file_path for file_path in manifest if file_path not in present}
+    removed = len(stale)
+    pending = []
+    for file_path, label in files:
+        entry = manifest.get(file_path)
+        stat = os.stat(file_path)
+        if entry is not None and entry["label"] == label and entry["size"] == stat.st_size:
+            if entry["mtime_ns"] == stat.st_mtime_ns:
+                continue
+            if entry["sha256"] == file_digest(file_path):
+                # Touched but not modified
+                entry["mtime_ns"] = stat.st_mtime_ns
+                continue
+        if entry is not None:
+            stale.add(file_path)
+        pending.append((file_path, label, stat))
+    for file_path in stale:
+        del manifest[file_path]
+    print(f"{len(pending)} files to extract, {len(files) - len(pending)} unchanged, {removed} removed",
+          file=sys.stderr)
 
-                # Load the audio file
-                signal, sample_rate = librosa.load(file_path)
+    cache = None
+    if pcm_cache_dir is not None:
+        cache = PCMCache(sample_rate, res_type, samples_to_consider, pcm_cache_dir, pcm_cache_dtype)
+    items = [(file_path, cache and cache.lookup(file_path, stat)) for file_path, _, stat in pending]
+    tasks = [
+        (items[i:i + chunksize], sample_rate, res_type, samples_to_consider, num_mfcc, n_fft, hop_length,
+         cache and cache.data_path, pcm_cache_dtype)
+        for i in range(0, len(items), chunksize)
+    ]
 
-                # Only process files with enough samples
-                if len(signal) >= SAMPLES_TO_CONSIDER:
-                    # Trim or pad the audio to a fixed length
-                    signal = signal[:SAMPLES_TO_CONSIDER]
+    # Extract features in parallel; imap yields batches in task order
+    errors = []
+    decode_saved = 0.0
+    start = time.perf_counter()
+    with FeatureStoreWriter(store_path, mapping, sample_rate, shard_size, append=bool(previous)) as writer, \
+            multiprocessing.Pool(num_workers) if num_workers > 1 and tasks else _SerialPool() as pool:
+        writer.remove(stale)
+        writer.metadata["params"] = params
+        writer.metadata["manifest"] = manifest
 
-                    # Extract MFCC features
-                    MFCCs = librosa.feature.mfcc(y=signal, sr=sample_rate, n_mfcc=num_mfcc, n_fft=n_fft, hop_length=hop_length)
+        results = itertools.chain.from_iterable(pool.imap(extract_batch_features, tasks))
+        for done, ((file_path, label, stat), (_, entry), (MFCCs, digest, error, pcm, decode_seconds)) in enumerate(
+                zip(pending, items, results), start=1):
+            if entry is not None:
+                decode_saved += entry["decode_seconds"]
+            elif pcm is not None:
+                cache.add(file_path, pcm, stat, digest, decode_seconds)
 
+            if error is not None:
+                # Left out of the manifest, so the file is retried on the next run
+                errors.append((file_path, error))
+            else:
+                if MFCCs is not None:
                     # Save MFCCs, label, and file path
-                    data["MFCCs"].append(MFCCs.T.tolist())
-                    data["labels"].append(i-1)  # Use folder index as label
-                    data["files"].append(file_path)
-                    print(f"{file_path}: {i-1}")
+                    writer.add(MFCCs, label, file_path)
+                manifest[file_path] = {
+                    "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest, "label": label,
+                }
+
+            if done % chunksize == 0 or done == len(pending):
+                elapsed = time.perf_counter() - start
+                print(f"\r[{done}/{len(pending)}] {done / elapsed:.1f} files/sec, {len(errors)} failed",
+                      end="", file=sys.stderr)
+    print(file=sys.stderr)
 
-    # Write the results to a JSON file
-    with open(json_path, "w") as fp:
-        json.dump(data, fp, indent=4)
+    if cache is not None and items:
+        cache.save()
+        hits = sum(entry is not None for _, entry in items)
+        print(f"PCM cache: {hits} of {len(items)} clips reused, "
+              f"{decode_saved:.1f}s of decoding saved (summed over workers)", file=sys.stderr)
+
+    for file_path, error in errors:
+        print(f"Skipped {file_path}: {error}", file=sys.stderr)
+    return errors
+
+
+class _SerialPool:
+    """Stand-in for multiprocessing.Pool that runs tasks in the calling process."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def imap(self, func, iterable, chunksize=1):
+        return map(func, iterable)
 
 
 if __name__ == "__main__":
-    preprocess_dataset(DATASET_PATH, JSON_PATH)
+    parser = argparse.ArgumentParser(description="Extract MFCCs from a folder-per-label dataset.")
+    parser.add_argument("dataset_path", nargs="?", default=DATASET_PATH)
+    parser.add_argument("store_path", nargs="?", default=FEATURE_STORE_PATH)
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS, help="Worker processes (1 for serial)")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="Files per worker task")
+    parser.add_argument("--sample-rate", type=int, default=SAMPLE_RATE)
+    parser.add_argument("--rebuild", action="store_true", help="Re-extract every file instead of updating the store")
+    parser.add_argument("--pcm-cache", default=PCM_CACHE_DIR, help="Decoded-PCM cache directory")
+    parser.add_argument("--pcm-cache-dtype", default=PCM_CACHE_DTYPE, choices=["float32", "int16"])
+    parser.add_argument("--no-pcm-cache", action="store_true", help="Always decode clips from their files")
+    args = parser.parse_args()
+
+    preprocess_dataset(args.dataset_path, args.store_path, sample_rate=args.sample_rate,
+                       num_workers=args.workers, chunksize=args.chunksize, incremental=not args.rebuild,
+                       pcm_cache_dir=None if args.no_pcm_cache else args.pcm_cache,
+                       pcm_cache_dtype=args.pcm_cache_dtype)
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+CACHE_DIR_ENV_VAR = "KWS_CACHE_DIR"  # Overrides the default cache directory
+PROBABILITY_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                                     "kws", "probabilities")
+MAX_CACHE_BYTES = 1024 ** 3  # 1 GB
+
+
+def file_digest(file_path, block_size=1 << 20):
+    """SHA-256 hex digest of a file's contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as fp:
+        for block in iter(lambda: fp.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ProbabilityCache:
+    """On-disk cache of per-window probability matrices with LRU eviction.
+
+    Entries are keyed by the audio content hash, the model file hash and the
+    feature parameters, so re-analysing a call with different thresholds only
+    re-runs aggregation. Recency is tracked through file modification times,
+    which are bumped on every hit.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=MAX_CACHE_BYTES):
+        """
+        Args:
+            cache_dir (str): Directory holding the entries. Defaults to the KWS_CACHE_DIR environment
+                variable, then PROBABILITY_CACHE_DIR; resolved to an absolute path once, here.
+            max_bytes (int): Size cap above which least recently used entries are evicted
+        """
+        self.cache_dir = os.path.abspath(cache_dir or os.environ.get(CACHE_DIR_ENV_VAR) or PROBABILITY_CACHE_DIR)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (path, size, mtime) -> digest, so the model file is hashed once per process
+        self._digests = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, audio_path, model_path, params):
+        """
+        Build the cache key for one analysis.
+
+        Args:
+            audio_path (str): Audio file analysed
+            model_path (str): Model file used for inference
+            params (dict): Feature parameters that change the probabilities
+
+        Returns:
+            str: Hex digest identifying the probability matrix
+        """
+        parts = [self._digest(audio_path), self._digest(model_path), json.dumps(params, sort_keys=True)]
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a cached entry and mark it as recently used.
+
+        Returns:
+            tuple: (probabilities, window_hop), or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                result = entry["probabilities"], float(entry["window_hop"])
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        os.utime(path)
+        self.hits += 1
+        return result
+
+    def put(self, key, probabilities, window_hop):
+        """Store a probability matrix, then evict least recently used entries over the size cap."""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as fp:
+            np.savez(fp, probabilities=probabilities, window_hop=window_hop)
+        os.replace(tmp_path, path)  # Atomic, so readers never see a partial entry
+        self._evict()
+
+    def stats(self):
+        """Hit/miss counters and current on-disk footprint."""
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
+
+    def _digest(self, file_path):
+        stat = os.stat(file_path)
+        signature = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        if signature not in self._digests:
+            self._digests[signature] = file_digest(file_path)
+        return self._digests[signature]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _entries(self):
+        """(path, size, mtime) of every cache entry."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # Evicted by another process
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[2])  # Oldest first
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
@@ -0,0 +1,334 @@
+import argparse
+import time
+from collections import deque
+
+import numpy as np
+import soundfile as sf
+import soxr
+
+from scripts import features
+from scripts.detect import CHUNK_SECONDS, Keyword_Spotting_Service
+from scripts.features import HOP_LENGTH, N_FFT, NUM_MFCC
+
+REALTIME_HOP_SECONDS = 0.25  # Step between evaluated one-second windows
+SOURCE_FRAME_SECONDS = 0.02  # Size of PCM frames produced by FileAudioSource
+
+
+class RingBuffer:
+    """Fixed-capacity buffer over a NumPy array that keeps the most recent items."""
+
+    def __init__(self, capacity, shape=(), dtype=np.float32):
+        self._data = np.zeros((capacity,) + tuple(shape), dtype=dtype)
+        self._capacity = capacity
+        self.total = 0  # Number of items ever written
+
+    def __len__(self):
+        return min(self.total, self._capacity)
+
+    def extend(self, items):
+        """Append items, overwriting the oldest ones once full."""
+        items = items[-self._capacity:]
+        positions = (self.total + np.arange(len(items))) % self._capacity
+        self._data[positions] = items
+        self.total += len(items)
+
+    def latest(self, n):
+        """Return a copy of the last `n` items in insertion order."""
+        if n > len(self):
+            raise ValueError(f"Requested {n} items but the buffer only holds {len(self)}.")
+        positions = (self.total - n + np.arange(n)) % self._capacity
+        return self._data[positions]
+
+
+class FileAudioSource:
+    """Replays a WAV file as int16 PCM frames, optionally at wall-clock pace.
+
+    Each frame is released only once its duration has elapsed, the way a
+    capture device would deliver it, so a file can stand in for a live call.
+    """
+
+    def __init__(self, file_path, frame_seconds=SOURCE_FRAME_SECONDS, realtime=True):
+        self.file_path = file_path
+        self.frame_seconds = frame_seconds
+        self.realtime = realtime
+        self.sample_rate = sf.info(file_path).samplerate
+
+    def __iter__(self):
+        frame_size = max(1, int(self.frame_seconds * self.sample_rate))
+        start = time.perf_counter()
+        played = 0
+        for frames in sf.blocks(self.file_path, blocksize=frame_size, dtype='int16', always_2d=True):
+            played += len(frames)
+            if self.realtime:
+                delay = start + played / self.sample_rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            yield frames
+
+
+class RealtimeKeywordSpotter:
+    """Keyword spotting on PCM frames pushed from a live source.
+
+    Keeps a ring buffer of the last second of audio and of its mel power frames,
+    which are computed incrementally as samples arrive. Every `hop_seconds` the
+    most recent one-second window is converted to MFCCs and scored, so a detection
+    is emitted at most one hop plus processing time after its audio arrives.
+
+    Frames are centered as in offline sliding-window analysis: the stream starts
+    with n_fft // 2 zeros, and `flush` zero-pads its end, so the same windows
+    see the same mel frames. Each window is clipped relative to its own peak,
+    as in offline analysis, the one-second training clips and non-overlapping
+    offline chunks, so a replayed file scores the same windows as `predict`.
+    """
+
+    def __init__(self, service=None, sample_rate=None, hop_seconds=REALTIME_HOP_SECONDS,
+                 confidence_threshold=0.5, min_detections=1, num_mfcc=NUM_MFCC, n_fft=N_FFT,
+                 hop_length=HOP_LENGTH):
+        """
+        Args:
+            service (KeywordSpottingService): Loaded service; the shared instance is used if None
+            sample_rate (int): Sample rate of the pushed PCM frames; the model's rate if None
+            hop_seconds (float): Step between scored windows, rounded to whole MFCC frames
+            confidence_threshold (float): Minimum confidence score to consider a detection valid
+            min_detections (int): Consecutive window hits needed before a keyword is emitted
+        """
+        self.service = service or Keyword_Spotting_Service()
+        self.model_sample_rate = self.service.sample_rate
+        self.sample_rate = sample_rate or self.model_sample_rate
+        self.confidence_threshold = confidence_threshold
+        self.min_detections = min_detections
+        self.num_mfcc = num_mfcc
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+
+        self.window_samples = int(round(CHUNK_SECONDS * self.model_sample_rate))
+        self.window_frames = 1 + self.window_samples // hop_length
+        self.hop_frames = max(1, int(round(hop_seconds * self.model_sample_rate / hop_length)))
+
+        self._resampler = None
+        if self.sample_rate != self.model_sample_rate:
+            self._resampler = soxr.ResampleStream(
+                self.sample_rate, self.model_sample_rate, 1, dtype='float32', quality='HQ'
+            )
+
+        # Same cached window and filterbank as offline feature extraction
+        self._window = features.hann_window(n_fft)
+        self._mel_basis = features.mel_filterbank(self.model_sample_rate, n_fft)
+        self._audio = RingBuffer(self.window_samples)
+        # Zeros before the first sample, so frame k is centered on sample k * hop_length as with center=True
+        self._audio.extend(np.zeros(n_fft // 2, dtype=np.float32))
+        self._mel_frames = RingBuffer(self.window_frames, shape=(self._mel_basis.shape[1],))
+
+        # (absolute end sample in the ring buffer, wall time it was pushed) for latency accounting, oldest first
+        self._arrivals = deque()
+        # Keyword -> [run start time, last hit end time, confidences, emitted]
+        self._runs = {}
+
+        self.latencies = []
+        self.audio_seconds = 0.0
+        self.processing_seconds = 0.0
+
+        # Run one silent window end to end so lazy imports and graph tracing do not delay the first live window
+        silence = np.zeros((self.window_frames, self._mel_basis.shape[1]), dtype=np.float32)
+        self.service._predict_probabilities([self._window_mfcc(silence)])
+
+    def push(self, frames, timestamp=None):
+        """
+        Push PCM frames and return any detections they complete.
+
+        Args:
+            frames (np.ndarray): Signed integer or float PCM, shape (samples,) or (samples, channels)
+            timestamp (float): `time.perf_counter()` when the frames were captured; now if None
+
+        Returns:
+            list: Detections as dicts with keyword, start_time, end_time, confidence,
+                num_detections and latency (seconds from the last window sample arriving)
+        """
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        started = time.perf_counter()
+
+        frames = np.asarray(frames)
+        # Scale before mixing channels down, which would turn integers into floats
+        if np.issubdtype(frames.dtype, np.signedinteger):
+            # Full scale of the integer type maps to [-1, 1)
+            frames = frames.astype(np.float32) / (np.iinfo(frames.dtype).max + 1)
+        elif np.issubdtype(frames.dtype, np.integer):
+            raise ValueError(f"Unsigned {frames.dtype} PCM is not supported; push signed integer or float samples.")
+        frames = frames.astype(np.float32, copy=False)
+        if frames.ndim == 2:
+            frames = frames.mean(axis=1)
+        self.audio_seconds += len(frames) / self.sample_rate
+
+        if self._resampler is not None:
+            frames = self._resampler.resample_chunk(frames)
+        return self._process(frames, timestamp, started)
+
+    def flush(self, timestamp=None):
+        """
+        End the stream: zero-pad it the way offline sliding-window analysis pads a file and score the last windows.
+
+        Args:
+            timestamp (float): `time.perf_counter()` when the stream ended; now if None
+
+        Returns:
+            list: Detections, as returned by `push`
+        """
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        started = time.perf_counter()
+
+        frames = np.zeros(0, dtype=np.float32)
+        if self._resampler is not None:
+            frames = self._resampler.resample_chunk(frames, last=True)
+
+        # Pad until the window covering the last signal frame is complete
+        end = self._audio.total + len(frames)
+        signal_frames = 1 + (end - self.n_fft // 2) // self.hop_length
+        num_windows = 1 + int(np.ceil(max(0, signal_frames - self.window_frames) / self.hop_frames))
+        last_frame = (num_windows - 1) * self.hop_frames + self.window_frames - 1
+        padding = max(0, last_frame * self.hop_length + self.n_fft - end)
+        return self._process(np.concatenate([frames, np.zeros(padding, dtype=np.float32)]), timestamp, started)
+
+    def run(self, source):
+        """
+        Push every frame from `source` and yield detections as they are emitted.
+
+        Args:
+            source (iterable): Yields PCM frames; must expose `sample_rate`
+
+        Yields:
+            dict: Detection as returned by `push`
+        """
+        if source.sample_rate != self.sample_rate:
+            raise ValueError(f"Source sample rate {source.sample_rate}Hz does not match "
+                             f"spotter sample rate {self.sample_rate}Hz.")
+        for frames in source:
+            yield from self.push(frames)
+        yield from self.flush()
+
+    @property
+    def stats(self):
+        """Real-time factor and end-to-end latency summary of everything pushed so far."""
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            'audio_seconds': self.audio_seconds,
+            'processing_seconds': self.processing_seconds,
+            'real_time_factor': self.processing_seconds / self.audio_seconds if self.audio_seconds else 0.0,
+            'detections': len(self.latencies),
+            'latency_p50': float(np.percentile(latencies, 50)),
+            'latency_max': float(np.max(latencies)),
+        }
+
+    def _process(self, frames, timestamp, started):
+        """Feed float samples at the model rate through the ring buffers and score the windows they complete."""
+        # Forget arrivals whose samples have all left the ring; windows scored from now on end after them
+        oldest = self._audio.total - len(self._audio)
+        while self._arrivals and self._arrivals[0][0] <= oldest:
+            self._arrivals.popleft()
+        self._arrivals.append((self._audio.total + len(frames), timestamp))
+
+        # Feed samples in pieces small enough that unframed audio always fits in the ring
+        windows = []
+        step = self.window_samples - self.n_fft
+        for offset in range(0, len(frames), step):
+            windows.extend(self._consume(frames[offset:offset + step]))
+
+        detections = self._score(windows) if windows else []
+        self.processing_seconds += time.perf_counter() - started
+        return detections
+
+    def _consume(self, samples):
+        """Append samples, compute any new mel frames and return windows that became due."""
+        self._audio.extend(samples)
+
+        # Frame k covers ring samples [k * hop_length, k * hop_length + n_fft), centered on signal sample k * hop_length
+        next_frame = self._mel_frames.total
+        available = (self._audio.total - self.n_fft) // self.hop_length + 1
+        if available <= next_frame:
+            return []
+
+        first_sample = next_frame * self.hop_length
+        segment = self._audio.latest(self._audio.total - first_sample)
+        frames = np.lib.stride_tricks.sliding_window_view(segment, self.n_fft)[::self.hop_length]
+        power = np.abs(np.fft.rfft(frames * self._window, axis=-1)) ** 2
+        mel_power = power @ self._mel_basis
+
+        windows = []
+        for mel_frame in mel_power:
+            self._mel_frames.extend(mel_frame[np.newaxis])
+            frame_count = self._mel_frames.total
+            if frame_count >= self.window_frames and (frame_count - self.window_frames) % self.hop_frames == 0:
+                windows.append((frame_count - self.window_frames, self._mel_frames.latest(self.window_frames)))
+        return windows
+
+    def _score(self, windows):
+        """Run due windows through the model and update per-keyword runs."""
+        chunks_mfcc = [self._window_mfcc(mel) for _, mel in windows]
+        probabilities = self.service._predict_probabilities(chunks_mfcc, len(chunks_mfcc))
+
+        detections = []
+        for (first_frame, _), pred_probs in zip(windows, probabilities):
+            start_time = first_frame * self.hop_length / self.model_sample_rate
+            end_time = start_time + CHUNK_SECONDS
+            pred_idx = np.argmax(pred_probs)
+            confidence = pred_probs[pred_idx]
+            if confidence < self.confidence_threshold:
+                continue
+
+            keyword = self.service._mapping[pred_idx]
+            run = self._runs.get(keyword)
+            if run is None or start_time - run[1] > 0.5:  # Same merge gap as _aggregate_predictions
+                run = self._runs[keyword] = [start_time, end_time, [], False]
+            run[1] = end_time
+            run[2].append(confidence)
+
+            if not run[3] and len(run[2]) >= self.min_detections:
+                run[3] = True
+                last_sample = (first_frame + self.window_frames - 1) * self.hop_length + self.n_fft
+                latency = time.perf_counter() - self._arrival_time(last_sample)
+                self.latencies.append(latency)
+                detections.append({
+                    'keyword': keyword,
+                    'start_time': run[0],
+                    'end_time': end_time,
+                    'confidence': np.mean(run[2]),
+                    'num_detections': len(run[2]),
+                    'latency': latency
+                })
+        return detections
+
+    def _window_mfcc(self, mel):
+        """Convert a (frames, n_mels) window of mel power to (frames, num_mfcc) MFCCs."""
+        return features.mfcc_from_log_mel(features.power_to_db(mel), self.num_mfcc)
+
+    def _arrival_time(self, sample):
+        """Wall time at which the pushed block containing absolute `sample` arrived."""
+        while len(self._arrivals) > 1 and self._arrivals[0][0] < sample:
+            self._arrivals.popleft()
+        return self._arrivals[0][1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a WAV file through the real-time keyword spotter.")
+    parser.add_argument("file_path", nargs="?", default="test/test.wav")
+    parser.add_argument("--hop", type=float, default=REALTIME_HOP_SECONDS, help="Seconds between scored windows")
+    parser.add_argument("--threshold", type=float, default=0.9, help="Confidence threshold")
+    parser.add_argument("--min-detections", type=int, default=1)
+    parser.add_argument("--fast", action="store_true", help="Replay as fast as possible instead of wall-clock pace")
+    args = parser.parse_args()
+
+    source = FileAudioSource(args.file_path, realtime=not args.fast)
+    spotter = RealtimeKeywordSpotter(
+        sample_rate=source.sample_rate,
+        hop_seconds=args.hop,
+        confidence_threshold=args.threshold,
+        min_detections=args.min_detections
+    )
+
+    for pred in spotter.run(source):
+        print(f"Detected '{pred['keyword']}' from {pred['start_time']:.2f}s to "
+              f"{pred['end_time']:.2f}s (confidence: {pred['confidence']:.2f}, latency: {pred['latency'] * 1000:.0f}ms)")
+
+    stats = spotter.stats
+    print(f"\nAudio: {stats['audio_seconds']:.2f}s, processing: {stats['processing_seconds']:.2f}s, "
+          f"real-time factor: {stats['real_time_factor']:.3f}")
+    print(f"Latency p50: {stats['latency_p50'] * 1000:.0f}ms, max: {stats['latency_max'] * 1000:.0f}ms")
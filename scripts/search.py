@@ -0,0 +1,262 @@
+"""
+Parallel hyperparameter search over `train.build_model` and `train.train` with successive halving.
+
+NUM_TRIALS configurations are sampled from SEARCH_SPACE and trained concurrently
+in a pool of worker processes, each limited to its share of the CPU threads.
+After every rung only the best 1/ETA trials by validation accuracy are promoted
+and trained on, from their saved model and optimizer state, to ETA times as many
+epochs; the rest are pruned. Every worker streams the same memory-mapped feature
+store shards, so the page cache holds a single copy of the features however many
+trials run. Results go to a SQLite database in SEARCH_DIR and the best model is
+exported with its metadata, ready for detection or `train.py --fine-tune`. Run
+from the repository root:
+
+    python scripts/search.py
+    python scripts/search.py --trials 27 --workers 4 --min-epochs 2 --eta 3
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+if __package__ in (None, ""):
+    # Allow `python scripts/search.py` as well as `python -m scripts.search`
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import train
+from scripts.feature_store import load_metadata
+from scripts.input_pipeline import split_by_file
+
+SEARCH_DIR = "models/search"  # Trial models and the results database
+SEARCH_DB = "trials.db"
+SEARCH_SPACE = {
+    "learning_rate": [0.00003, 0.0001, 0.0003, 0.001],
+    "batch_size": [32, 64, 128],
+    "filters": [(64, 32, 32), (32, 32, 16), (32, 16, 16), (128, 64, 32)],
+    "dense_units": [32, 64, 128],
+}
+NUM_TRIALS = 9
+ETA = 3  # Each rung keeps the best 1/ETA trials and trains them ETA times longer
+MIN_EPOCHS = 4  # Epochs every trial gets before the first pruning
+MAX_EPOCHS = train.EPOCHS
+WORKERS = None  # Concurrent trials (None: one per two cores), each with an equal share of the CPU threads
+
+_threads = None  # Intra-op threads of this worker process
+
+
+class TrialLog:
+    """SQLite table of every trial's result at every rung of every search."""
+
+    def __init__(self, db_path):
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS trials (study TEXT, trial INTEGER, rung INTEGER, params TEXT, "
+            "epochs INTEGER, val_accuracy REAL, val_loss REAL, seconds REAL, status TEXT, "
+            "PRIMARY KEY (study, trial, rung))"
+        )
+
+    def record(self, study, trial, rung, params, result, status):
+        """Store one trial's result at a rung; status is "promoted", "pruned", "finished" or "best"."""
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO trials VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (study, trial, rung, json.dumps(params), result["epochs"], result["val_accuracy"],
+                 result["val_loss"], result["seconds"], status),
+            )
+
+    def results(self, study):
+        """Final row of every trial of `study`, best first."""
+        return self.connection.execute(
+            "SELECT trial, params, MAX(rung), epochs, val_accuracy, status FROM trials WHERE study = ? "
+            "GROUP BY trial ORDER BY MAX(rung) DESC, val_accuracy DESC", (study,)
+        ).fetchall()
+
+    def close(self):
+        self.connection.close()
+
+
+def sample_configurations(space=SEARCH_SPACE, num_trials=NUM_TRIALS, seed=None):
+    """Distinct configurations drawn at random from the grid of `space`."""
+    grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+    picks = np.random.default_rng(seed).choice(len(grid), min(num_trials, len(grid)), replace=False)
+    return [grid[i] for i in picks]
+
+
+def _init_worker(threads):
+    # Must run before TensorFlow executes anything in this process
+    global _threads
+    _threads = threads
+    train.configure_threads(threads, 1)
+
+
+def _limit_threads(dataset):
+    options = tf.data.Options()
+    options.threading.private_threadpool_size = _threads
+    return dataset.with_options(options)
+
+
+def run_trial(task):
+    """
+    Train one trial up to `epochs` in a worker process, continuing from its saved model after the first rung.
+
+    Args:
+        task (tuple): (trial, params, initial_epoch, epochs, model_path, store_path, seed)
+
+    Returns:
+        dict: Trial number, epochs trained in total, final validation accuracy and loss, and wall time of this rung
+    """
+    trial, params, initial_epoch, epochs, model_path, store_path, seed = task
+    tf.keras.utils.set_random_seed(seed + trial)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        train_data, validation_data, _, input_shape, _ = train.prepare_datasets(
+            store_path, params["batch_size"], seed=seed + trial
+        )
+        if initial_epoch:
+            model = tf.keras.models.load_model(model_path)
+        else:
+            model = train.build_model(input_shape, learning_rate=params["learning_rate"],
+                                      num_classes=len(load_metadata(store_path)["mapping"]),
+                                      filters=tuple(params["filters"]), dense_units=params["dense_units"])
+        history = train.train(model, epochs, params["batch_size"], train.PATIENCE, _limit_threads(train_data), None,
+                              _limit_threads(validation_data), None, initial_epoch=initial_epoch)
+    model.save(model_path)
+    return {
+        "trial": trial,
+        "epochs": initial_epoch + len(history.epoch),
+        "val_accuracy": float(history.history["val_accuracy"][-1]),
+        "val_loss": float(history.history["val_loss"][-1]),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def evaluate_model(model_path, store_path):
+    """Test accuracy of a saved model, in a worker process."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, _, test_data, _, _ = train.prepare_datasets(store_path)
+    _, accuracy = tf.keras.models.load_model(model_path).evaluate(_limit_threads(test_data), verbose=0)
+    return float(accuracy)
+
+
+def search(store_path=train.DATA_PATH, export_path=train.SAVED_MODEL_PATH, search_dir=SEARCH_DIR,
+           num_trials=NUM_TRIALS, workers=WORKERS, min_epochs=MIN_EPOCHS, max_epochs=MAX_EPOCHS, eta=ETA,
+           space=SEARCH_SPACE, seed=0):
+    """
+    Run a successive-halving search and export the best model.
+
+    Args:
+        store_path (str): Feature store directory
+        export_path (str): Where the best model is saved, with its metadata
+        search_dir (str): Directory for trial models and the results database
+        num_trials (int): Configurations sampled from `space`
+        workers (int): Concurrent trials
+        min_epochs (int): Epochs of the first rung
+        max_epochs (int): No trial is trained longer than this
+        eta (int): Pruning rate; each rung keeps the best 1/eta trials
+        space (dict): Parameter name -> candidate values
+        seed (int): Seed for sampling and training
+
+    Returns:
+        dict: Study name, best trial, its params, validation and test accuracy
+    """
+    cpus = os.cpu_count() or 1
+    workers = workers or max(1, cpus // 2)
+    threads = max(1, cpus // workers)
+    os.makedirs(search_dir, exist_ok=True)
+    study = time.strftime("%Y%m%d-%H%M%S")
+    log = TrialLog(os.path.join(search_dir, SEARCH_DB))
+
+    configurations = sample_configurations(space, num_trials, seed)
+    model_paths = [os.path.join(search_dir, f"{study}_trial{trial:03d}.keras") for trial in range(len(configurations))]
+    trained = [0] * len(configurations)
+    seconds = [0.0] * len(configurations)
+    active = list(range(len(configurations)))
+    print(f"Study {study}: {len(configurations)} trials on {workers} workers with {threads} threads each")
+
+    start = time.perf_counter()
+    # TensorFlow is not fork-safe, so workers start from a fresh interpreter
+    with multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(threads,)) as pool:
+        for rung in itertools.count():
+            epochs = min(max_epochs, min_epochs * eta ** rung)
+            tasks = [
+                (trial, configurations[trial], trained[trial], epochs, model_paths[trial], store_path, seed)
+                for trial in active
+            ]
+            results = {}
+            for result in pool.imap_unordered(run_trial, tasks):
+                trial = result["trial"]
+                results[trial] = result
+                trained[trial] = result["epochs"]
+                seconds[trial] += result["seconds"]
+                print(f"Rung {rung}: trial {trial} {configurations[trial]} reached val_accuracy "
+                      f"{result['val_accuracy']:.3f} after {result['epochs']} epochs ({result['seconds']:.1f}s)")
+
+            ranked = sorted(active, key=lambda trial: results[trial]["val_accuracy"], reverse=True)
+            last = len(active) == 1 or epochs >= max_epochs
+            keep = max(1, len(active) // eta)
+            for position, trial in enumerate(ranked):
+                if last:
+                    status = "best" if position == 0 else "finished"
+                else:
+                    status = "promoted" if position < keep else "pruned"
+                log.record(study, trial, rung, configurations[trial], results[trial], status)
+                if status in ("pruned", "finished"):
+                    os.remove(model_paths[trial])
+            if last:
+                break
+            active = ranked[:keep]
+
+        best = ranked[0]
+        test_accuracy = pool.apply(evaluate_model, (model_paths[best], store_path))
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{'trial':>5}  {'status':<9}{'epochs':>7}{'val_accuracy':>14}  params")
+    for trial, params, _, trial_epochs, val_accuracy, status in log.results(study):
+        print(f"{trial:>5}  {status:<9}{trial_epochs:>7}{val_accuracy:>14.3f}  {params}")
+    log.close()
+    print(f"Searched in {elapsed:.1f}s, training {sum(trained)} epochs in total against "
+          f"{len(configurations) * trained[best]} without pruning")
+
+    # Export with the same records as `train.main`, so detection and fine-tuning treat it like any trained model
+    metadata = load_metadata(store_path)
+    train_index, _, _ = split_by_file(metadata["files"], train.TEST_SIZE, train.VALIDATION_SIZE)
+    os.makedirs(os.path.dirname(export_path) or ".", exist_ok=True)
+    shutil.move(model_paths[best], export_path)
+    train.record_training(export_path, metadata, train_index, training_seconds=seconds[best],
+                          training_samples=len(train_index), search={"study": study, **configurations[best]})
+    print(f"Best trial {best} {configurations[best]}: val_accuracy {results[best]['val_accuracy']:.3f}, "
+          f"test accuracy {test_accuracy:.3f}, exported to {export_path}")
+    return {
+        "study": study,
+        "trial": best,
+        "params": configurations[best],
+        "val_accuracy": results[best]["val_accuracy"],
+        "test_accuracy": test_accuracy,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter search with successive halving.")
+    parser.add_argument("--store", default=train.DATA_PATH, help="Feature store directory")
+    parser.add_argument("--export", default=train.SAVED_MODEL_PATH, help="Path the best model is saved to")
+    parser.add_argument("--search-dir", default=SEARCH_DIR)
+    parser.add_argument("--trials", type=int, default=NUM_TRIALS)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--min-epochs", type=int, default=MIN_EPOCHS)
+    parser.add_argument("--max-epochs", type=int, default=MAX_EPOCHS)
+    parser.add_argument("--eta", type=int, default=ETA)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    search(args.store, args.export, args.search_dir, args.trials, args.workers, args.min_epochs, args.max_epochs,
+           args.eta, seed=args.seed)
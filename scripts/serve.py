@@ -0,0 +1,340 @@
+"""
+Asyncio HTTP inference service with cross-request dynamic micro-batching.
+
+Feature extraction runs in a process pool; the resulting chunks from all
+in-flight requests are collected into shared model batches, flushed when
+`max_batch_size` chunks are waiting or the oldest has waited `max_wait_ms`.
+Run from the repository root:
+
+    python -m scripts.serve --port 8000
+
+Endpoints:
+    POST /predict   Body is raw audio (e.g. a WAV upload) or JSON {"path": "..."}.
+                    Query string or JSON may set confidence_threshold,
+                    min_detections, hop_seconds and vad.
+    GET  /stats     Queue depth, batch sizes, latency percentiles and per-stage timings.
+    GET  /metrics   Per-stage timings and counters in Prometheus text format.
+    GET  /health    Liveness check.
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import soundfile as sf
+
+from scripts import instrumentation
+from scripts.audio import DEFAULT_RESAMPLER, MODEL_SAMPLE_RATE
+from scripts.detect import Keyword_Spotting_Service, KeywordSpottingService, NMS_IOU_THRESHOLD, SAVED_MODEL_PATH
+
+MAX_BATCH_SIZE = 64  # Chunks per shared model batch
+MAX_WAIT_MS = 10  # Longest a queued chunk waits for a batch to fill
+LATENCY_WINDOW = 1000  # Recent requests/batches kept for percentile stats
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    """A request the server cannot serve, answered with `status` instead of 500. Picklable across the worker pool."""
+
+    def __init__(self, status, message):
+        super().__init__(status, message)
+        self.status = status
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+def extract_features(source, hop_seconds=None, vad=False, sample_rate=MODEL_SAMPLE_RATE, res_type=DEFAULT_RESAMPLER,
+                     instrument=True):
+    """
+    Worker-pool entry point: decode audio bytes or a path and extract features.
+
+    The worker has no stats of its own to report to, so its stage timings and counters (decode,
+    resample, vad, mfcc, audio_seconds, windows) are recorded for this call and returned with the result.
+
+    Returns:
+        tuple: (kept chunks MFCC, window hop, speech mask, `PipelineStats.snapshot()` of this call)
+
+    Raises:
+        RequestError: 404 if a path does not exist, 400 if the audio cannot be read or decoded
+    """
+    stats = instrumentation.PipelineStats(instrument)
+    try:
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        with stats.track("features"):
+            chunks_mfcc, window_hop, speech = KeywordSpottingService._extract_features(
+                source, hop_seconds, vad, sample_rate, res_type
+            )
+    except FileNotFoundError:
+        raise RequestError(404, f"No such audio file: {source}") from None
+    except Exception as e:
+        # Decoders raise many unrelated types, some of which do not survive pickling back from the worker
+        raise RequestError(400, f"Could not read audio: {type(e).__name__}: {e}") from None
+    return np.asarray(chunks_mfcc, dtype=np.float32), window_hop, speech, stats.snapshot()
+
+
+class MicroBatcher:
+    """Collects chunks from concurrent requests into shared model batches."""
+
+    def __init__(self, service, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.service = service
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = asyncio.Queue()
+        # A single inference thread keeps model calls serialized and off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self.batch_latencies = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    async def submit(self, chunks_mfcc):
+        """
+        Queue every chunk of one request and wait for their probabilities.
+
+        Returns:
+            np.ndarray: Class probabilities with shape (num_chunks, num_classes)
+        """
+        if len(chunks_mfcc) == 0:
+            return np.empty((0, len(self.service._mapping)), dtype=np.float32)
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for chunk in chunks_mfcc:
+            future = loop.create_future()
+            self._queue.put_nowait((chunk, future))
+            futures.append(future)
+        return np.stack(await asyncio.gather(*futures))
+
+    async def run(self):
+        """Batching loop: flush on max_batch_size chunks or max_wait_ms, whichever comes first."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            chunks = [chunk for chunk, _ in batch]
+            started = time.perf_counter()
+            try:
+                probabilities = await loop.run_in_executor(
+                    self._executor, self.service._predict_probabilities, chunks, len(chunks)
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batch_sizes.append(len(batch))
+            self.batch_latencies.append(time.perf_counter() - started)
+            for (_, future), pred_probs in zip(batch, probabilities):
+                if not future.done():
+                    future.set_result(pred_probs)
+
+
+class InferenceServer:
+    """Minimal HTTP/1.1 server exposing keyword detection over asyncio streams."""
+
+    def __init__(self, service=None, feature_workers=None, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.service = service or Keyword_Spotting_Service()
+        self.batcher = MicroBatcher(self.service, max_batch_size, max_wait_ms)
+        self.feature_workers = feature_workers or os.cpu_count()
+        self.feature_pool = ProcessPoolExecutor(
+            max_workers=self.feature_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self.in_flight = 0
+        self.requests = 0
+        self.request_latencies = deque(maxlen=LATENCY_WINDOW)
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        """Start the batching loop and serve until cancelled."""
+        batcher_task = asyncio.create_task(self.batcher.run())
+        await self.warmup()
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher_task.cancel()
+            self.feature_pool.shutdown(cancel_futures=True)
+
+    async def warmup(self):
+        """
+        Send one second of silence per feature worker through the whole request path, then clear the stats.
+
+        The first real request would otherwise pay for starting the workers and their imports and for
+        tracing the inference graph.
+        """
+        buffer = io.BytesIO()
+        sf.write(buffer, np.zeros(self.service.sample_rate, dtype=np.int16), self.service.sample_rate, format="WAV")
+        await asyncio.gather(*(self.predict(buffer.getvalue()) for _ in range(self.feature_workers)))
+
+        self.requests = 0
+        self.request_latencies.clear()
+        self.batcher.batch_sizes.clear()
+        self.batcher.batch_latencies.clear()
+        self.service.stats.reset()
+
+    async def handle(self, reader, writer):
+        """Parse one HTTP request, route it and write a JSON response."""
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            url = urlsplit(target)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            status, payload = await self.route(method, url.path, params, headers, body)
+        except RequestError as e:
+            status, payload = e.status, {"error": e.message}
+        except ValueError as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+        if isinstance(payload, str):
+            data, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            data, content_type = json.dumps(payload).encode(), "application/json"
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode()
+            + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def route(self, method, path, params, headers, body):
+        """Dispatch a parsed request and return (status, JSON payload or text)."""
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/stats":
+            return 200, self.stats()
+        if path == "/metrics":
+            return 200, self.service.stats.to_prometheus()
+        if path != "/predict":
+            return 404, {"error": f"Unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST /predict"}
+
+        if headers.get("content-type", "").startswith("application/json"):
+            request = json.loads(body or b"{}")
+            if "path" not in request:
+                raise ValueError("JSON body must contain 'path'")
+            source = request["path"]
+            params = {**params, **request}
+        elif body:
+            source = body
+        else:
+            raise ValueError("Send audio bytes or a JSON body with 'path'")
+
+        predictions = await self.predict(
+            source,
+            confidence_threshold=float(params.get("confidence_threshold", 0.5)),
+            min_detections=int(params.get("min_detections", 2)),
+            hop_seconds=float(params["hop_seconds"]) if params.get("hop_seconds") else None,
+            vad=str(params.get("vad", "")).lower() in ("1", "true", "yes")
+        )
+        return 200, {"predictions": predictions}
+
+    async def predict(self, source, confidence_threshold=0.5, min_detections=2, hop_seconds=None, vad=False):
+        """Same output as `KeywordSpottingService.predict`, with chunks batched across requests."""
+        started = time.perf_counter()
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            chunks_mfcc, window_hop, speech, feature_stats = await loop.run_in_executor(
+                self.feature_pool, extract_features, source, hop_seconds, vad,
+                self.service.sample_rate, self.service.res_type, self.service.stats.enabled
+            )
+            self.service.stats.merge(feature_stats)
+            probabilities = np.full((len(speech), len(self.service._mapping)), np.nan, dtype=np.float32)
+            probabilities[speech] = await self.batcher.submit(chunks_mfcc)
+
+            with self.service.stats.stage("aggregate"):
+                predictions = self.service._probabilities_to_predictions(probabilities, confidence_threshold, window_hop)
+                nms_iou_threshold = NMS_IOU_THRESHOLD if hop_seconds is not None else None
+                predictions = self.service._aggregate_predictions(predictions, min_detections, nms_iou_threshold)
+        finally:
+            self.in_flight -= 1
+
+        self.requests += 1
+        self.request_latencies.append(time.perf_counter() - started)
+        return [{**pred, "confidence": float(pred["confidence"])} for pred in predictions]
+
+    def stats(self):
+        """Queue depth, batching and latency summary for the /stats endpoint."""
+        def percentiles(values):
+            if not values:
+                return {"p50_ms": 0.0, "p99_ms": 0.0}
+            values = np.array(values) * 1000
+            return {"p50_ms": float(np.percentile(values, 50)), "p99_ms": float(np.percentile(values, 99))}
+
+        return {
+            "queue_depth": self.batcher.queue_depth,
+            "in_flight_requests": self.in_flight,
+            "requests": self.requests,
+            "request_latency": percentiles(self.request_latencies),
+            "batch_latency": percentiles(self.batcher.batch_latencies),
+            "mean_batch_size": float(np.mean(self.batcher.batch_sizes)) if self.batcher.batch_sizes else 0.0,
+            "pipeline": self.service.stats.snapshot(),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve keyword detection over HTTP with dynamic micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", default=SAVED_MODEL_PATH, help="Keras model or TFLite export")
+    parser.add_argument("--feature-workers", type=int, default=os.cpu_count(), help="Feature extraction processes")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    server = InferenceServer(
+        service=KeywordSpottingService(args.model),
+        feature_workers=args.feature_workers,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms
+    )
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -1,114 +1,332 @@
-import json
+import argparse
+import os
+import sys
+import time
 import numpy as np
 import tensorflow as tf
 import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split
+
+if __package__ in (None, ""):
+    # Allow `python scripts/train.py` as well as `python -m scripts.train`
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.audio import MODEL_SAMPLE_RATE
+from scripts.compact_models import ARCHITECTURES, COMPACT_LEARNING_RATE, Distiller
+from scripts.feature_store import FEATURE_STORE_PATH, load_metadata
+from scripts.input_pipeline import InputStallMonitor, make_dataset, split_by_file
+from scripts.model_metadata import (
+    load_model_metadata, load_training_manifest, save_model_metadata, save_training_manifest
+)
 
 # Configuration parameters
-DATA_PATH = "data.json"
+DATA_PATH = FEATURE_STORE_PATH
 SAVED_MODEL_PATH = "models/model.keras"
 EPOCHS = 40
 BATCH_SIZE = 32
 PATIENCE = 5
 LEARNING_RATE = 0.0001
+FILTERS = (64, 32, 32)  # Filters of the three convolutional blocks
+DENSE_UNITS = 64  # Units of the dense layer before the output
+ARCHITECTURE = "cnn"  # "cnn" for the network below, or a compact variant from scripts.compact_models.ARCHITECTURES
+TEST_SIZE = 0.2  # Fraction of samples held out for testing
+VALIDATION_SIZE = 0.2  # Fraction of the remaining samples used for validation
+AUGMENT = False  # Noise, time shift and SpecAugment masks on training batches
+CACHE = False  # Cache training samples after the first epoch: True (memory), a file prefix, or False
+BASE_BATCH_SIZE = 32  # Batch size LEARNING_RATE is tuned for; larger batches scale it linearly
+INTRA_OP_THREADS = 0  # Threads used inside one op (0: TensorFlow picks, usually one per core)
+INTER_OP_THREADS = 0  # Ops run concurrently (0: TensorFlow picks)
+JIT_COMPILE = False  # XLA-compile the training step
+MIXED_PRECISION = False  # bfloat16 compute with float32 weights, if the CPU has native bf16 instructions
+CHECKPOINT_DIR = "models/checkpoints"  # Model and optimizer state of an unfinished run; rerunning resumes from it
+CHECKPOINT_FREQ = "epoch"  # Checkpoint after every epoch, or every this many batches
+FINE_TUNE_EPOCHS = 10
+FINE_TUNE_LEARNING_RATE = 0.0001
+REPLAY_RATIO = 1.0  # Already-trained samples mixed into fine-tuning per new sample, so old keywords are not forgotten
 
-def load_data(data_path):
+def prepare_datasets(data_path, batch_size=BATCH_SIZE, test_size=TEST_SIZE, validation_size=VALIDATION_SIZE,
+                     augment=AUGMENT, cache=CACHE, seed=None, train_index=None, stall_monitor=None):
     """
-    Loads data from a JSON file, extracting features and labels.
+    Splits a feature store into streaming training, validation, and test pipelines.
+
+    Features are read from the shards as batches are needed, so the dataset does
+    not have to fit in memory (see `scripts.input_pipeline`). Samples are split by
+    file name, so every run over a growing store keeps the same test set.
 
     Args:
-        data_path (str): Path to JSON file containing data.
+        data_path (str): Feature store directory.
+        batch_size (int): Batch size.
+        test_size (float): Fraction of data to use for testing.
+        validation_size (float): Fraction of training data to use for validation.
+        augment (bool): Augment training batches.
+        cache (bool or str): Cache training samples after the first epoch.
+        seed (int): Seed for shuffling.
+        train_index (np.ndarray): Train on these samples of the training split instead of all of
+            it, e.g. from `fine_tune_samples`.
+        stall_monitor (InputStallMonitor): Time training's waits on the training pipeline.
 
     Returns:
-        tuple: Features (X) and labels (y) as numpy arrays.
+        tuple: Training, validation, and test datasets, the model input shape, and the
+            number of training samples.
     """
-    with open(data_path, "r") as fp:
-        data = json.load(fp)
-    X = np.array(data["MFCCs"])
-    y = np.array(data["labels"])
-    print("Data loaded successfully!")
-    return X, y
+    split_index, validation_index, test_index = split_by_file(
+        load_metadata(data_path)["files"], test_size, validation_size
+    )
+    if train_index is None:
+        train_index = split_index
+    train_data = make_dataset(data_path, train_index, batch_size, shuffle=True, augment=augment, cache=cache,
+                              seed=seed, stall_monitor=stall_monitor)
+    validation_data = make_dataset(data_path, validation_index, batch_size)
+    test_data = make_dataset(data_path, test_index, batch_size)
+    print("Data pipelines ready!")
+    
+    return train_data, validation_data, test_data, tuple(train_data.element_spec[0].shape[1:]), len(train_index)
 
-def prepare_dataset(data_path, test_size=0.2, validation_size=0.2):
+def configure_threads(intra_op_threads=INTRA_OP_THREADS, inter_op_threads=INTER_OP_THREADS):
     """
-    Splits data into training, validation, and test sets.
+    Sizes TensorFlow's thread pools. Must run before TensorFlow executes any op.
 
     Args:
-        data_path (str): Path to JSON file.
-        test_size (float): Fraction of data to use for testing.
-        validation_size (float): Fraction of training data to use for validation.
+        intra_op_threads (int): Threads used to parallelize a single op (0 for the default).
+        inter_op_threads (int): Independent ops run at the same time (0 for the default).
+    """
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except RuntimeError as e:
+        print(f"Thread pools already initialized, keeping them: {e}")
+
+def cpu_supports_bfloat16():
+    """
+    Whether the CPU has native bfloat16 instructions (AVX512-BF16 or AMX-BF16).
 
     Returns:
-        tuple: Training, validation, and test sets.
+        bool: False as well where the flags cannot be read (non-Linux).
     """
-    X, y = load_data(data_path)
-    
-    # Split data into train and test sets
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size)
-    # Split training data into train and validation sets
-    X_train, X_validation, y_train, y_validation = train_test_split(X_train, y_train, test_size=validation_size)
-    
-    # Reshape data to add a channel dimension for CNN compatibility
-    X_train = X_train[..., np.newaxis]
-    X_validation = X_validation[..., np.newaxis]
-    X_test = X_test[..., np.newaxis]
-    
-    return X_train, y_train, X_validation, y_validation, X_test, y_test
+    try:
+        with open("/proc/cpuinfo", "r") as fp:
+            flags = set(fp.read().split())
+    except OSError:
+        return False
+    return bool(flags & {"avx512_bf16", "amx_bf16"})
+
+def enable_mixed_precision():
+    """
+    Switches Keras to the mixed_bfloat16 policy if the CPU supports it natively.
+
+    Without native support bfloat16 is emulated and slower than float32, so the
+    float32 policy is kept.
+
+    Returns:
+        bool: True if mixed precision was enabled.
+    """
+    if not cpu_supports_bfloat16():
+        print("CPU has no native bfloat16 support, training in float32")
+        return False
+    tf.keras.mixed_precision.set_global_policy("mixed_bfloat16")
+    return True
+
+def scaled_learning_rate(batch_size, learning_rate=LEARNING_RATE, base_batch_size=BASE_BATCH_SIZE):
+    """
+    Scales the learning rate linearly with the batch size, so larger batches take larger steps.
+
+    Args:
+        batch_size (int): Batch size used for training.
+        learning_rate (float): Learning rate tuned for `base_batch_size`.
+        base_batch_size (int): Batch size `learning_rate` was tuned for.
+
+    Returns:
+        float: Learning rate for `batch_size`.
+    """
+    return learning_rate * batch_size / base_batch_size
+
+class ThroughputMonitor(tf.keras.callbacks.Callback):
+    """Reports wall time and training samples/sec for every epoch."""
 
-def build_model(input_shape, loss="sparse_categorical_crossentropy", learning_rate=LEARNING_RATE):
+    def __init__(self, num_samples, verbose=True):
+        """
+        Args:
+            num_samples (int): Training samples per epoch.
+            verbose (bool): Print a line after every epoch.
+        """
+        super().__init__()
+        self.num_samples = num_samples
+        self.verbose = verbose
+        self.epoch_seconds = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self._start
+        self.epoch_seconds.append(seconds)
+        if logs is not None:
+            logs["epoch_seconds"] = seconds
+            logs["samples_per_sec"] = self.num_samples / seconds
+        if self.verbose:
+            print(f"Epoch {epoch + 1}: {seconds:.2f}s wall time, {self.num_samples / seconds:.0f} samples/sec")
+
+def build_model(input_shape, loss="sparse_categorical_crossentropy", learning_rate=LEARNING_RATE,
+                jit_compile=JIT_COMPILE, num_classes=2, filters=FILTERS, dense_units=DENSE_UNITS,
+                architecture=ARCHITECTURE):
     """
-    Builds and compiles a convolutional neural network model.
+    Builds and compiles a convolutional neural network model, or one of the compact variants.
 
     Args:
         input_shape (tuple): Shape of the input data.
         loss (str): Loss function.
         learning_rate (float): Learning rate for optimizer.
+        jit_compile (bool): XLA-compile the training step.
+        num_classes (int): Number of output classes, i.e. the length of the label mapping.
+        filters (tuple): Filters of each of the three convolutional blocks.
+        dense_units (int): Units of the dense layer.
+        architecture (str): "cnn", or a name from `scripts.compact_models.ARCHITECTURES`, in which
+            case `filters` and `dense_units` do not apply.
 
     Returns:
         model: Compiled CNN model.
     """
+    if architecture != "cnn":
+        model = ARCHITECTURES[architecture](input_shape, num_classes)
+        model.compile(optimizer=tf.optimizers.Adam(learning_rate=learning_rate), loss=loss, metrics=["accuracy"],
+                      jit_compile=jit_compile)
+        model.summary()
+        return model
+    
     model = tf.keras.models.Sequential([
         # First convolutional block
-        tf.keras.layers.Conv2D(64, (3, 3), activation='relu', input_shape=input_shape,
+        tf.keras.layers.Conv2D(filters[0], (3, 3), activation='relu', input_shape=input_shape,
                                kernel_regularizer=tf.keras.regularizers.l2(0.001)),
         tf.keras.layers.BatchNormalization(),
         tf.keras.layers.MaxPooling2D((3, 3), strides=(2, 2), padding='same'),
         
         # Second convolutional block
-        tf.keras.layers.Conv2D(32, (3, 3), activation='relu', kernel_regularizer=tf.keras.regularizers.l2(0.001)),
+        tf.keras.layers.Conv2D(filters[1], (3, 3), activation='relu',
+                               kernel_regularizer=tf.keras.regularizers.l2(0.001)),
         tf.keras.layers.BatchNormalization(),
         tf.keras.layers.MaxPooling2D((3, 3), strides=(2, 2), padding='same'),
         
         # Third convolutional block
-        tf.keras.layers.Conv2D(32, (2, 2), activation='relu', kernel_regularizer=tf.keras.regularizers.l2(0.001)),
+        tf.keras.layers.Conv2D(filters[2], (2, 2), activation='relu',
+                               kernel_regularizer=tf.keras.regularizers.l2(0.001)),
         tf.keras.layers.BatchNormalization(),
         tf.keras.layers.MaxPooling2D((2, 2), strides=(2, 2), padding='same'),
         
         # Flatten and dense layers
         tf.keras.layers.Flatten(),
-        tf.keras.layers.Dense(64, activation='relu'),
+        tf.keras.layers.Dense(dense_units, activation='relu'),
         tf.keras.layers.Dropout(0.3),
         
-        # Output layer
-        tf.keras.layers.Dense(2, activation='softmax')
+        # Output layer, kept in float32 under mixed precision for a stable softmax
+        tf.keras.layers.Dense(num_classes, activation='softmax', dtype="float32")
     ])
 
     # Compile model with Adam optimizer
     optimizer = tf.optimizers.Adam(learning_rate=learning_rate)
-    model.compile(optimizer=optimizer, loss=loss, metrics=["accuracy"])
+    model.compile(optimizer=optimizer, loss=loss, metrics=["accuracy"], jit_compile=jit_compile)
     model.summary()
     
     return model
 
-def train(model, epochs, batch_size, patience, X_train, y_train, X_validation, y_validation):
+def grow_output_layer(model, num_classes):
+    """
+    Widen a trained model's softmax output to `num_classes`, e.g. after new keywords were added to the mapping.
+
+    Label indices never move (new labels are appended to the mapping), so existing
+    classes keep their weights and the new ones start from a fresh initialization.
+
+    Returns:
+        model: `model` itself if it already has `num_classes` outputs, else a new uncompiled model
+            sharing all other layers with it.
+    """
+    output = model.layers[-1]
+    kernel, bias = output.get_weights()
+    if num_classes == len(bias):
+        return model
+    if num_classes < len(bias):
+        raise ValueError(f"The model has {len(bias)} outputs, more than the {num_classes} classes in the mapping.")
+
+    grown = tf.keras.layers.Dense(num_classes, activation="softmax", dtype="float32", name=f"output_{num_classes}")
+    model = tf.keras.Model(model.inputs, grown(output.input))
+    new_kernel, new_bias = grown.get_weights()
+    new_kernel[:, :len(bias)] = kernel
+    new_bias[:len(bias)] = bias
+    grown.set_weights([new_kernel, new_bias])
+    return model
+
+def load_for_fine_tuning(model_path, num_classes, learning_rate=FINE_TUNE_LEARNING_RATE, jit_compile=JIT_COMPILE):
+    """
+    Load a trained model, grow its output layer to `num_classes` and compile it with a fresh optimizer.
+
+    Returns:
+        model: Compiled model.
+    """
+    model = grow_output_layer(tf.keras.models.load_model(model_path), num_classes)
+    model.compile(optimizer=tf.optimizers.Adam(learning_rate=learning_rate), loss="sparse_categorical_crossentropy",
+                  metrics=["accuracy"], jit_compile=jit_compile)
+    return model
+
+def sample_digests(metadata):
+    """SHA-256 of every sample's source file from the store manifest, None for stores without one."""
+    manifest = metadata.get("manifest", {})
+    return [manifest.get(file_path, {}).get("sha256") for file_path in metadata["files"]]
+
+def record_training(model_path, metadata, train_index, **extra):
+    """
+    Save what a model was trained on next to it: the sample rate the features were extracted at, so inference
+    decodes audio the same way, the mapping its outputs follow, and its training files for later fine-tuning.
+
+    Args:
+        model_path (str): Saved model.
+        metadata (dict): Feature store metadata.
+        train_index (np.ndarray): Training split of the store.
+        **extra: Further metadata, e.g. training time.
+    """
+    digests = sample_digests(metadata)
+    save_model_metadata(model_path, sample_rate=metadata.get("sample_rate", MODEL_SAMPLE_RATE),
+                        mapping=metadata["mapping"], **extra)
+    save_training_manifest(model_path, {metadata["files"][i]: digests[i] for i in train_index})
+
+def fine_tune_samples(metadata, train_index, trained, replay_ratio=REPLAY_RATIO, seed=None):
+    """
+    Select the training samples whose files are new or changed since a model was trained.
+
+    Args:
+        metadata (dict): Feature store metadata.
+        train_index (np.ndarray): Training split of the store.
+        trained (dict): Files the model was trained on and their SHA-256, from `load_training_manifest`.
+        replay_ratio (float): Already-trained samples to mix in per new sample.
+        seed (int): Seed for picking the replayed samples.
+
+    Returns:
+        tuple: (sorted indices to train on, number of new or changed samples among them)
+    """
+    files, digests = metadata["files"], sample_digests(metadata)
+    changed = np.array([files[i] not in trained or trained[files[i]] != digests[i] for i in train_index], dtype=bool)
+    new_index, old_index = train_index[changed], train_index[~changed]
+    replay = min(len(old_index), int(round(replay_ratio * len(new_index))))
+    replay_index = np.random.default_rng(seed).choice(old_index, replay, replace=False)
+    return np.sort(np.concatenate([new_index, replay_index])), len(new_index)
+
+def train(model, epochs, batch_size, patience, X_train, y_train, X_validation, y_validation, callbacks=None,
+          checkpoint_dir=None, checkpoint_freq=CHECKPOINT_FREQ, initial_epoch=0):
     """
     Trains the model and applies early stopping based on validation accuracy.
 
+    X_train and X_validation may be arrays, or batched tf.data datasets of
+    (features, labels) as returned by `prepare_datasets`, with y_train and
+    y_validation set to None.
+
     Args:
         model: Compiled model.
         epochs (int): Number of epochs.
-        batch_size (int): Batch size.
+        batch_size (int): Batch size, for array inputs.
         patience (int): Early stopping patience.
+        callbacks (list): Extra Keras callbacks, e.g. for timing.
+        checkpoint_dir (str): Save the model and optimizer state here every `checkpoint_freq`.
+            If it holds a checkpoint, training resumes from it instead of starting over; it is
+            deleted once training finishes.
+        checkpoint_freq (str or int): "epoch", or a number of batches.
+        initial_epoch (int): Epochs the model was already trained for, when continuing a saved model.
 
     Returns:
         history: Training history.
@@ -116,33 +334,140 @@ def train(model, epochs, batch_size, patience, X_train, y_train, X_validation, y
     # Early stopping to prevent overfitting
     early_stopping = tf.keras.callbacks.EarlyStopping(monitor="val_accuracy", min_delta=0.001, patience=patience)
     
+    callbacks = [early_stopping] + list(callbacks or [])
+    if checkpoint_dir is not None:
+        callbacks.append(tf.keras.callbacks.BackupAndRestore(checkpoint_dir, save_freq=checkpoint_freq))
+    
+    if isinstance(X_train, tf.data.Dataset):
+        return model.fit(X_train, epochs=epochs, validation_data=X_validation, callbacks=callbacks,
+                         initial_epoch=initial_epoch)
+    
     history = model.fit(
         X_train, y_train,
         epochs=epochs,
         batch_size=batch_size,
         validation_data=(X_validation, y_validation),
-        callbacks=[early_stopping]
+        callbacks=callbacks,
+        initial_epoch=initial_epoch
     )
     return history
 
-def main():
-    # Prepare dataset splits
-    X_train, y_train, X_validation, y_validation, X_test, y_test = prepare_dataset(DATA_PATH)
+def main(fine_tune=False, architecture=ARCHITECTURE, teacher_path=None, model_path=SAVED_MODEL_PATH, epochs=None):
+    """
+    Train a model on the feature store and save it.
+
+    With `fine_tune`, the saved model is trained further on just the samples whose
+    files were added or changed since it was trained, plus REPLAY_RATIO replayed
+    ones, growing its output layer if the mapping gained keywords. With
+    `teacher_path`, the new model is distilled from that trained model. Either way
+    a rerun after an interruption resumes from the last checkpoint in CHECKPOINT_DIR.
+
+    Args:
+        fine_tune (bool): Continue training the model at `model_path`.
+        architecture (str): Architecture of a new model, see `build_model`.
+        teacher_path (str): Trained model to distill a new model from.
+        model_path (str): Where the model is saved (and loaded from, when fine-tuning).
+        epochs (int): Maximum epochs; EPOCHS, or FINE_TUNE_EPOCHS when fine-tuning, by default.
+    """
+    # Size the thread pools and pick the precision before TensorFlow starts executing
+    configure_threads(INTRA_OP_THREADS, INTER_OP_THREADS)
+    if MIXED_PRECISION:
+        enable_mixed_precision()
+    
+    metadata = load_metadata(DATA_PATH)
+    mapping = metadata["mapping"]
+    train_index, _, _ = split_by_file(metadata["files"], TEST_SIZE, VALIDATION_SIZE)
+    previous = load_model_metadata(model_path) if fine_tune else {}
+    
+    fit_index = None
+    if fine_tune:
+        if mapping[:len(previous.get("mapping", []))] != previous.get("mapping", []):
+            raise ValueError("The feature store's label mapping no longer starts with the model's; "
+                             "it was rebuilt, so train from scratch.")
+        trained = load_training_manifest(model_path)
+        fit_index, num_new = fine_tune_samples(metadata, train_index, trained)
+        if not num_new:
+            print("No new or changed training samples since the model was trained; nothing to fine-tune.")
+            return
+        print(f"Fine-tuning on {num_new} new or changed samples and {len(fit_index) - num_new} replayed ones "
+              f"({len(train_index)} in the training split)")
     
-    # Initialize model
-    input_shape = (X_train.shape[1], X_train.shape[2], 1)
-    model = build_model(input_shape, learning_rate=LEARNING_RATE)
+    # Prepare streaming dataset splits, timing how long each epoch waits on the training pipeline
+    stall_monitor = InputStallMonitor()
+    train_data, validation_data, test_data, input_shape, num_train = prepare_datasets(
+        DATA_PATH, BATCH_SIZE, train_index=fit_index, stall_monitor=stall_monitor
+    )
+    
+    # Initialize model, scaling the learning rate to the batch size
+    if fine_tune:
+        model = load_for_fine_tuning(model_path, len(mapping), scaled_learning_rate(BATCH_SIZE,
+                                     FINE_TUNE_LEARNING_RATE), JIT_COMPILE)
+    else:
+        learning_rate = scaled_learning_rate(BATCH_SIZE, LEARNING_RATE if architecture == "cnn" else
+                                             COMPACT_LEARNING_RATE)
+        model = build_model(input_shape, learning_rate=learning_rate, jit_compile=JIT_COMPILE,
+                            num_classes=len(mapping), architecture=architecture)
+    
+    student = model
+    if teacher_path:
+        teacher = tf.keras.models.load_model(teacher_path)
+        if load_model_metadata(teacher_path).get("mapping", mapping) != mapping:
+            raise ValueError("The teacher was trained on a different label mapping than the feature store's.")
+        if teacher.output_shape[-1] != len(mapping):
+            raise ValueError(f"The teacher has {teacher.output_shape[-1]} outputs but the mapping has "
+                             f"{len(mapping)} labels; fine-tune the teacher first.")
+        model = Distiller(student, teacher)
+        # The student's own optimizer, so its state is saved with the student
+        model.compile(optimizer=student.optimizer, metrics=["accuracy"], jit_compile=JIT_COMPILE)
+        model(tf.zeros((1,) + input_shape))  # Checkpoints need a built model
     
-    # Train model
-    history = train(model, EPOCHS, BATCH_SIZE, PATIENCE, X_train, y_train, X_validation, y_validation)
+    # Train model, reporting throughput and how long each epoch waited on input
+    throughput = ThroughputMonitor(num_train)
+    checkpoint_name = os.path.splitext(os.path.basename(model_path))[0] + ("_fine_tune" if fine_tune else "")
+    start = time.perf_counter()
+    history = train(model, epochs or (FINE_TUNE_EPOCHS if fine_tune else EPOCHS), BATCH_SIZE, PATIENCE,
+                    train_data, None, validation_data, None,
+                    callbacks=[stall_monitor, throughput],
+                    checkpoint_dir=os.path.join(CHECKPOINT_DIR, checkpoint_name))
+    training_seconds = time.perf_counter() - start
     
     # Evaluate performance on test set
-    test_loss, test_acc = model.evaluate(X_test, y_test)
+    test_loss, test_acc = model.evaluate(test_data)
     print(f"\nTest Loss: {test_loss}, Test Accuracy: {test_acc * 100:.2f}%")
     
-    # Save trained model in the Keras format
-    model.save(SAVED_MODEL_PATH)
+    if fine_tune:
+        # Scale the last full run to today's training split, or failing that extrapolate this run's throughput
+        if previous.get("training_seconds") and previous.get("training_samples"):
+            full_seconds = previous["training_seconds"] * len(train_index) / previous["training_samples"]
+        else:
+            full_seconds = sum(throughput.epoch_seconds) * len(train_index) / num_train
+        print(f"Fine-tuned in {training_seconds:.1f}s; full retraining would take about {full_seconds:.1f}s, "
+              f"{full_seconds - training_seconds:.1f}s ({full_seconds / training_seconds:.1f}x) more")
+    
+    # Save trained model in the Keras format; a distilled model is saved without its teacher
+    os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+    student.save(model_path)
+    
+    # Keep the last full run's time as the baseline for fine-tuning reports
+    extra = {} if fine_tune else {
+        "training_seconds": training_seconds, "training_samples": num_train, "architecture": architecture,
+        "teacher": teacher_path,
+    }
+    record_training(model_path, metadata, train_index, **extra)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train the keyword model on the feature store.")
+    parser.add_argument("--fine-tune", action="store_true",
+                        help="Continue training the saved model on new or changed samples only")
+    parser.add_argument("--architecture", default=ARCHITECTURE, choices=["cnn"] + list(ARCHITECTURES),
+                        help="Architecture of a new model")
+    parser.add_argument("--teacher", help="Trained model to distill the new model from, e.g. models/model.keras")
+    parser.add_argument("--output", default=SAVED_MODEL_PATH, help="Path the model is saved to")
+    parser.add_argument("--epochs", type=int, help="Maximum epochs")
+    args = parser.parse_args()
+    if args.fine_tune and args.teacher:
+        parser.error("--teacher applies to new models, not --fine-tune")
+    if args.teacher and os.path.abspath(args.teacher) == os.path.abspath(args.output):
+        parser.error("the distilled model would overwrite its teacher; pass --output")
+    main(args.fine_tune, args.architecture, args.teacher, args.output, args.epochs)
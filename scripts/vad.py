@@ -0,0 +1,77 @@
+import numpy as np
+
+VAD_FRAME_SECONDS = 0.02  # Analysis frame for energy and zero-crossing rate
+VAD_ENERGY_FLOOR_DB = -50.0  # Frames quieter than this (dBFS) are never speech
+VAD_NOISE_MARGIN_DB = 10.0  # Speech must be this far above the file's noise floor
+VAD_MAX_ZCR = 0.25  # Zero crossings per sample above which a frame is treated as noise
+VAD_MIN_SPEECH_FRACTION = 0.1  # Share of speech frames a window needs to be kept
+BLOCK_FRAMES = 3000  # Frames decoded at a time, so memory-mapped signals are never loaded whole
+
+
+def frame_features(signal, frame_length):
+    """
+    Per-frame RMS energy (dBFS) and zero-crossing rate over non-overlapping frames.
+
+    Args:
+        signal (np.ndarray or MappedWav): Mono float signal in [-1, 1]
+        frame_length (int): Samples per frame; a trailing partial frame is dropped
+
+    Returns:
+        tuple: (energy_db, zcr) arrays with one value per frame
+    """
+    num_frames = len(signal) // frame_length
+    energy_db = np.empty(num_frames)
+    zcr = np.empty(num_frames)
+    for start in range(0, num_frames, BLOCK_FRAMES):
+        stop = min(start + BLOCK_FRAMES, num_frames)
+        frames = signal[start * frame_length:stop * frame_length].reshape(stop - start, frame_length)
+
+        rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+        energy_db[start:stop] = 20 * np.log10(np.maximum(rms, 1e-10))
+        zcr[start:stop] = np.mean(np.abs(np.diff(np.signbit(frames), axis=1)), axis=1)
+    return energy_db, zcr
+
+
+def speech_frames(signal, sample_rate):
+    """
+    Classify non-overlapping VAD_FRAME_SECONDS frames as speech or not.
+
+    A frame is speech when its energy clears both the absolute floor and the
+    file's noise floor (10th percentile energy) plus a margin, and its
+    zero-crossing rate is low enough not to be broadband line noise.
+
+    Returns:
+        tuple: (boolean speech mask per frame, frame length in samples)
+    """
+    frame_length = max(1, int(VAD_FRAME_SECONDS * sample_rate))
+    energy_db, zcr = frame_features(signal, frame_length)
+    if len(energy_db) == 0:
+        return np.zeros(0, dtype=bool), frame_length
+
+    threshold = max(VAD_ENERGY_FLOOR_DB, np.percentile(energy_db, 10) + VAD_NOISE_MARGIN_DB)
+    return (energy_db >= threshold) & (zcr <= VAD_MAX_ZCR), frame_length
+
+
+def speech_windows(signal, sample_rate, window_samples, hop_samples, num_windows):
+    """
+    Decide which analysis windows contain enough speech to be worth featurizing.
+
+    Args:
+        signal (np.ndarray or MappedWav): Mono float signal
+        sample_rate (int): Sample rate of `signal`
+        window_samples (int): Window length in samples
+        hop_samples (int): Samples between window starts
+        num_windows (int): Number of windows the caller will evaluate
+
+    Returns:
+        np.ndarray: Boolean mask, True for windows to keep
+    """
+    is_speech, frame_length = speech_frames(signal, sample_rate)
+
+    # Count speech frames inside every window with a cumulative sum
+    counts = np.concatenate([[0], np.cumsum(is_speech)])
+    starts = np.minimum(np.arange(num_windows) * hop_samples // frame_length, len(is_speech))
+    ends = np.minimum((np.arange(num_windows) * hop_samples + window_samples) // frame_length, len(is_speech))
+
+    window_frames = max(1, window_samples // frame_length)
+    return (counts[ends] - counts[starts]) >= VAD_MIN_SPEECH_FRACTION * window_frames
@@ -0,0 +1,41 @@
+"""
+Shared fixtures. Run the suite from the repository root:
+
+    python -m pytest tests
+"""
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.model_metadata import save_model_metadata  # noqa: E402
+
+TEST_WAV = os.path.join(ROOT, "test", "test.wav")
+MODEL_PATH = os.path.join(ROOT, "models", "model.keras")
+
+
+@pytest.fixture(scope="session")
+def model_path(tmp_path_factory):
+    """The repository's model, copied next to a placeholder label mapping (it ships without one)."""
+    import tensorflow as tf
+
+    path = str(tmp_path_factory.mktemp("model") / "model.keras")
+    shutil.copyfile(MODEL_PATH, path)
+    num_classes = tf.keras.models.load_model(path).output_shape[-1]
+    save_model_metadata(path, mapping=[f"keyword_{i}" for i in range(num_classes)])
+    return path
+
+
+@pytest.fixture(scope="session")
+def service(model_path):
+    """Uncached detection service over `model_path`, traced once for the whole session."""
+    from scripts.detect import KeywordSpottingService
+
+    kss = KeywordSpottingService(model_path)
+    kss.warmup(background=False)
+    return kss
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from conftest import MODEL_PATH
+from scripts.compress import MagnitudePruning, cluster, prunable_kernels
+from scripts.compressed_model import load_compressed, save_compressed
+
+
+@pytest.fixture
+def model():
+    return tf.keras.models.load_model(MODEL_PATH, compile=False)
+
+
+def prune_to(model, sparsity):
+    pruning = MagnitudePruning(sparsity, epochs=1)
+    pruning.set_model(model)
+    pruning.prune(sparsity)
+    return model
+
+
+def assert_round_trip(model, path):
+    save_compressed(model, path)
+    restored = load_compressed(path)
+
+    assert restored.to_json() == model.to_json()
+    for original, loaded in zip(model.get_weights(), restored.get_weights(), strict=True):
+        assert loaded.dtype == original.dtype and loaded.shape == original.shape
+        np.testing.assert_array_equal(loaded, original)
+
+    features = np.random.default_rng(0).normal(0, 50, (4,) + tuple(model.input_shape[1:])).astype(np.float32)
+    np.testing.assert_array_equal(restored.predict_on_batch(features), model.predict_on_batch(features))
+
+
+@pytest.mark.parametrize("sparsity, num_clusters, encoding", [
+    (0.0, None, "dense"),
+    (0.9, None, "sparse"),
+    (0.5, 15, "codebook"),
+    (0.0, 200, "codebook"),
+])
+def test_save_compressed_is_lossless(tmp_path, model, sparsity, num_clusters, encoding):
+    if sparsity:
+        prune_to(model, sparsity)
+    if num_clusters:
+        cluster(model, num_clusters)
+
+    path = str(tmp_path / "model.npz")
+    assert_round_trip(model, path)
+    counts = save_compressed(model, path)
+    assert counts[encoding] > 0
+
+
+def test_pruning_schedule_reaches_target_in_last_epoch():
+    pruning = MagnitudePruning(0.8, epochs=4)
+    schedule = [pruning.sparsity(epoch) for epoch in range(4)]
+
+    assert schedule[0] == 0.0
+    assert schedule == sorted(schedule)
+    assert schedule[-2] < 0.8
+    assert schedule[-1] == pytest.approx(0.8)
+    assert MagnitudePruning(0.8, epochs=1).sparsity(0) == pytest.approx(0.8)
+
+
+@pytest.mark.parametrize("sparsity", [0.3, 0.75])
+def test_prune_zeroes_exactly_the_smallest_weights(model, sparsity):
+    before = [np.abs(kernel.numpy()) for kernel in prunable_kernels(model)]
+    prune_to(model, sparsity)
+    for magnitudes, kernel in zip(before, prunable_kernels(model)):
+        pruned = kernel.numpy() == 0
+        assert np.count_nonzero(pruned) == int(sparsity * magnitudes.size)
+        assert magnitudes[pruned].max() <= magnitudes[~pruned].min()
+
+
+def test_prune_at_zero_sparsity_keeps_every_weight(model):
+    before = model.get_weights()
+    pruning = MagnitudePruning(0.9, epochs=4)
+    pruning.set_model(model)
+    pruning.prune(pruning.sparsity(0))
+
+    for original, kept in zip(before, model.get_weights()):
+        np.testing.assert_array_equal(kept, original)
@@ -0,0 +1,160 @@
+import os
+
+import librosa
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from conftest import TEST_WAV
+from scripts import features
+from scripts.audio import open_audio
+from scripts.detect import (INFERENCE_BATCH_SIZE, NMS_IOU_THRESHOLD, SAMPLES_TO_CONSIDER, KeywordSpottingService,
+                            Keyword_Spotting_Service)
+from scripts.features import N_FFT
+from scripts.probability_cache import CACHE_DIR_ENV_VAR, PROBABILITY_CACHE_DIR, ProbabilityCache
+from scripts.realtime import RealtimeKeywordSpotter
+
+
+@pytest.fixture(scope="module")
+def baseline_probabilities(model_path, service):
+    """Per-chunk probabilities the original way: librosa features and one model call per chunk."""
+    model = tf.keras.models.load_model(model_path)
+    signal, sample_rate = librosa.load(TEST_WAV, sr=service.sample_rate)
+    probabilities = []
+    for i in range(0, len(signal), SAMPLES_TO_CONSIDER):
+        chunk = signal[i:i + SAMPLES_TO_CONSIDER]
+        chunk = np.pad(chunk, (0, SAMPLES_TO_CONSIDER - len(chunk)))
+        mfccs = librosa.feature.mfcc(y=chunk, sr=sample_rate, n_mfcc=13, n_fft=2048, hop_length=512).T
+        probabilities.append(model.predict(mfccs[np.newaxis, ..., np.newaxis], verbose=0)[0])
+    return np.array(probabilities)
+
+
+def baseline_predictions(service, probabilities, confidence_threshold, min_detections):
+    predictions = []
+    for i, pred_probs in enumerate(probabilities):
+        pred_idx = np.argmax(pred_probs)
+        if pred_probs[pred_idx] >= confidence_threshold:
+            predictions.append((service._mapping[pred_idx], float(i), float(i + 1), pred_probs[pred_idx]))
+    return service._aggregate_predictions(predictions, min_detections)
+
+
+def assert_same_predictions(actual, expected):
+    key = lambda prediction: (prediction["start_time"], prediction["keyword"])  # noqa: E731
+    actual, expected = sorted(actual, key=key), sorted(expected, key=key)
+    assert [key(p) + (p["end_time"], p["num_detections"]) for p in actual] == \
+        [key(p) + (p["end_time"], p["num_detections"]) for p in expected]
+    np.testing.assert_allclose([p["confidence"] for p in actual], [p["confidence"] for p in expected], atol=1e-4)
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, INFERENCE_BATCH_SIZE])
+def test_batched_probabilities_match_chunk_baseline(service, baseline_probabilities, batch_size):
+    probabilities, hop = service._window_probabilities(TEST_WAV, batch_size=batch_size)
+
+    assert hop == 1.0
+    assert probabilities.shape == baseline_probabilities.shape
+    np.testing.assert_allclose(probabilities, baseline_probabilities, rtol=0, atol=1e-4)
+    np.testing.assert_array_equal(probabilities.argmax(axis=1), baseline_probabilities.argmax(axis=1))
+
+
+@pytest.mark.parametrize("confidence_threshold, min_detections", [(0.5, 1), (0.5, 2), (0.75, 1), (0.9, 1)])
+@pytest.mark.parametrize("batch_size", [1, INFERENCE_BATCH_SIZE])
+def test_predict_and_predict_stream_match_chunk_baseline(service, baseline_probabilities, confidence_threshold,
+                                                         min_detections, batch_size):
+    # Thresholds are chosen away from every chunk's confidence, so float differences cannot flip one
+    assert np.abs(baseline_probabilities.max(axis=1) - confidence_threshold).min() > 1e-3
+    expected = baseline_predictions(service, baseline_probabilities, confidence_threshold, min_detections)
+    assert expected
+
+    predicted = service.predict(TEST_WAV, confidence_threshold, min_detections, batch_size=batch_size)
+    streamed = list(service.predict_stream(TEST_WAV, confidence_threshold, min_detections, batch_size=batch_size))
+
+    assert_same_predictions(predicted, expected)
+    assert_same_predictions(streamed, expected)
+
+
+@pytest.mark.parametrize("hop_seconds", [0.25, 0.5])
+def test_sliding_windows_match_per_window_mfcc(service, hop_seconds):
+    windows, hop, _ = service._process_audio_windows(TEST_WAV, hop_seconds, sample_rate=service.sample_rate)
+    signal, sample_rate = open_audio(TEST_WAV, service.sample_rate)
+    hop_samples = int(round(hop * sample_rate))
+
+    # Each window is its own samples plus the n_fft // 2 of context its centered edge frames reach into
+    context = N_FFT // 2
+    padded = np.pad(np.asarray(signal[:], dtype=np.float32), (context, len(windows) * hop_samples + N_FFT))
+    segments = np.stack([padded[i * hop_samples:i * hop_samples + SAMPLES_TO_CONSIDER + 2 * context]
+                         for i in range(len(windows))])
+    expected = features.mfcc(segments, sample_rate, center=False)
+
+    assert windows.shape == expected.shape
+    np.testing.assert_allclose(windows, expected, rtol=0, atol=1e-3)
+
+
+def test_realtime_windows_match_sliding_windows(service):
+    class RecordingSpotter(RealtimeKeywordSpotter):
+        def _window_mfcc(self, mel):
+            recorded.append(super()._window_mfcc(mel))
+            return recorded[-1]
+
+    recorded = []
+    windows, hop, _ = service._process_audio_windows(TEST_WAV, 0.25, sample_rate=service.sample_rate)
+    spotter = RecordingSpotter(service, hop_seconds=0.25)
+    signal, _ = open_audio(TEST_WAV, service.sample_rate)
+    signal = np.asarray(signal[:], dtype=np.float32)
+    for start in range(0, len(signal), 1024):
+        spotter.push(signal[start:start + 1024])
+    spotter.flush()
+
+    recorded = np.stack(recorded[1:])  # The constructor scores one silent window to warm up
+    assert recorded.shape == windows.shape
+    np.testing.assert_allclose(recorded, windows, rtol=0, atol=1e-3)
+
+
+def assert_no_overlapping_detections(predictions):
+    by_keyword = {}
+    for prediction in predictions:
+        by_keyword.setdefault(prediction["keyword"], []).append((prediction["start_time"], prediction["end_time"]))
+    for spans in by_keyword.values():
+        spans.sort()
+        for (_, end), (start, _) in zip(spans, spans[1:]):
+            assert start >= end, f"overlapping detections in {spans}"
+
+
+@pytest.mark.parametrize("hop_seconds", [0.1, 0.25, 0.5])
+@pytest.mark.parametrize("confidence_threshold, min_detections", [(0.5, 1), (0.75, 1), (0.5, 2)])
+def test_sliding_window_detections_of_a_keyword_do_not_overlap(service, hop_seconds, confidence_threshold,
+                                                                 min_detections):
+    predictions = service.predict(TEST_WAV, confidence_threshold, min_detections, hop_seconds=hop_seconds)
+    assert predictions
+    assert_no_overlapping_detections(predictions)
+
+
+def test_non_max_suppression_keeps_the_best_window_of_overlapping_hits(service):
+    # Hits 0.6s apart overlap by 0.4s, an IoU of 0.25
+    detections = [("kw", 0.0, 1.0, 0.7), ("kw", 0.6, 1.6, 0.9), ("kw", 1.2, 2.2, 0.8), ("kw", 2.5, 3.5, 0.6),
+                  ("other", 0.5, 1.5, 0.95)]
+    predictions = service._aggregate_predictions(detections, 1, NMS_IOU_THRESHOLD)
+
+    assert_no_overlapping_detections(predictions)
+    assert [(p["keyword"], p["start_time"], p["num_detections"]) for p in predictions] == \
+        [("other", 0.5, 1), ("kw", 0.6, 3), ("kw", 2.5, 1)]
+
+
+def test_shared_service_caches_probabilities_only_when_asked(monkeypatch, tmp_path):
+    shared = KeywordSpottingService.__new__(KeywordSpottingService)  # Stands in for the loaded model
+    shared.cache = None
+    monkeypatch.setattr(KeywordSpottingService, "_instance", shared)
+    monkeypatch.chdir(tmp_path)
+
+    assert Keyword_Spotting_Service().cache is None
+    assert Keyword_Spotting_Service(cache="probabilities").cache.cache_dir == str(tmp_path / "probabilities")
+    assert Keyword_Spotting_Service().cache is shared.cache
+
+
+def test_probability_cache_directory_is_fixed_when_the_cache_is_created(monkeypatch, tmp_path):
+    assert os.path.isabs(PROBABILITY_CACHE_DIR)
+
+    monkeypatch.setenv(CACHE_DIR_ENV_VAR, "configured")
+    monkeypatch.chdir(tmp_path)
+    cache = ProbabilityCache()
+    monkeypatch.chdir(tmp_path.parent)
+    assert cache.cache_dir == str(tmp_path / "configured") and os.path.isdir(cache.cache_dir)
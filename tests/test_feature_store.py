@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+
+from scripts.feature_store import FeatureStoreWriter, load_features, load_metadata
+
+SHARD_SIZE = 4
+FRAMES, NUM_MFCC = 44, 13
+
+
+def sample(index):
+    """Deterministic (frames, num_mfcc) MFCCs identifying sample `index`."""
+    return np.full((FRAMES, NUM_MFCC), index, dtype=np.float32)
+
+
+def write(store_path, indices, append=False, remove=()):
+    with FeatureStoreWriter(store_path, ["a", "b"], shard_size=SHARD_SIZE, append=append) as writer:
+        writer.remove([f"{i}.wav" for i in remove])
+        for i in indices:
+            writer.add(sample(i), i % 2, f"{i}.wav")
+
+
+def assert_store(store_path, indices):
+    X, y = load_features(store_path)
+    metadata = load_metadata(store_path)
+    np.testing.assert_array_equal(X, np.stack([sample(i) for i in indices]))
+    np.testing.assert_array_equal(y, [i % 2 for i in indices])
+    assert metadata["files"] == [f"{i}.wav" for i in indices]
+    assert sum(shard["count"] for shard in metadata["shards"]) == len(indices)
+    shard_files = {name for name in os.listdir(store_path) if name.endswith(".npy")}
+    assert shard_files == {shard["path"] for shard in metadata["shards"]}
+
+
+def test_write_round_trips(tmp_path):
+    write(str(tmp_path), range(10))
+    assert_store(str(tmp_path), list(range(10)))
+
+
+def test_append_and_remove_round_trip(tmp_path):
+    store_path = str(tmp_path)
+    write(store_path, range(10))
+    untouched = load_metadata(store_path)["shards"][0]
+
+    write(store_path, range(10, 13), append=True, remove=[5, 9])
+    assert_store(store_path, [0, 1, 2, 3, 4, 6, 7, 8, 10, 11, 12])
+    # Shards without removed samples are kept as they are
+    assert load_metadata(store_path)["shards"][0] == untouched
+
+    write(store_path, [], append=True, remove=range(13))
+    assert load_metadata(store_path)["files"] == []
+    assert not [name for name in os.listdir(store_path) if name.endswith(".npy")]
+
+
+def test_remove_unknown_files_is_a_no_op(tmp_path):
+    store_path = str(tmp_path)
+    write(store_path, range(6))
+    with FeatureStoreWriter(store_path, append=True) as writer:
+        assert writer.remove(["missing.wav"]) == 0
+    assert_store(store_path, list(range(6)))
+
+
+def test_interrupted_rebuild_leaves_previous_store_intact(tmp_path):
+    store_path = str(tmp_path)
+    write(store_path, range(10))
+
+    with pytest.raises(RuntimeError):
+        with FeatureStoreWriter(store_path, ["a", "b"], shard_size=SHARD_SIZE) as writer:
+            for i in range(100, 110):
+                writer.add(sample(i), 0, f"{i}.wav")
+            raise RuntimeError("crash mid-rebuild")
+    X, _ = load_features(store_path)
+    np.testing.assert_array_equal(X, np.stack([sample(i) for i in range(10)]))
+
+    # The next complete rebuild replaces the store and deletes old and orphaned shards
+    write(store_path, range(20, 22))
+    assert_store(store_path, [20, 21])
@@ -0,0 +1,56 @@
+import librosa
+import numpy as np
+import pytest
+
+from conftest import TEST_WAV
+from scripts import features
+from scripts.detect import SAMPLES_TO_CONSIDER
+
+SAMPLE_RATE = 22050
+MFCC_TOLERANCE = 5e-3  # Largest absolute difference allowed from librosa.feature.mfcc
+
+
+@pytest.fixture(scope="module")
+def chunks():
+    """test/test.wav as (num_chunks, samples) one-second chunks, the last one zero-padded."""
+    signal, _ = librosa.load(TEST_WAV, sr=SAMPLE_RATE)
+    signal = np.pad(signal, (0, -len(signal) % SAMPLES_TO_CONSIDER))
+    return signal.reshape(-1, SAMPLES_TO_CONSIDER)
+
+
+def librosa_mfcc(signal, sample_rate=SAMPLE_RATE, **kwargs):
+    params = {"n_mfcc": features.NUM_MFCC, "n_fft": features.N_FFT, "hop_length": features.HOP_LENGTH}
+    params.update(kwargs)
+    return librosa.feature.mfcc(y=signal, sr=sample_rate, **params).T
+
+
+def assert_close_to_librosa(actual, expected):
+    # float32 precision on coefficients of up to ~1e3 (silence sits at the -1e3 dB floor)
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=MFCC_TOLERANCE)
+
+
+def test_batched_mfcc_matches_librosa(chunks):
+    batched = features.mfcc(chunks, SAMPLE_RATE)
+
+    assert batched.dtype == np.float32
+    assert batched.shape == (len(chunks), 44, features.NUM_MFCC)
+    for chunk, mfccs in zip(chunks, batched):
+        assert_close_to_librosa(mfccs, librosa_mfcc(chunk))
+
+
+def test_single_signal_mfcc_matches_librosa(chunks):
+    signal = chunks.ravel()[:3 * SAMPLES_TO_CONSIDER + 1234]
+    assert_close_to_librosa(features.mfcc(signal, SAMPLE_RATE), librosa_mfcc(signal))
+
+
+@pytest.mark.parametrize("sample_rate, num_mfcc, n_fft, hop_length", [(16000, 20, 1024, 256), (8000, 13, 512, 128)])
+def test_mfcc_matches_librosa_for_other_parameters(chunks, sample_rate, num_mfcc, n_fft, hop_length):
+    signal = librosa.resample(chunks[2], orig_sr=SAMPLE_RATE, target_sr=sample_rate)
+    actual = features.mfcc(signal, sample_rate, num_mfcc, n_fft, hop_length)
+    assert_close_to_librosa(actual, librosa_mfcc(signal, sample_rate, n_mfcc=num_mfcc, n_fft=n_fft,
+                                                 hop_length=hop_length))
+
+
+def test_silence_matches_librosa():
+    silence = np.zeros(SAMPLES_TO_CONSIDER, dtype=np.float32)
+    assert_close_to_librosa(features.mfcc(silence, SAMPLE_RATE), librosa_mfcc(silence))
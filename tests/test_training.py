@@ -0,0 +1,22 @@
+import pytest
+
+from benchmarks.bench_training import ACCURACY_TOLERANCE, run_config
+
+# Small enough to run in about a minute, large enough that batch-256 training with the
+# linearly scaled learning rate has converged as far as the baseline
+NUM_SAMPLES = 6000
+EPOCHS = 6
+SEED = 0
+
+
+@pytest.fixture(scope="module")
+def baseline_accuracy():
+    return run_config("baseline", NUM_SAMPLES, EPOCHS, SEED)["test_accuracy"]
+
+
+@pytest.mark.parametrize("name", ["batch256"])
+def test_scaled_training_stays_within_accuracy_tolerance_of_baseline(baseline_accuracy, name):
+    accuracy = run_config(name, NUM_SAMPLES, EPOCHS, SEED)["test_accuracy"]
+
+    assert baseline_accuracy - accuracy <= ACCURACY_TOLERANCE, \
+        f"{name} accuracy {accuracy:.3f} vs baseline {baseline_accuracy:.3f}"
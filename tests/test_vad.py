@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from conftest import TEST_WAV
+from scripts.audio import open_audio
+from scripts.detect import SAMPLES_TO_CONSIDER
+
+GAP_CHUNKS = 3  # Chunks of line noise on either side of the speech
+NOISE_DB = -60.0
+SPEECH_PEAK_DB = -35.0  # Chunks whose loudest 20ms frame reaches this hold clear speech
+
+
+@pytest.fixture(scope="module")
+def dispatch_recording(tmp_path_factory, service):
+    """test/test.wav between chunk-aligned stretches of low-level line noise, at the model's sample rate."""
+    speech, sample_rate = open_audio(TEST_WAV, service.sample_rate)
+    speech = np.asarray(speech[:], dtype=np.float32)
+    speech = np.pad(speech, (0, -len(speech) % SAMPLES_TO_CONSIDER))
+    noise = np.random.default_rng(0).normal(0, 10 ** (NOISE_DB / 20), GAP_CHUNKS * SAMPLES_TO_CONSIDER)
+    path = str(tmp_path_factory.mktemp("vad") / "dispatch.wav")
+    sf.write(path, np.concatenate([noise, speech, noise]).astype(np.float32), sample_rate)
+    return path
+
+
+@pytest.mark.parametrize("path_fixture", ["test_wav", "dispatch_recording"])
+@pytest.mark.parametrize("hop_seconds", [None, 0.25])
+def test_vad_keeps_predictions_of_kept_windows(request, service, path_fixture, hop_seconds):
+    path = TEST_WAV if path_fixture == "test_wav" else request.getfixturevalue(path_fixture)
+    baseline, baseline_hop = service._window_probabilities(path, hop_seconds, vad=False)
+    gated, gated_hop = service._window_probabilities(path, hop_seconds, vad=True)
+
+    assert gated_hop == baseline_hop
+    assert gated.shape == baseline.shape
+    kept = ~np.isnan(gated[:, 0])
+    assert kept.any()
+    np.testing.assert_allclose(gated[kept], baseline[kept], rtol=0, atol=1e-5)
+    np.testing.assert_array_equal(gated[kept].argmax(axis=1), baseline[kept].argmax(axis=1))
+
+
+def test_vad_skips_noise_and_keeps_speech_chunks(service, dispatch_recording):
+    gated, _ = service._window_probabilities(dispatch_recording, vad=True)
+    kept = ~np.isnan(gated[:, 0])
+
+    signal, sample_rate = sf.read(dispatch_recording, dtype="float32")
+    frame_length = int(0.02 * sample_rate)
+    frames = signal[:len(signal) // frame_length * frame_length].reshape(-1, frame_length)
+    peak_db = 20 * np.log10(np.maximum(np.sqrt(np.mean(frames ** 2, axis=1)), 1e-10))
+    chunk_frames = SAMPLES_TO_CONSIDER // frame_length
+    clear_speech = np.array([
+        peak_db[i * chunk_frames:(i + 1) * chunk_frames].max(initial=-np.inf) >= SPEECH_PEAK_DB
+        for i in range(len(kept))
+    ])
+
+    assert not kept[:GAP_CHUNKS].any() and not kept[-GAP_CHUNKS:].any()
+    assert clear_speech.any() and kept[clear_speech].all()